@@ -0,0 +1,63 @@
+import unittest
+import json
+import os
+import tempfile
+from multiprocessing import get_context
+
+from core.grammar import Grammar
+from core.llk import LLKParserWrapped
+from core.earley import EarleyParser
+from core.lr import LRParserWrapped
+from core.RecursiveParser import RecursiveParser
+from core.batch import imapParser
+from core import main
+
+class BatchTest(unittest.TestCase):
+    grammar = ['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a']
+    strings = ['(a+a)*a', 'a+a', 'a', 'abc', 'a+'] * 5
+
+    def testVerifyMany(self):
+        parser = LLKParserWrapped(1)
+        parser.init(Grammar.read(self.grammar))
+
+        expected = [parser.verify(s) for s in self.strings]
+        self.assertEqual(parser.verify_many(self.strings, processes=1), expected)
+        self.assertEqual(parser.verify_many(iter(self.strings), processes=2, chunk_size=3), expected)
+
+    def testParseMany(self):
+        parser = EarleyParser(Grammar.read(self.grammar))
+
+        self.assertEqual(parser.parse_many(self.strings, processes=2, chunk_size=4), [parser.parse(s) for s in self.strings])
+
+    def testSpawn(self):
+        # spawned workers number symbols differently, rules are pickled by names
+        grammar = Grammar.read(self.grammar)
+        for parser in [EarleyParser(), LLKParserWrapped(1), LRParserWrapped(), RecursiveParser()]:
+            parser.init(grammar)
+            expected = [parser.parse(s) for s in self.strings]
+            results = imapParser(parser, 'parse', self.strings, 2, 4, context=get_context('spawn'))
+            self.assertEqual(list(results), expected, type(parser).__name__)
+            results = imapParser(parser, 'verify', self.strings, 2, 4, context=get_context('spawn'))
+            self.assertEqual(list(results), [bool(x) for x in expected])
+
+    def testCommandLine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            grammar = os.path.join(directory, 'gram.txt')
+            strings = os.path.join(directory, 'input.txt')
+            output = os.path.join(directory, 'output.jsonl')
+            with open(grammar, 'w') as f:
+                f.write('\n'.join(self.grammar))
+            with open(strings, 'w') as f:
+                f.write('\n'.join(self.strings[:5]) + '\n')
+
+            self.assertEqual(main.main([grammar, strings, '-o', output, '-m', 'parse', '-p', '1']), 0)
+            with open(output) as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertEqual([x['input'] for x in records], self.strings[:5])
+        self.assertEqual([x['accepted'] for x in records], [True, True, True, False, False])
+        self.assertEqual(records[2]['rules'], ['S -> BA', 'B -> DC', 'D -> a', 'C -> [eps]', 'A -> [eps]'])
+
+
+if __name__ == '__main__':
+    unittest.main()
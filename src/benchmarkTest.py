@@ -0,0 +1,44 @@
+import unittest
+import copy
+
+from benchmarks.catalogue import catalogue, synthetic
+from benchmarks.run import run, compare, exponent
+from core.llk import LLKParserWrapped
+from core.grammarGenerator import SentenceGenerator
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def testCatalogue(self):
+        for name, grammar, k in catalogue((2, 3)):
+            parser = LLKParserWrapped(k)
+            parser.init(grammar)
+            s = SentenceGenerator(grammar, seed=1).sentence(20)
+            self.assertTrue(parser.verify(s), name)
+        self.assertEqual(len(synthetic(5).rules), 17)
+
+    def testReport(self):
+        report = run(sizes=[10, 40], engines=['llk', 'earley'], scales=(2,), repeat=1,
+                     grammars=['expression', 'synthetic2'])
+
+        self.assertEqual({x['grammar'] for x in report['tables']}, {'expression', 'synthetic2'})
+        self.assertEqual(len(report['parsing']), 2 * 2 * 2 * 2)
+        self.assertTrue(all(x['seconds'] > 0 and x['peak_memory'] > 0 for x in report['parsing']))
+        self.assertEqual(len(report['scaling']), 2 * 2 * 2)
+        self.assertEqual(compare(report, report), [])
+
+        slower = copy.deepcopy(report)
+        for x in slower['parsing']:
+            x['seconds'] *= 10
+        regressions = compare(slower, report, noise=0)
+        self.assertEqual(len(regressions), len(report['parsing']))
+        self.assertEqual(compare(report, slower, noise=0), [])
+
+    def testExponent(self):
+        self.assertAlmostEqual(exponent([(10, 1), (100, 10), (1000, 100)]), 1)
+        self.assertAlmostEqual(exponent([(10, 1), (100, 100)]), 2)
+        self.assertIsNone(exponent([(10, 1)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks of table construction and parsing, run with
+    python -m benchmarks -o report.json --baseline baseline.json
+"""
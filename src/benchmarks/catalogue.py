@@ -0,0 +1,46 @@
+import os
+from typing import List, Tuple
+from core.grammar import Grammar, Rule, Terminal, NonTerminal
+
+GRAM_TXT = os.path.join(os.path.dirname(__file__), '..', '..', 'gram.txt')
+
+# operators of synthetic grammars, one per precedence level
+OPERATORS = '+-*/%^&|<>=!~@#$;:,.?'
+
+
+def synthetic(levels : int) -> Grammar:
+    """
+    LL(1) expression grammar with the given number of precedence levels:
+        [E<i>] -> [E<i+1>][R<i>]
+        [R<i>] -> <op i>[E<i+1>][R<i>] | eps
+        [E<levels>] -> ([E0]) | a
+    """
+    assert 1 <= levels <= len(OPERATORS)
+    expr = [NonTerminal(f'E{i}') for i in range(levels + 1)]
+    rest = [NonTerminal(f'R{i}') for i in range(levels)]
+    eps, rules = Terminal('eps'), []
+    for i in range(levels):
+        rules.append(Rule(expr[i], [expr[i + 1], rest[i]]))
+        rules.append(Rule(rest[i], [Terminal(OPERATORS[i]), expr[i + 1], rest[i]]))
+        rules.append(Rule(rest[i], [eps]))
+    rules.append(Rule(expr[levels], [Terminal('('), expr[0], Terminal(')')]))
+    rules.append(Rule(expr[levels], [Terminal('a')]))
+    terminals = {Terminal(x) for x in OPERATORS[:levels] + '()a'} | {eps}
+    return Grammar(set(expr + rest), terminals, rules, expr[0])
+
+
+def catalogue(scales : Tuple[int, ...] = (2, 4, 8, 16)) -> List[Tuple[str, Grammar, int]]:
+    """
+    returns (name, grammar, k) of benchmark grammars, k is the smallest lookahead
+    of the strong LL(k) table of the grammar
+    """
+    with open(GRAM_TXT) as f:
+        expression = Grammar.read([x.strip() for x in f if x.strip()])
+    ans = [
+        ('expression', expression, 1),
+        ('ll2', Grammar.read(['S -> aaA', 'A -> aAc | bBc', 'B -> bBc | bc']), 2),
+        ('ll3', Grammar.read(['S -> aSA', 'S -> eps', 'A -> aabS | c']), 3),
+    ]
+    for levels in scales:
+        ans.append((f'synthetic{levels}', synthetic(levels), 1))
+    return ans
@@ -0,0 +1,214 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+from core.lookaheadUtils import lookaheadUtils
+from core.llk import buildLLKTable
+from core.grammarGenerator import SentenceGenerator
+from core.main import ENGINES
+from benchmarks.catalogue import catalogue
+
+REPORT_VERSION = 1
+
+# the recursive parser backtracks, longer inputs and larger grammars take too long
+MAX_SIZE = {'recursive': 12}
+MAX_RULES = {'recursive': 10}
+
+
+def timed(run : Callable, repeat : int) -> float:
+    """
+    returns the best time of repeat runs in seconds
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peakMemory(run : Callable) -> int:
+    """
+    returns peak of memory allocated by python during the run in bytes
+    """
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def exponent(points : List[Tuple[int, float]]) -> float:
+    """
+    slope of log(seconds) by log(size), 1 is linear and 2 is quadratic growth
+    """
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    mx = sum(x for x, _ in points) / len(points)
+    my = sum(y for _, y in points) / len(points)
+    var = sum((x - mx) ** 2 for x, _ in points)
+    return sum((x - mx) * (y - my) for x, y in points) / var if var else None
+
+
+def benchTables(name, grammar, k_max : int, repeat : int) -> List[Dict]:
+    """
+    times FIRST_k, FOLLOW_k and the compiled LL(k) table for k = 1..k_max
+    """
+    ans = []
+    for k in range(1, k_max + 1):
+        first = lookaheadUtils.firstKIds(grammar, k)
+        follow = lookaheadUtils.followKIds(grammar, k, first)
+        build = lambda: buildLLKTable(grammar, k, compiled=True)
+        ans.append({
+            'grammar': name,
+            'k': k,
+            'first': timed(lambda: lookaheadUtils.firstKIds(grammar, k), repeat),
+            'follow': timed(lambda: lookaheadUtils.followKIds(grammar, k, first), repeat),
+            'table': timed(build, repeat),
+            'peak_memory': peakMemory(build),
+            'conflict': build() is None,
+        })
+    return ans
+
+
+def benchParsing(name, grammar, k : int, sizes : List[int], engines : List[str], repeat : int) -> List[Dict]:
+    """
+    times verify and parse of every engine on generated inputs of about the given sizes
+    """
+    generator = SentenceGenerator(grammar, seed=len(name), max_depth=max(sizes))
+    inputs = [(size, generator.sentence(size)) for size in sizes]
+    ans = []
+    for engine in engines:
+        if len(grammar.rules) > MAX_RULES.get(engine, math.inf):
+            ans.append({'grammar': name, 'engine': engine, 'error': 'skipped, the grammar is too large'})
+            continue
+        parser = ENGINES[engine](k, None)
+        try:
+            parser.init(grammar)
+        except ValueError as e:
+            ans.append({'grammar': name, 'engine': engine, 'error': str(e)})
+            continue
+        for size, s in inputs:
+            if size > MAX_SIZE.get(engine, math.inf):
+                continue
+            assert parser.verify(s), f'{engine} rejects a sentence of {name}'
+            for method in ('verify', 'parse'):
+                run = getattr(parser, method)
+                seconds = timed(lambda: run(s), repeat)
+                ans.append({
+                    'grammar': name,
+                    'engine': engine,
+                    'method': method,
+                    'size': size,
+                    'length': len(s),
+                    'seconds': seconds,
+                    'throughput': len(s) / seconds if seconds else None,
+                    'peak_memory': peakMemory(lambda: run(s)),
+                })
+    return ans
+
+
+def scaling(parsing : List[Dict]) -> List[Dict]:
+    curves = {}
+    for x in parsing:
+        if 'error' not in x:
+            curves.setdefault((x['grammar'], x['engine'], x['method']), []).append((x['length'], x['seconds']))
+    return [
+        {'grammar': g, 'engine': e, 'method': m, 'exponent': exponent(points)}
+        for (g, e, m), points in curves.items()
+    ]
+
+
+def run(sizes : List[int] = (100, 1000, 10000), engines : List[str] = ('llk', 'lalr', 'earley', 'recursive'),
+        scales : Tuple[int, ...] = (2, 4, 8, 16), repeat : int = 3, grammars : List[str] = None) -> Dict:
+    """
+    runs the benchmarks and returns the report
+    """
+    report = {
+        'version': REPORT_VERSION,
+        'python': platform.python_version(),
+        'sizes': list(sizes),
+        'tables': [],
+        'parsing': [],
+    }
+    for name, grammar, k in catalogue(scales):
+        if grammars is not None and name not in grammars:
+            continue
+        report['tables'].extend(benchTables(name, grammar, k, repeat))
+        report['parsing'].extend(benchParsing(name, grammar, k, sizes, engines, repeat))
+    report['scaling'] = scaling(report['parsing'])
+    return report
+
+
+def measurements(report : Dict) -> Dict[Tuple, float]:
+    """
+    maps keys of measurements of the report to seconds
+    """
+    ans = {}
+    for x in report.get('tables', []):
+        for phase in ('first', 'follow', 'table'):
+            ans[('table', x['grammar'], x['k'], phase)] = x[phase]
+    for x in report.get('parsing', []):
+        if 'error' not in x:
+            ans[('parse', x['grammar'], x['engine'], x['method'], x['size'])] = x['seconds']
+    return ans
+
+
+def compare(report : Dict, baseline : Dict, threshold : float = 1.25, noise : float = 1e-4) -> List[Dict]:
+    """
+    returns measurements that are more than threshold times slower than in the baseline,
+    measurements faster than noise seconds in both reports are ignored
+    """
+    current, old = measurements(report), measurements(baseline)
+    ans = []
+    for key, seconds in current.items():
+        if key not in old or max(seconds, old[key]) < noise:
+            continue
+        ratio = seconds / old[key] if old[key] else math.inf
+        if ratio > threshold:
+            ans.append({'key': list(key), 'baseline': old[key], 'current': seconds, 'ratio': ratio})
+    return ans
+
+
+def main(argv = None) -> int:
+    """
+    Runs the benchmarks, writes the JSON report and compares it with the baseline,
+    exit code is 1 if some measurement is slower than in the baseline
+    """
+    args = argparse.ArgumentParser(description='Benchmarks of table construction and parsing')
+    args.add_argument('-o', '--output', default='-', help="JSON report, '-' for stdout")
+    args.add_argument('--baseline', default=None, help='report of a previous run to compare with')
+    args.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio that is a regression')
+    args.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args.add_argument('--engines', nargs='+', default=['llk', 'lalr', 'earley', 'recursive'], choices=sorted(ENGINES))
+    args.add_argument('--grammars', nargs='+', default=None, help='names of grammars of the catalogue, all by default')
+    args.add_argument('--scales', type=int, nargs='+', default=[2, 4, 8, 16], help='levels of synthetic grammars')
+    args.add_argument('--repeat', type=int, default=3)
+    args = args.parse_args(argv)
+
+    report = run(args.sizes, args.engines, tuple(args.scales), args.repeat, args.grammars)
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        report['regressions'] = regressions
+
+    text = json.dumps(report, indent=1)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    for x in regressions:
+        print(f"regression {x['key']}: {x['baseline']:.6f}s -> {x['current']:.6f}s", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
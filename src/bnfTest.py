@@ -0,0 +1,97 @@
+import unittest
+import io
+import os
+import tempfile
+import pickle
+
+from core.grammar import Grammar, NonTerminal, Terminal
+from core.bnf import readBNF, loadGrammar, GrammarSyntaxError
+from core.earley import EarleyParser
+from core.llk import LLKParserWrapped
+from core.lexer import Lexer
+
+class BNFTest(unittest.TestCase):
+    source = '''
+        # expressions
+        Expr -> Term ExprRest
+        ExprRest -> '+' Term ExprRest   # sums
+                  | eps
+        Term ::= Factor TermRest
+        TermRest -> "*" Factor TermRest | ε
+        Factor -> '(' Expr ')'
+                | id | num
+    '''
+
+    def testRead(self):
+        grammar = readBNF(io.StringIO(self.source))
+        self.assertEqual(grammar.start_symbol, NonTerminal('Expr'))
+        self.assertEqual(len(grammar.rules), 9)
+        self.assertEqual({x.name() for x in grammar.terms}, {'+', '*', '(', ')', 'id', 'num', 'eps'})
+
+        lexer = Lexer(['+', '*', '(', ')'], {'id': '[a-z]+', 'num': '[0-9]+'}, skip=' ')
+        parser = LLKParserWrapped(1)
+        parser.init(grammar)
+        self.assertTrue(parser.verify(lexer.tokenize('(x + 1) * y')))
+        self.assertFalse(parser.verify(lexer.tokenize('x + * y')))
+
+        # the same language as the single character format
+        single = readBNF(["S -> 'a' S 'b' | Empty", 'Empty -> eps'])
+        old = Grammar.read(['S -> aSb | eps'])
+        for s in ['', 'ab', 'aabb', 'aab', 'ba']:
+            self.assertEqual(EarleyParser(single).verify(s), EarleyParser(old).verify(s))
+
+    def testQuotedTerminals(self):
+        grammar = readBNF(["Query -> 'SELECT' Names 'FROM' id", "Names -> id | id ',' Names | '*'", "S -> 'S' | Query"])
+        select, query = Terminal('SELECT', False), NonTerminal('Query')
+        self.assertIn(select, grammar.terms)
+        self.assertIn(Terminal('S', False), grammar.terms)
+        self.assertNotEqual(Terminal('S', False), NonTerminal('S'))
+        self.assertEqual(len(grammar.terms | grammar.non_terms), len(grammar.terms) + len(grammar.non_terms))
+        self.assertIs(pickle.loads(pickle.dumps(select)), select)
+
+        lexer = Lexer(['SELECT', 'FROM', ',', '*'], {'id': '[a-z]+'}, skip=' ')
+        parser = EarleyParser(Grammar(grammar.non_terms, grammar.terms, grammar.rules, query))
+        self.assertTrue(parser.verify(lexer.tokenize('SELECT a, b FROM t')))
+        self.assertFalse(parser.verify(lexer.tokenize('SELECT FROM t')))
+
+    def testSyntaxErrors(self):
+        cases = [
+            (['S -> a', '  | b c', 'x -> a'], 3, 1),
+            (['S -> a', 'T -> a -> b'], 2, 8),
+            (['| a'], 1, 1),
+            (['S -> a $'], 1, 8),
+            (["S -> 'eps'"], 1, 6),
+            (["S -> ''"], 1, 6),
+            (["S -> 'abc"], 1, 6),
+            (['# nothing'], 1, 1),
+        ]
+        for lines, line, column in cases:
+            with self.assertRaises(GrammarSyntaxError) as error:
+                readBNF(lines)
+            self.assertEqual((error.exception.line, error.exception.column), (line, column), lines)
+            self.assertIsInstance(error.exception, ValueError)
+
+    def testLargeGrammar(self):
+        n = 20000
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chain.bnf')
+            with open(path, 'w') as f:
+                f.write('Start -> Item0\n')
+                for i in range(n):
+                    f.write(f"Item{i} -> 'x' Item{i + 1} | 'y'\n")
+                f.write(f'Item{n} -> eps\n')
+            grammar = loadGrammar(path)
+            self.assertEqual(len(grammar.rules), 2 * n + 2)
+            parser = LLKParserWrapped(1)
+            parser.init(grammar)
+            self.assertTrue(parser.verify('x' * 100 + 'y'))
+            self.assertFalse(parser.verify('y' + 'x'))
+
+            path = os.path.join(directory, 'old.txt')
+            with open(path, 'w') as f:
+                f.write('S -> aS | b\n\n')
+            self.assertEqual(len(loadGrammar(path).rules), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
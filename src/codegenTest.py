@@ -0,0 +1,82 @@
+import unittest
+import os
+import pickle
+import tempfile
+
+from core.grammar import Grammar
+from core.llk import LLKParserWrapped
+from core.codegen import LLKGeneratedParser, generateLLKModule, loadModule
+from core.grammarGenerator import SentenceGenerator
+from core.tablecache import TableCache
+from core.lexer import Lexer
+from lexerTest import readRules
+
+class CodegenTest(unittest.TestCase):
+    grammar = ['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a']
+
+    def compare(self, rules, k, adaptive = False):
+        grammar = Grammar.read(rules)
+        generated = LLKGeneratedParser(k, adaptive=adaptive)
+        generated.init(grammar)
+        expected = LLKParserWrapped(k, adaptive=adaptive)
+        expected.init(grammar)
+        generator = SentenceGenerator(grammar, seed=1, max_depth=20)
+        for _ in range(200):
+            s = generator.sentence(generator.random.randint(0, 30), near_valid=0.5)
+            self.assertEqual(generated.parse(s), expected.parse(s))
+            self.assertEqual(generated.verify(s), expected.verify(s))
+
+    def testSameResults(self):
+        self.compare(self.grammar, 1)
+        self.compare(['S -> aaA', 'A -> aAc | bBc', 'B -> bBc | bc'], 2)
+        self.compare(['S -> aSA', 'S -> eps', 'A -> aabS | c'], 3)
+        self.compare(['S -> aaB | aaC | D', 'B -> bB | b', 'C -> c', 'D -> dD | e'], 3, adaptive=True)
+
+    def testStandaloneModule(self):
+        parser = LLKGeneratedParser(1)
+        parser.init(Grammar.read(self.grammar))
+        self.assertNotIn('import', parser.source)
+        module = loadModule(generateLLKModule(parser.grammar, parser.table))
+        self.assertEqual(module.parse('a*a'), [0, 3, 7, 4, 7, 5, 2])
+        self.assertTrue(module.verify(['a', '+', 'a']))
+        self.assertFalse(module.verify('a+'))
+        self.assertIsNone(module.parse('a\0'))
+
+        # lists are parsed in loops, nesting deeper than the Python stack falls back to the table
+        self.assertTrue(parser.verify('+'.join(['a'] * 100000)))
+        deep = '(' * 5000 + 'a' + ')' * 5000
+        self.assertTrue(parser.verify(deep))
+        self.assertEqual(len(parser.parse(deep)), 5000 * 5 + 5)
+
+    def testTokens(self):
+        lexer = Lexer(['+', '(', ')'], {'id': '[a-z]+'}, skip=' ')
+        grammar = readRules([
+            ('S', ['T', 'A']), ('A', ['+', 'T', 'A']), ('A', []),
+            ('T', ['id']), ('T', ['(', 'S', ')']),
+        ])
+        parser = LLKGeneratedParser(1)
+        parser.init(grammar)
+        tokens = lexer.tokenize('(x + y) + z')
+        self.assertTrue(parser.verify(tokens))
+        self.assertFalse(parser.verify(tokens[:-1]))
+        self.assertEqual(parser.parse(tokens), [grammar.rules[x] for x in parser.module.parse(parser.tokens(tokens))])
+
+    def testCache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cold = LLKGeneratedParser(1, TableCache(directory))
+            cold.init(Grammar.read(self.grammar))
+            modules = [x for x in os.listdir(directory) if x.endswith('.py')]
+            self.assertEqual(len(modules), 1)
+            self.assertTrue(modules[0][:-3].isidentifier())
+
+            warm = LLKGeneratedParser(1, TableCache(directory))
+            warm.init(Grammar.read(self.grammar))
+            self.assertEqual(warm.module.__file__, os.path.join(directory, modules[0]))
+            restored = pickle.loads(pickle.dumps(warm))
+            for s in ['(a+a)*a', 'a+', '']:
+                self.assertEqual(restored.parse(s), cold.parse(s))
+            self.assertEqual(warm.verify_many(['a', 'a+', '(a)'], processes=2), [True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,51 @@
 from core.iparser import IParser
-from core.grammar import Terminal, NonTerminal, BaseSymbol, Grammar, SymbolUtils, Rule
-from copy import deepcopy
+from core.grammar import Terminal, NonTerminal, BaseSymbol, Grammar, SymbolUtils, Rule, SymbolTable, BUFFER_TYPES, inputIds
+from core.tablecache import grammarToArrays, grammarFromArrays
+from core.instrumentation import timer
 from typing import List
 
 class RecursiveParser(IParser):
 
-    __slots__ = ['rules_by_symbol', 'grammar', 'read', 'unread']
-
-    def __init__(self, grammar = None):
+    __slots__ = ['rules_by_symbol', 'grammar', 'read', 'unread', 'cache', 'stats', 'binarize', 'record']
+
+    # parse returns reductions in reverse order, the rightmost derivation of the epsilon-free grammar
+    rightmost = True
+
+    def __init__(self, grammar = None, cache = None, binarize = False):
+        """
+        cache is an optional TableCache for the epsilon-free grammar,
+        with binarize rules with many nullable symbols are split before 
+        epsilon rules are removed (see Grammar.remove_eps_rules), then parse 
+        returns rules of the split grammar
+        """
+        self.cache = cache
+        self.binarize = binarize
+        self.stats = None
+        self.record = True
         if grammar is not None:
             self.init(grammar) 
 
     def init(self, grammar : Grammar):
-        self.grammar = grammar.remove_eps_rules()
+        kind = 'eps-free-binary' if self.binarize else 'eps-free'
+        loaded = None if self.cache is None else self.cache.load(kind, grammar, 0)
+        try:
+            self.grammar = None if loaded is None else grammarFromArrays(*loaded).freeze()
+        except (KeyError, TypeError, ValueError, IndexError):
+            self.grammar = None
+        if self.grammar is None:
+            with timer(self.instrumentation, self, 'eps_free'):
+                self.grammar = grammar.freeze().remove_eps_rules(self.binarize)
+            if self.cache is not None:
+                self.cache.store(kind, grammar, 0, *grammarToArrays(self.grammar))
         self.rules_by_symbol = {}
         for rule in self.grammar.rules:
             self.rules_by_symbol[rule.st] = self.rules_by_symbol.setdefault(rule.st, []) + [rule]
 
 
+    def reinit(self) -> None:
+        # rules and stacks hold symbols, not ids, and self.grammar is already epsilon-free
+        pass
+
     def is_compatible(self, rule : Rule):
         if len(rule.en) > len(self.parse_stack):
             return False
@@ -31,7 +59,12 @@ class RecursiveParser(IParser):
         self.parse_stack.append(rule.st)
 
 
-    def try_parse(self) -> bool:
+    def try_parse(self, depth : int = 0) -> bool:
+        stats = self.stats
+        if stats is not None:
+            stats['attempts'] = stats.get('attempts', 0) + 1
+            stats['depth'] = max(stats.get('depth', 0), depth)
+            stats['stack'] = max(stats.get('stack', 0), len(self.parse_stack))
         if len(self.input) == 0 and len(self.parse_stack) == 1 and self.parse_stack[0] == self.grammar.start_symbol:
             return True
         
@@ -43,36 +76,55 @@ class RecursiveParser(IParser):
             moves.append((2, 'shift'))
 
         for move in moves:
-            saved_moment = deepcopy((self.parse_stack, self.input))
+            # symbols are interned and input is only sliced, so copying the stack list is enough
+            saved_moment = (list(self.parse_stack), self.input)
+            if stats is not None:
+                stats['copies'] = stats.get('copies', 0) + 1
             if move[0] == 2:
-                self.parse_stack.append(SymbolUtils.getSymbol(self.input[0]))
+                token = self.input[0]
+                self.parse_stack.append(SymbolUtils.getSymbol(token) if isinstance(token, str) else SymbolTable.symbols[token])
                 self.input = self.input[1:]
-                if (self.try_parse()):
+                if (self.try_parse(depth + 1)):
                     return True
             else:
                 self.reduce(move[1])
                 sz = len(self.move_stack)
-                if (self.try_parse()):
-                    self.move_stack = self.move_stack[:sz]  + [deepcopy(move[1])] + self.move_stack[sz:]
+                if (self.try_parse(depth + 1)):
+                    if self.record:
+                        self.move_stack.insert(sz, move[1])
                     return True
 
             self.parse_stack, self.input = saved_moment
+            if stats is not None:
+                stats['backtracks'] = stats.get('backtracks', 0) + 1
         
         return False
                     
-    def verify(self, s : str) -> bool:
+    def run(self, s : str, stats, record : bool = True) -> bool:
+        """
+        without record the reductions are not collected into move_stack
+        """
+        self.record = record
         self.parse_stack = []
+        if isinstance(s, BUFFER_TYPES):
+            s = inputIds(s)
+            if -1 in s:
+                return False
         self.input = s
         self.move_stack = []
-        return self.try_parse()
+        self.stats = stats
+        try:
+            return self.try_parse()
+        finally:
+            self.stats = None
+
+    def verify(self, s : str) -> bool:
+        return self.measured('verify', s, lambda stats: self.run(s, stats, False))
 
     def parse(self, s : str) -> List[Rule]:
-        if not self.verify(s):
+        if not self.measured('parse', s, lambda stats: self.run(s, stats)):
             return []
-        ret = self.move_stack[::-1]
-        for x in ret:
-           x.en = x.en[::-1]
-        return ret
+        return self.move_stack[::-1]
 
 
 
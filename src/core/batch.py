@@ -0,0 +1,57 @@
+import os
+import multiprocessing
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, List
+from core.grammar import SymbolTable
+
+# parser of the worker process, set once by the pool initializer
+_parser = None
+
+def _initWorker(parser, symbols) -> None:
+    global _parser
+    _parser = parser
+    # spawned workers intern symbols in their own order, tables of ids are rebuilt then
+    if any(SymbolTable.lookup(cls, name) != sid for sid, (cls, name) in enumerate(symbols)):
+        _parser.reinit()
+
+def _runChunk(args):
+    method, chunk, extra = args
+    run = getattr(_parser, method)
+    return [run(s, *extra) for s in chunk]
+
+def chunks(strings : Iterable[str], chunk_size : int) -> Iterator[List[str]]:
+    it = iter(strings)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def imapParser(parser, method : str, strings : Iterable[str], processes : int = None, chunk_size : int = 1024,
+               extra : tuple = (), context = None) -> Iterator:
+    """
+    Yields parser.<method>(s, *extra) for every string, in order.
+    Strings are split into chunks that are processed by a pool of processes,
+    every worker receives the initialised parser once, so tables are not rebuilt per string.
+    Symbol ids differ between processes unless workers are forked: then the worker
+    calls parser.reinit() once, and strings should not be lists of terminal ids.
+    context is an optional multiprocessing context, with processes = 1 
+    strings are processed in the current process.
+    """
+    if processes == 1:
+        run = getattr(parser, method)
+        for s in strings:
+            yield run(s, *extra)
+        return
+    limit = 2 * (processes or os.cpu_count() or 1)
+    symbols = [(type(x), x.name()) for x in SymbolTable.symbols]
+    with (context or multiprocessing).Pool(processes, initializer=_initWorker, initargs=(parser, symbols)) as pool:
+        # at most limit chunks are in flight, so the input is read lazily
+        pending = deque()
+        for chunk in chunks(strings, chunk_size):
+            pending.append(pool.apply_async(_runChunk, ((method, chunk, extra),)))
+            if len(pending) >= limit:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
@@ -0,0 +1,150 @@
+import re
+from typing import Iterable, Iterator, Tuple, Union, TextIO
+from core.grammar import Grammar, Rule, Terminal, NonTerminal, SymbolTable
+
+# one token of a line: spaces, a comment, an arrow, a bar, a quoted terminal or a name
+TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>\#.*)
+  | (?P<arrow>->|::=)
+  | (?P<bar>\|)
+  | (?P<quoted>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<epsilon>ε)
+""", re.VERBOSE)
+
+ESCAPE = re.compile(r'\\(.)')
+
+
+class GrammarSyntaxError(ValueError):
+    """
+    Error of a grammar file: line (from 1), column (from 1) and the message
+    """
+
+    def __init__(self, line : int, column : int, message : str) -> None:
+        self.line = line
+        self.column = column
+        self.message = message
+        super().__init__(f'line {line}, column {column}: {message}')
+
+    def __reduce__(self):
+        return GrammarSyntaxError, (self.line, self.column, self.message)
+
+
+def tokenize(line : str, number : int) -> Iterator[Tuple[str, str, int]]:
+    """
+    yields (kind, text, column) of tokens of the line, spaces and comments are skipped
+    """
+    pos = 0
+    while pos < len(line):
+        match = TOKEN.match(line, pos)
+        if match is None:
+            raise GrammarSyntaxError(number, pos + 1, f'unexpected character {line[pos]!r}')
+        kind = match.lastgroup
+        if kind not in ('space', 'comment'):
+            yield kind, match.group(), pos + 1
+        pos = match.end()
+
+
+class BNFReader:
+    """
+    Reads grammars in BNF-like form line by line:
+
+        # comment
+        Expr -> Term Rest           # nonterminals are names that start with an uppercase letter
+        Rest -> '+' Term Rest       # terminals are quoted text, such as 'SELECT', or other names such as id
+              | eps                 # alternatives can continue on the next lines, eps or ε is the empty string
+        Term ::= id | '(' Expr ')'
+
+    The left part of the first rule is the start symbol. Symbols are interned when they are
+    first seen, so the file is never held in memory. Errors raise GrammarSyntaxError with the line.
+    """
+
+    __slots__ = ['symbols', 'rules', 'start', 'lhs', 'number']
+
+    def __init__(self) -> None:
+        self.symbols = {}
+        self.rules = {}
+        self.start = None
+        self.lhs = None
+        self.number = 0
+
+    def symbol(self, kind : str, text : str, column : int) -> int:
+        key = (kind, text)
+        sid = self.symbols.get(key)
+        if sid is not None:
+            return sid
+        if kind == 'quoted':
+            name = ESCAPE.sub(r'\1', text[1:-1])
+            if not name:
+                raise GrammarSyntaxError(self.number, column, "empty terminal, use eps for the empty string")
+        else:
+            name = text
+        if kind == 'name' and name[0].isupper():
+            sid = NonTerminal(name).id
+        elif name == 'eps' and kind != 'quoted':
+            sid = SymbolTable.EPS
+        else:
+            # quoted text is any terminal, even with uppercase letters
+            sid = Terminal(name, False).id
+            if sid == SymbolTable.EPS:
+                raise GrammarSyntaxError(self.number, column, "'eps' is the empty string, it can not be a terminal")
+        self.symbols[key] = sid
+        return sid
+
+    def line(self, line : str) -> None:
+        self.number += 1
+        tokens = list(tokenize(line, self.number))
+        if not tokens:
+            return
+        if len(tokens) > 1 and tokens[1][0] == 'arrow':
+            kind, text, column = tokens[0]
+            if kind != 'name' or not text[0].isupper():
+                raise GrammarSyntaxError(self.number, column, f'left part {text} should be a nonterminal name')
+            self.lhs = self.symbol(kind, text, column)
+            if self.start is None:
+                self.start = self.lhs
+            tokens = tokens[2:]
+        elif tokens[0][0] != 'bar':
+            raise GrammarSyntaxError(self.number, tokens[0][2], "expected 'A ->' or '|'")
+        elif self.lhs is None:
+            raise GrammarSyntaxError(self.number, tokens[0][2], 'alternative before the first rule')
+        else:
+            tokens = tokens[1:]
+
+        rhs = []
+        for kind, text, column in tokens + [('bar', '|', len(line) + 1)]:
+            if kind == 'bar':
+                rhs = [x for x in rhs if x != SymbolTable.EPS] or [SymbolTable.EPS]
+                self.rules.setdefault(Rule.fromIds(self.lhs, tuple(rhs)), None)
+                rhs = []
+            elif kind == 'arrow':
+                raise GrammarSyntaxError(self.number, column, 'unexpected ' + text)
+            else:
+                rhs.append(SymbolTable.EPS if kind == 'epsilon' else self.symbol(kind, text, column))
+
+    def grammar(self) -> Grammar:
+        if self.start is None:
+            raise GrammarSyntaxError(self.number, 1, 'no rules')
+        return Grammar.fromRules(list(self.rules), SymbolTable.symbols[self.start])
+
+
+def readBNF(f : Union[TextIO, Iterable[str]]) -> Grammar:
+    """
+    reads the grammar from a file or an iterable of lines, see BNFReader
+    """
+    reader = BNFReader()
+    for line in f:
+        reader.line(line.rstrip('\n'))
+    return reader.grammar()
+
+
+def loadGrammar(path : str) -> Grammar:
+    """
+    reads the grammar file, files with the .bnf extension are read by readBNF,
+    the other ones by Grammar.read
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.bnf'):
+            return readBNF(f)
+        return Grammar.read([x.strip() for x in f if x.strip()])
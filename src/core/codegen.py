@@ -0,0 +1,284 @@
+import importlib.util
+import os
+import tempfile
+import types
+from typing import Dict, List
+from core.grammar import Grammar, BUFFER_TYPES
+from core.llk import LLKTable, LLKParserWrapped, LLKCompiledParser, LLKCompiledRecognizer
+
+
+# nonterminals are inlined into functions of other ones up to this depth
+INLINE_DEPTH = 2
+
+
+class LLKCodeGenerator:
+    """
+    Writes the source of a standalone Python module that parses the language of a compiled LL(k) table
+    by recursive descent: one function per nonterminal, the lookahead trie of the table is compiled
+    into nested comparisons of tokens, so parsing does no table lookups.
+    The module does not import MangoParsers, its functions are
+        parse(tokens)   - numbers of rules of the leftmost derivation or None,
+                          tokens is a str of single character terminals or a list of terminal names
+        verify(tokens)  - whether tokens are accepted, it does not collect the rules
+    Rule numbers are positions in the rules of the grammar. Functions return the position
+    after the nonterminal and raise Reject on an error, so calls are not followed by checks.
+    Nonterminals that end their own rule are parsed in a loop instead of a recursive call,
+    so lists do not use the Python stack, the other ones are inlined into their callers
+    up to INLINE_DEPTH levels.
+    """
+
+    __slots__ = ['table', 'grammar', 'end', 'lines', 'loops']
+
+    def __init__(self, grammar : Grammar, table : LLKTable) -> None:
+        self.grammar = grammar
+        self.table = table
+        names = {x.name() for x in table.terminals}
+        # the end of the input is a character that is not a terminal
+        self.end = next(chr(i) for i in range(len(names) + 1) if chr(i) not in names)
+        self.lines = []
+        self.loops = [False] * len(table.nonterminals)
+        for num, rhs in enumerate(table.rhs):
+            if rhs and rhs[0] >= 0 and table.ordering[num].lhs == table.nonterminals[rhs[0]].id:
+                self.loops[rhs[0]] = True
+
+    def line(self, indent : int, text : str) -> None:
+        self.lines.append('    ' * indent + text)
+
+    def name(self, code : int) -> str:
+        return repr(self.end if code == self.table.end else self.table.terminals[code].name())
+
+    def branches(self, cell : int) -> List:
+        """
+        returns (cell value, codes) of the trie row at the cell, codes are grouped by the value
+        """
+        table = self.table
+        groups = {}
+        for code in range(table.width):
+            value = table.cells[cell + code]
+            if value != 0 and code != table.unknown:
+                groups.setdefault(value, []).append(code)
+        return list(groups.items())
+
+    def generate(self) -> str:
+        table, grammar = self.table, self.grammar
+        self.lines = []
+        self.line(0, '"""')
+        self.line(0, f'LL({table.k}) recursive descent parser generated by core.codegen, do not edit.')
+        self.line(0, 'Rules:')
+        for num in sorted(table.ordering):
+            self.line(1, f'{num}: {table.ordering[num]}')
+        self.line(0, '"""')
+        self.line(0, '')
+        self.line(0, f'FINGERPRINT = {grammar.fingerprint()!r}')
+        self.line(0, f'K = {table.k}')
+        self.line(0, f'END = {self.end!r}')
+        self.line(0, '')
+        self.line(0, '')
+        self.line(0, 'class Reject(Exception):')
+        self.line(1, 'pass')
+        for emit in (True, False):
+            for item in range(len(table.nonterminals)):
+                self.function(item, emit)
+        for name, emit in (('parse', True), ('verify', False)):
+            self.line(0, '')
+            self.line(0, '')
+            self.line(0, f'def {name}(tokens):')
+            self.line(1, 'n = len(tokens)')
+            self.line(1, 'if isinstance(tokens, str):')
+            self.line(2, 's = tokens + END * K')
+            self.line(1, 'else:')
+            self.line(2, 's = list(tokens)')
+            self.line(2, 's.extend([END] * K)')
+            if emit:
+                self.line(1, 'ans = []')
+            self.line(1, 'try:')
+            start = f'_n{table.start}(s, 0, ans.append)' if emit else f'_v{table.start}(s, 0)'
+            self.line(2, f'pos = {start}')
+            self.line(1, 'except Reject:')
+            self.line(2, 'return None' if emit else 'return False')
+            if emit:
+                self.line(1, 'return ans if pos == n else None')
+            else:
+                self.line(1, 'return pos == n')
+        return '\n'.join(self.lines) + '\n'
+
+    def call(self, item : int, emit : bool) -> str:
+        return f'_n{item}(s, pos, emit)' if emit else f'_v{item}(s, pos)'
+
+    def function(self, item : int, emit : bool) -> None:
+        self.line(0, '')
+        self.line(0, '')
+        self.line(0, f'def {self.call(item, emit)}:')
+        self.line(1, f'# {self.table.nonterminals[item].name()}')
+        if self.loops[item]:
+            self.line(1, 'while True:')
+            self.trie(self.table.entry[item], 0, 2, [item], {}, emit)
+        else:
+            self.trie(self.table.entry[item], 0, 1, [item], {}, emit)
+            self.line(1, 'return pos')
+
+    def trie(self, cell : int, depth : int, indent : int, stack : List[int], known : Dict[int, int], emit : bool) -> None:
+        """
+        writes the prediction of the trie node for the nonterminal stack[-1], stack holds
+        the nonterminals that are inlined into the function, known maps offsets of the lookahead
+        to their single codes. The code falls through after the nonterminal, in a loop 
+        function it returns instead and continues the loop for the tail call
+        """
+        if cell < 0:
+            self.rule(~cell, indent, stack, known, emit)
+            return
+        if cell == 0:
+            self.line(indent, 'raise Reject')
+            return
+        var = f'c{depth}'
+        self.line(indent, f'{var} = s[pos + {depth}]' if depth else f'{var} = s[pos]')
+        for i, (value, codes) in enumerate(self.branches(cell)):
+            if len(codes) == 1:
+                condition = f'{var} == {self.name(codes[0])}'
+            else:
+                condition = f'{var} in {{{", ".join(self.name(x) for x in codes)}}}'
+            self.line(indent, ('if ' if i == 0 else 'elif ') + condition + ':')
+            nested = {**known, depth: codes[0]} if len(codes) == 1 else known
+            mark = len(self.lines)
+            self.trie(value, depth + 1, indent + 1, stack, nested, emit)
+            if all(x.lstrip().startswith('#') for x in self.lines[mark:]):
+                self.line(indent + 1, 'pass')
+        self.line(indent, 'else:')
+        self.line(indent + 1, 'raise Reject')
+
+    def rule(self, num : int, indent : int, stack : List[int], known : Dict[int, int], emit : bool) -> None:
+        """
+        writes the expansion by the rule, terminals are matched at offsets from pos
+        that is moved once before every nonterminal and at the end
+        """
+        table = self.table
+        item = stack[-1]
+        tail = len(stack) == 1 and self.loops[item]
+        self.line(indent, f'# {table.ordering[num]}')
+        if emit:
+            self.line(indent, f'emit({num})')
+        rhs = table.rhs[num][::-1]
+        shift = 0
+        for i, x in enumerate(rhs):
+            if x < 0:
+                if known.get(shift) != ~x:
+                    at = f'pos + {shift}' if shift else 'pos'
+                    self.line(indent, f'if s[{at}] != {self.name(~x)}:')
+                    self.line(indent + 1, 'raise Reject')
+                shift += 1
+                continue
+            if shift:
+                self.line(indent, f'pos += {shift}')
+            shift = 0
+            known = {}
+            if tail and x == item and i == len(rhs) - 1:
+                self.line(indent, 'continue')
+                return
+            if self.loops[x] or x in stack or len(stack) > INLINE_DEPTH:
+                self.line(indent, f'pos = {self.call(x, emit)}')
+            else:
+                self.trie(table.entry[x], 0, indent, stack + [x], {}, emit)
+        if shift:
+            self.line(indent, f'pos += {shift}')
+        if tail:
+            self.line(indent, 'return pos')
+
+
+def generateLLKModule(grammar : Grammar, table : LLKTable) -> str:
+    """
+    returns the source of the parser module of the compiled table, see LLKCodeGenerator
+    """
+    return LLKCodeGenerator(grammar.freeze(), table).generate()
+
+
+def loadModule(source : str, name : str = 'mango_llk', path : str = None) -> types.ModuleType:
+    """
+    returns the module of the generated source, or imports the module file at path
+    (the source is not used then), so Python keeps its compiled bytecode next to it
+    """
+    if path is not None:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    module = types.ModuleType(name)
+    exec(compile(source, f'<{name}>', 'exec'), module.__dict__)
+    return module
+
+
+def modulePath(directory : str, grammar : Grammar, k : int, adaptive : bool) -> str:
+    """
+    file of the generated module in the cache directory, its name is importable
+    """
+    kind = 'adaptive' if adaptive else 'k'
+    return os.path.join(directory, f'mango_llk_{kind}{k}_{grammar.fingerprint()}.py')
+
+
+class LLKGeneratedParser(LLKParserWrapped):
+    """
+    LLKParserWrapped that verifies and parses with the generated recursive descent module,
+    see LLKCodeGenerator. Trees, diagnostics, streaming and incremental parsing use the table.
+    With cache (TableCache) the module is written to its directory and imported from there,
+    its file name is made of the lookahead and the grammar fingerprint.
+    Inputs that nest deeper than the Python recursion limit and bytes-like inputs are parsed with the table.
+    """
+
+    def __init__(self, k = 5, cache = None, adaptive = False, dfa = False):
+        super().__init__(k, cache, adaptive, dfa)
+        self.source = None
+        self.module = None
+        self.names = None
+
+    def init(self, grammar : Grammar) -> None:
+        super().init(grammar)
+        grammar = self.grammar
+        self.names = {x.id: x.name() for x in self.table.terminals}
+        if self.cache is None:
+            self.source = generateLLKModule(grammar, self.table)
+            self.module = loadModule(self.source)
+            return
+        path = modulePath(self.cache.directory, grammar, self.k, self.adaptive)
+        if not os.path.exists(path):
+            source = generateLLKModule(grammar, self.table)
+            fd, tmp = tempfile.mkstemp(dir=self.cache.directory, suffix='.py')
+            with os.fdopen(fd, 'w') as f:
+                f.write(source)
+            os.replace(tmp, path)
+        with open(path) as f:
+            self.source = f.read()
+        self.module = loadModule(self.source, os.path.basename(path)[:-3], path)
+        if self.module.FINGERPRINT != grammar.fingerprint():
+            raise ValueError(f'{path} is generated for another grammar')
+
+    def run(self, s : str, stats) -> List[int]:
+        # the module has no explicit stack, only the table parser puts it into stats
+        try:
+            ret = LLKCompiledParser(s, self.table, None, stats) if isinstance(s, BUFFER_TYPES) else self.module.parse(self.tokens(s))
+        except RecursionError:
+            ret = LLKCompiledParser(s, self.table, None, stats)
+        if stats is not None and ret is not None:
+            stats['predictions'] = len(ret)
+        return ret
+
+    def tokens(self, s):
+        return s if isinstance(s, str) else [self.names.get(x) for x in s]
+
+    def check(self, s : str, stats = None) -> bool:
+        if self.automaton is not None:
+            return self.automaton.verify(s)
+        if isinstance(s, BUFFER_TYPES):
+            return LLKCompiledRecognizer(s, self.table, self.stack, stats)
+        try:
+            return self.module.verify(self.tokens(s))
+        except RecursionError:
+            return LLKCompiledRecognizer(s, self.table, self.stack, stats)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['module'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.source is not None:
+            self.module = loadModule(self.source)
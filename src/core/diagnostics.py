@@ -0,0 +1,85 @@
+from typing import Iterable, Optional, Dict
+from core.grammar import SymbolTable, BUFFER_TYPES, byteView
+
+
+class ParseError(ValueError):
+    """
+    Syntax error of the input:
+        position    - index of the offending token, the length of the input at its end,
+                      None if the engine does not know it
+        expected    - names of terminals that are valid at the position, None is the end of the input
+        found       - name of the offending token, None at the end of the input
+        nonterminal - name of the nonterminal that could not be predicted, or None
+    Parsers return these errors from diagnose, LLKStreamParser raises them
+    """
+
+    def __init__(self, position : Optional[int], expected : Iterable[Optional[str]] = (),
+                 found : Optional[str] = None, nonterminal : Optional[str] = None) -> None:
+        self.position = position
+        self.expected = frozenset(expected)
+        self.found = found
+        self.nonterminal = nonterminal
+        super().__init__(self.message())
+
+    def __reduce__(self):
+        return ParseError, (self.position, self.expected, self.found, self.nonterminal)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ParseError) and self.asDict() == other.asDict()
+
+    def __hash__(self) -> int:
+        return hash((self.position, self.expected, self.found, self.nonterminal))
+
+    def message(self) -> str:
+        if self.position is None:
+            return 'syntax error'
+        found = 'end of input' if self.found is None else repr(self.found)
+        ans = f'syntax error at {self.position}: unexpected {found}'
+        if self.expected:
+            names = sorted('end of input' if x is None else repr(x) for x in self.expected)
+            ans += ', expected ' + ' or '.join(names)
+        if self.nonterminal is not None:
+            ans += f' while parsing {self.nonterminal}'
+        return ans
+
+    def asDict(self) -> Dict:
+        return {
+            'position': self.position,
+            'expected': sorted(self.expected, key=lambda x: (x is not None, x or '')),
+            'found': self.found,
+            'nonterminal': self.nonterminal,
+        }
+
+
+def tokenName(string, pos : int) -> Optional[str]:
+    """
+    returns the name of the token at pos of a string, a bytes-like input or a list of terminal ids, None at the end
+    """
+    if isinstance(string, BUFFER_TYPES):
+        string = byteView(string)
+        return chr(string[pos]) if pos < len(string) else None
+    if string is None or pos >= len(string):
+        return None
+    token = string[pos]
+    if isinstance(token, str):
+        return token
+    if 0 <= token < len(SymbolTable.symbols):
+        return SymbolTable.symbols[token].name()
+    return str(token)
+
+
+def codeName(table, code : int) -> Optional[str]:
+    """
+    returns the name of the terminal code of a compiled table, None for the end of the input
+    """
+    if code == table.end:
+        return None
+    return table.terminals[code].name() if code < table.end else '?'
+
+
+def tableError(table, string, pos : int, codes : Iterable[int], nonterminal = None) -> ParseError:
+    """
+    error of a compiled table (TerminalCodes) at pos of the input, codes are valid terminal codes
+    """
+    expected = [None if c == table.end else table.terminals[c].name() for c in codes if c != table.unknown]
+    return ParseError(pos, expected, tokenName(string, pos), None if nonterminal is None else nonterminal.name())
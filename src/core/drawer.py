@@ -1,13 +1,21 @@
-from core.grammar import Grammar, Terminal, NonTerminal, BaseSymbol, Rule
-from typing import List, Tuple
-from core.llk import LLKParserWrapped
-import graphviz
+from core.grammar import Terminal, BaseSymbol, Rule, SymbolTable
+from core.tree import ParseTree
+from typing import List, Union, TextIO, Iterator, Tuple
+import json
+import subprocess
 
 class Visualiser:
+    """
+    Draws parse trees.
+    draw renders a small tree with graphviz and opens it, write_dot and write_json
+    stream a tree of any size to a file and render runs graphviz dot in a subprocess.
+    graphviz python package is needed only for draw.
+    """
+
     def __init__(self):
-        pass 
+        pass
 
-    def add(self, val : BaseSymbol) -> int:
+    def add(self, node : int, val : BaseSymbol) -> None:
 
         name = str(val)
         clr = None
@@ -16,30 +24,159 @@ class Visualiser:
             name = "'" + name + "'" +  ' (' + str(self.terminal_counter) + ')'
             clr = 'Red'
 
-        self.dot.node(str(self.counter), name, color = clr)
-        self.counter += 1
-        return val, self.counter - 1
-
-    def build_tree(self, vertex : Tuple[BaseSymbol, int]) -> int:
-
-        if isinstance(vertex[0], Terminal) :
-            return vertex[1]
+        self.dot.node(str(node), name, color = clr)
 
-        if len(self.order) == 0:
-            return 
-        rule = self.order.pop(0)
-        for x in rule.en:
-            self.dot.edge(str(vertex[1]), str(self.build_tree(self.add(x))))
+    def build_tree(self, tree : ParseTree) -> None:
+        """
+        adds nodes of the tree in preorder, so terminals are numbered from left to right
+        """
+        for node in tree.preorder():
+            self.add(node, SymbolTable.symbols[tree.symbol[node]])
+            for child in tree.children(node):
+                self.dot.edge(str(node), str(child))
 
-        return vertex[1]
+    @staticmethod
+    def toTree(order : Union[List[Rule], ParseTree], rightmost : bool = False) -> ParseTree:
+        return order if isinstance(order, ParseTree) else ParseTree.fromRules(order, rightmost=rightmost)
 
-    def draw(self, order : List[Rule]):
-        self.counter = 0
+    def draw(self, order : Union[List[Rule], ParseTree], rightmost : bool = False):
+        """
+        order is a parse tree or rules of the leftmost (or rightmost) derivation
+        """
+        import graphviz
+        tree = Visualiser.toTree(order, rightmost)
         self.terminal_counter = 0
-        self.order = order
-        self.dot = graphviz.Digraph('parsing result')  
-        self.build_tree(self.add(order[0].st))
+        self.dot = graphviz.Digraph('parsing result')
+        self.build_tree(tree)
 
         self.dot.render('dot', format='png', view=True)
 
+    @staticmethod
+    def walk(tree : ParseTree, max_depth : int = None, collapse_eps : bool = False,
+             collapse_repeated : bool = False) -> Iterator[Tuple[int, int, str, int]]:
+        """
+        yields (node, parent, kind, same) for nodes to write in preorder, kind is
+            'node'  - node with its children, they follow it and then (node, parent, 'end', -1) is yielded
+            'leaf'  - terminal leaf
+            'cut'   - node at max_depth, its children are not written
+            'eps'   - with collapse_eps, nonterminal that derives the empty string, eps leaves are skipped
+            'same'  - with collapse_repeated, subtree equal to the subtree of the node `same` written before
+        """
+        terminal = SymbolTable.terminal
+        keys = None
+        if collapse_repeated:
+            # equal subtrees get equal keys, children are created after parents
+            keys = [0] * len(tree)
+            interned = {}
+            for node in range(len(tree) - 1, -1, -1):
+                key = (tree.symbol[node], tree.rule[node], tuple(keys[x] for x in tree.children(node)))
+                keys[node] = interned.setdefault(key, len(interned))
+        written = {}
+        stack = [(0, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            if node < 0:
+                yield ~node, parent, 'end', -1
+                continue
+            sid = tree.symbol[node]
+            if terminal[sid]:
+                if not (collapse_eps and sid == SymbolTable.EPS):
+                    yield node, parent, 'leaf', -1
+                continue
+            if collapse_eps and tree.start[node] == tree.end[node]:
+                yield node, parent, 'eps', -1
+                continue
+            if keys is not None:
+                if keys[node] in written:
+                    yield node, parent, 'same', written[keys[node]]
+                    continue
+                written[keys[node]] = node
+            if max_depth is not None and depth >= max_depth and tree.first_child[node] >= 0:
+                yield node, parent, 'cut', -1
+                continue
+            yield node, parent, 'node', -1
+            stack.append((~node, parent, depth))
+            stack.extend((x, node, depth + 1) for x in reversed(list(tree.children(node))))
+
+    @staticmethod
+    def openOutput(f : Union[str, TextIO]):
+        return (open(f, 'w'), True) if isinstance(f, str) else (f, False)
+
+    def write_dot(self, tree : Union[List[Rule], ParseTree], f : Union[str, TextIO], max_depth : int = None,
+                  collapse_eps : bool = False, collapse_repeated : bool = False, rightmost : bool = False) -> None:
+        """
+        writes the tree in DOT format to the file or path line by line,
+        see walk for max_depth, collapse_eps and collapse_repeated
+        """
+        tree = Visualiser.toTree(tree, rightmost)
+        f, owned = Visualiser.openOutput(f)
+        try:
+            f.write('digraph "parsing result" {\n')
+            for node, parent, kind, same in Visualiser.walk(tree, max_depth, collapse_eps, collapse_repeated):
+                if kind == 'end':
+                    continue
+                name = str(SymbolTable.symbols[tree.symbol[node]])
+                attributes = ''
+                if kind == 'leaf':
+                    # terminals are numbered by their position, eps leaves are not numbered
+                    if tree.start[node] < tree.end[node]:
+                        name = f"'{name}' ({tree.end[node]})"
+                    attributes = ' color=Red'
+                elif kind == 'cut':
+                    name += ' ...'
+                    attributes = ' style=dashed'
+                elif kind == 'eps':
+                    name += ' -> eps'
+                    attributes = ' style=dashed'
+                elif kind == 'same':
+                    name += f' (= {same})'
+                    attributes = ' style=dashed'
+                f.write(f'\t{node} [label={json.dumps(name)}{attributes}]\n')
+                if parent >= 0:
+                    f.write(f'\t{parent} -> {node}\n')
+            f.write('}\n')
+        finally:
+            if owned:
+                f.close()
+
+    def write_json(self, tree : Union[List[Rule], ParseTree], f : Union[str, TextIO], max_depth : int = None,
+                   collapse_eps : bool = False, collapse_repeated : bool = False, rightmost : bool = False) -> None:
+        """
+        writes the tree to the file or path incrementally as a flat JSON array of nodes 
+        in preorder, so it loads back whatever the depth is. Node is
+        [id, symbol, rule, start, end, parent, collapsed], rule is -1 for leaves, parent is -1 for the root,
+        collapsed is null, 'cut', 'eps' or id of the equal node written before, see walk
+        """
+        tree = Visualiser.toTree(tree, rightmost)
+        f, owned = Visualiser.openOutput(f)
+        names = {}
+        collapsed = {'node': 'null', 'leaf': 'null', 'cut': '"cut"', 'eps': '"eps"'}
+        separator = '['
+        try:
+            for node, parent, kind, same in Visualiser.walk(tree, max_depth, collapse_eps, collapse_repeated):
+                if kind == 'end':
+                    continue
+                sid = tree.symbol[node]
+                if sid not in names:
+                    names[sid] = json.dumps(SymbolTable.symbols[sid].name())
+                mark = same if kind == 'same' else collapsed[kind]
+                f.write(f'{separator}\n[{node}, {names[sid]}, {tree.rule[node]}, {tree.start[node]}, {tree.end[node]}, {parent}, {mark}]')
+                separator = ','
+            f.write(']\n' if separator == ',' else '[]\n')
+        finally:
+            if owned:
+                f.close()
 
+    @staticmethod
+    def render(path : str, format : str = 'png', output : str = None, background : bool = True):
+        """
+        renders the DOT file with graphviz dot into output (path.format by default).
+        With background the subprocess is returned at once, call wait() to get its exit code,
+        otherwise raises CalledProcessError if dot fails
+        """
+        if output is None:
+            output = f'{path}.{format}'
+        command = ['dot', f'-T{format}', path, '-o', output]
+        if background:
+            return subprocess.Popen(command, stdin=subprocess.DEVNULL)
+        subprocess.run(command, check=True, stdin=subprocess.DEVNULL)
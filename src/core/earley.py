@@ -0,0 +1,231 @@
+from core.iparser import IParser
+from core.instrumentation import timer
+from core.diagnostics import ParseError, tokenName
+from core.grammar import Grammar, Rule, SymbolTable, inputIds
+from typing import List, Tuple, Dict
+
+
+class EarleyParser(IParser):
+    """
+    General context-free parser based on the Earley chart.
+    Accepts every grammar that Grammar.read accepts, including ambiguous
+    and left recursive ones. Works in cubic time in the worst case and
+    in linear time for LR-regular grammars: nullable nonterminals are
+    skipped as in Aycock & Horspool and right recursion is completed
+    through Leo items.
+
+    Item is a tuple (rule, dot, origin), every chart set maps its items
+    to the back pointer of the first way the item was derived:
+        None                            - predicted item
+        ('s', pred)                     - pred from the previous set scanned a terminal
+        ('c', pred, origin, child)      - pred from set origin completed by child
+        ('n', pred, symbol)             - pred skipped nullable symbol
+        ('l', child)                    - Leo item completed by child
+    Chart is seeded with the augmented rule [start] -> S, it is never part of 
+    a Leo path, so the accepting item is always present in the last set.
+    parse returns the leftmost derivation of one of the parse trees.
+    """
+
+    __slots__ = ['grammar', 'rules', 'lhs', 'rhs', 'by_lhs', 'eps_rule', 'start',
+                 'sets', 'waiting', 'leo']
+
+    def __init__(self, grammar : Grammar = None):
+        if grammar is not None:
+            self.init(grammar)
+
+    def init(self, grammar : Grammar) -> None:
+        with timer(self.instrumentation, self, 'prepare'):
+            self.prepare(grammar)
+
+    def prepare(self, grammar : Grammar) -> None:
+        grammar = grammar.freeze()
+        self.grammar = grammar
+        self.rules = grammar.rules
+        self.lhs = [rule.lhs for rule in self.rules]
+        self.rhs = [tuple(x for x in rule.rhs if x != SymbolTable.EPS) for rule in self.rules]
+        self.by_lhs = grammar.rules_by_lhs()
+
+        # eps_rule[A] is a rule of nullable A whose right part derives eps through earlier rules
+        self.eps_rule = {}
+        changed = True
+        while changed:
+            changed = False
+            for i, rhs in enumerate(self.rhs):
+                if self.lhs[i] not in self.eps_rule and all(x in self.eps_rule for x in rhs):
+                    self.eps_rule[self.lhs[i]] = i
+                    changed = True
+
+        self.start = len(self.rules)
+        self.lhs.append(-1)
+        self.rhs.append((grammar.start_symbol.id,))
+
+    def leo_item(self, origin : int, symbol : int):
+        """
+        returns the topmost item of the deterministic reduction path
+        above set origin for the given symbol, or None
+        """
+        path = []
+        ans = None
+        while True:
+            memo = self.leo[origin]
+            if symbol in memo:
+                ans = memo[symbol]
+                break
+            memo[symbol] = None
+            waiting = self.waiting[origin].get(symbol, ())
+            if len(waiting) != 1:
+                break
+            rule, dot, item_origin = waiting[0]
+            if dot + 1 != len(self.rhs[rule]):
+                break
+            ans = (rule, dot + 1, item_origin)
+            path.append((origin, symbol, ans))
+            origin, symbol = item_origin, self.lhs[rule]
+        for set_index, sym, item in reversed(path):
+            if ans is None:
+                ans = item
+            self.leo[set_index][sym] = ans
+        return ans
+
+    def recognize(self, s : str) -> bool:
+        codes = inputIds(s)
+        n = len(codes)
+        terminal = SymbolTable.terminal
+        rhs, lhs, by_lhs, eps_rule = self.rhs, self.lhs, self.by_lhs, self.eps_rule
+        self.sets = [dict() for _ in range(n + 1)]
+        self.waiting = [dict() for _ in range(n + 1)]
+        self.leo = [dict() for _ in range(n + 1)]
+        self.sets[0][(self.start, 0, 0)] = None
+
+        for j in range(n + 1):
+            chart = self.sets[j]
+            waiting = self.waiting[j]
+            following = self.sets[j + 1] if j < n else None
+            code = codes[j] if j < n else -1
+            if not chart:
+                return False
+            items = list(chart)
+            predicted = set()
+            i = 0
+            while i < len(items):
+                item = items[i]
+                i += 1
+                rule, dot, origin = item
+                right = rhs[rule]
+                if dot < len(right):
+                    symbol = right[dot]
+                    if terminal[symbol]:
+                        if symbol == code:
+                            nxt = (rule, dot + 1, origin)
+                            if nxt not in following:
+                                following[nxt] = ('s', item)
+                        continue
+                    waiting.setdefault(symbol, []).append(item)
+                    if symbol not in predicted:
+                        predicted.add(symbol)
+                        for other in by_lhs.get(symbol, ()):
+                            nxt = (other, 0, j)
+                            if nxt not in chart:
+                                chart[nxt] = None
+                                items.append(nxt)
+                    if symbol in eps_rule:
+                        nxt = (rule, dot + 1, origin)
+                        if nxt not in chart:
+                            chart[nxt] = ('n', item, symbol)
+                            items.append(nxt)
+                    continue
+                if origin == j:
+                    # completions over empty span are done by skipping nullable symbols
+                    continue
+                top = self.leo_item(origin, lhs[rule])
+                if top is not None:
+                    if top not in chart:
+                        chart[top] = ('l', item)
+                        items.append(top)
+                    continue
+                for pred in self.waiting[origin].get(lhs[rule], ()):
+                    nxt = (pred[0], pred[1] + 1, pred[2])
+                    if nxt not in chart:
+                        chart[nxt] = ('c', pred, origin, item)
+                        items.append(nxt)
+
+        return (self.start, 1, 0) in self.sets[n]
+
+    def justify(self, item : Tuple[int, int, int], j : int, virtual : Dict):
+        """
+        returns the back pointer of the item from set j,
+        completions skipped by Leo items are restored into virtual
+        """
+        if (item, j) in virtual:
+            return virtual[(item, j)]
+        pointer = self.sets[j][item]
+        if pointer is None or pointer[0] != 'l':
+            return pointer
+        child = pointer[1]
+        while True:
+            origin = child[2]
+            pred = self.waiting[origin][self.lhs[child[0]]][0]
+            nxt = (pred[0], pred[1] + 1, pred[2])
+            virtual[(nxt, j)] = ('c', pred, origin, child)
+            if nxt == item:
+                return virtual[(nxt, j)]
+            child = nxt
+
+    def derivation(self, n : int) -> List[int]:
+        ans = []
+        virtual = {}
+        stack = [((self.start, 1, 0), n)]
+        while stack:
+            item, j = stack.pop()
+            if j < 0:
+                # item is a nullable symbol deriving eps
+                rule = self.eps_rule[item]
+                ans.append(rule)
+                stack.extend((x, -1) for x in reversed(self.rhs[rule]))
+                continue
+            if item[0] != self.start:
+                ans.append(item[0])
+            children = []
+            while item[1] > 0:
+                pointer = self.justify(item, j, virtual)
+                if pointer[0] == 's':
+                    item, j = pointer[1], j - 1
+                elif pointer[0] == 'c':
+                    children.append((pointer[3], j))
+                    item, j = pointer[1], pointer[2]
+                else:
+                    children.append((pointer[2], -1))
+                    item = pointer[1]
+            stack.extend(children)
+        return ans
+
+    def run(self, s : str, stats) -> bool:
+        ans = self.recognize(s)
+        if stats is not None:
+            stats['items'] = sum(len(x) for x in self.sets)
+        return ans
+
+    def diagnose(self, s : str, recover : bool = False) -> List[ParseError]:
+        """
+        the error is at the last token that is reached by some item, 
+        expected terminals are those after dots of items of its set
+        """
+        if self.recognize(s):
+            return []
+        j = max(i for i, chart in enumerate(self.sets) if chart)
+        terminal = SymbolTable.terminal
+        expected = {
+            SymbolTable.symbols[self.rhs[rule][dot]].name()
+            for rule, dot, _ in self.sets[j] if dot < len(self.rhs[rule]) and terminal[self.rhs[rule][dot]]
+        }
+        if (self.start, 1, 0) in self.sets[j]:
+            expected.add(None)
+        return [ParseError(j, expected, tokenName(s, j))]
+
+    def verify(self, s : str) -> bool:
+        return self.measured('verify', s, lambda stats: self.run(s, stats))
+
+    def parse(self, s : str) -> List[Rule]:
+        if not self.measured('parse', s, lambda stats: self.run(s, stats)):
+            return []
+        return [self.rules[x] for x in self.derivation(len(s))]
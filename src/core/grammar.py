@@ -1,37 +1,107 @@
-from typing import Tuple, Set, TextIO, Union, List
+from typing import Tuple, Set, TextIO, Union, List, Dict, Iterator, FrozenSet, Callable
 from copy import copy, deepcopy
+import hashlib
+import mmap
+
+class SymbolTable:
+    """
+    Process-wide table of interned symbols.
+    Every Terminal and NonTerminal is created only once and gets a small int id,
+    rules, lookahead sets and parse tables are stored in terms of these ids.
+    """
+
+    symbols : List['BaseSymbol'] = []
+    terminal : List[bool] = []
+    index : Dict[Tuple[type, str], int] = {}
+    EPS : int
+
+    @staticmethod
+    def register(symbol : 'BaseSymbol', key : Tuple[type, str]) -> int:
+        SymbolTable.index[key] = len(SymbolTable.symbols)
+        SymbolTable.symbols.append(symbol)
+        SymbolTable.terminal.append(isinstance(symbol, Terminal))
+        return SymbolTable.index[key]
+
+    @staticmethod
+    def lookup(cls : type, symbol : str) -> int:
+        """
+        Returns id of already interned symbol or -1, never creates new symbols
+        """
+        return SymbolTable.index.get((cls, symbol), -1)
+
+    @staticmethod
+    def resolve(ids : Tuple[int, ...]) -> Tuple['BaseSymbol', ...]:
+        symbols = SymbolTable.symbols
+        return tuple(symbols[x] for x in ids)
+
 
 class BaseSymbol:
     """
     Basic token. Could be Terminal or NonTerminal.
+    Symbols are interned: constructing the same symbol twice returns the same object.
+    Names are checked by validate unless check is False, as for quoted terminals of
+    grammar files and literals of the lexer, which can be any text.
     """
 
-    __slots__ = ['symbol']
+    __slots__ = ['symbol', 'id']
 
-    def __init__(self, symbol : str) -> None:
+    def __new__(cls, symbol : str, check : bool = True) -> 'BaseSymbol':
+        sid = SymbolTable.index.get((cls, symbol))
+        if sid is not None:
+            return SymbolTable.symbols[sid]
+        if check:
+            cls.validate(symbol)
+        self = super().__new__(cls)
         if len(symbol) > 1: 
-            symbol = f'[{symbol}]'
-        self.symbol = symbol
+            self.symbol = f'[{symbol}]'
+        else:
+            self.symbol = symbol
+        self.id = SymbolTable.register(self, (cls, symbol))
+        return self
+
+    @staticmethod
+    def validate(symbol : str) -> None:
+        pass
+
+    def name(self) -> str:
+        """
+        Returns the string this symbol was created from
+        """
+        return self.symbol[1:-1] if len(self.symbol) > 1 else self.symbol
     
     def __repr__(self) -> str:
         return self.symbol
 
     def __eq__(self, other : object) -> bool:
+        if self is other:
+            return True
         if not isinstance(other, BaseSymbol):
             return False
-        return self.symbol == other.symbol
+        # a quoted terminal can have the name of a nonterminal
+        return self.symbol == other.symbol and SymbolTable.terminal[self.id] == SymbolTable.terminal[other.id]
 
     def __hash__(self) -> int:
         return hash(self.symbol)
 
+    def __copy__(self) -> 'BaseSymbol':
+        return self
+
+    def __deepcopy__(self, memo) -> 'BaseSymbol':
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self.name(), False)
+
 class NonTerminal(BaseSymbol):
     """
     Symbols that could produce rules
     """
 
-    def __init__(self, symbol: str) -> None:
+    __slots__ = []
+
+    @staticmethod
+    def validate(symbol : str) -> None:
         assert symbol[0].isupper(), 'nonterminals should start from uppercase characters'
-        super().__init__(symbol)
 
     def isEpsilon(self):
         return False
@@ -41,12 +111,16 @@ class Terminal(BaseSymbol):
     Symbols that are terminal
     """
 
-    def __init__(self, symbol : str) -> None:
+    __slots__ = []
+
+    @staticmethod
+    def validate(symbol : str) -> None:
         assert symbol.islower() or not symbol.isalpha(), 'terminals MUST be lowercase'
-        super().__init__(symbol)
     
     def isEpsilon(self):
-        return self.symbol == "[eps]"
+        return self.id == SymbolTable.EPS
+
+SymbolTable.EPS = Terminal("eps").id
 
 class SymbolUtils:
     @staticmethod
@@ -68,15 +142,35 @@ class SymbolUtils:
 class Rule:
     """
     Rule of from A -> [Terminal|NonTerminal]*
-    Flyweight pattern in use, we don't store references to provided arguments, and 
-    you should not store references to returned values. 
+    Rule is stored packed: lhs is the id of the left part and rhs is the tuple of ids 
+    of the right part, st and en are views over interned symbols.
+    Rules are values, you should not modify rules that are stored in a grammar.
     """
 
-    __slots__ = ['st', 'en']
+    __slots__ = ['lhs', 'rhs']
 
     def __init__(self, st : NonTerminal, en : Tuple[BaseSymbol, ...]) -> None:
-        self.st = copy(st)
-        self.en = deepcopy(en)
+        self.lhs = st.id
+        self.rhs = tuple(x.id for x in en)
+
+    @staticmethod
+    def fromIds(lhs : int, rhs : Tuple[int, ...]) -> 'Rule':
+        rule = Rule.__new__(Rule)
+        rule.lhs = lhs
+        rule.rhs = rhs
+        return rule
+
+    @property
+    def st(self) -> NonTerminal:
+        return SymbolTable.symbols[self.lhs]
+
+    @property
+    def en(self) -> Tuple[BaseSymbol, ...]:
+        return SymbolTable.resolve(self.rhs)
+
+    @en.setter
+    def en(self, en : Tuple[BaseSymbol, ...]) -> None:
+        self.rhs = tuple(x.id for x in en)
 
     def __contains__ (self, symbol : BaseSymbol) -> bool:
         return symbol in self.en 
@@ -88,18 +182,18 @@ class Rule:
         return f"{self.st} -> {''.join([str(x) for x in self.en] if len(self.en) > 0 else '[eps]')}"
 
     def isEpsilon(self, bad_set : Set ) -> bool:
-        return self.en[0].isEpsilon() or len(list(filter(lambda x : x not in bad_set, self.en))) == 0
+        return not self.rhs or self.rhs[0] == SymbolTable.EPS or len(list(filter(lambda x : x not in bad_set, self.en))) == 0
     
     def __eq__(self, other) -> bool:
         if not isinstance(other, Rule): return False 
-        if len(self.en) != len(other.en): return False
-        for i, x in enumerate(self.en):
-            if x != other.en[i]:
-                return False 
-        return self.st == other.st
+        return self.lhs == other.lhs and self.rhs == other.rhs
     
     def __hash__(self):
-        return hash(str(self.st) + '->' + ''.join(str(x) for x in self.en))
+        return hash((self.lhs, self.rhs))
+
+    def __reduce__(self):
+        # ids are local to the process, symbols are pickled by their names
+        return Rule, (self.st, self.en)
     
 
 
@@ -108,19 +202,22 @@ class Grammar:
     non_terms : Set[NonTerminal]
     terms : Set[Terminal]
     start_symbol : NonTerminal
-    rules : Set[Rule]
+    rules : List[Rule]
 
     """
     Basic class for grammar entity. 
-    Flyweight pattern in use, we don't store references to provided arguments, and 
-    you should not store references to returned values. 
+    Symbols are interned and rules are values, so grammar shares them 
+    instead of copying, but it never stores references to provided containers.
+    Rules are kept in order, so rule numbering is the same from run to run.
     """
 
-    def __init__ (self, nonterminals : Set[NonTerminal], terminals : Set[Terminal], rules : Set[Rule], start_symbol=NonTerminal("S")) -> None:
-        self.terms = deepcopy(terminals)
-        self.non_terms = deepcopy(nonterminals)
+    def __init__ (self, nonterminals : Set[NonTerminal], terminals : Set[Terminal], rules : List[Rule], start_symbol=NonTerminal("S")) -> None:
+        self.terms = set(terminals)
+        self.non_terms = set(nonterminals)
         self.vocab = self.terms | self.non_terms
-        self.rules = deepcopy(rules)
+        self.rules = list(rules)
+        # rules are deduplicated by add_rule with this set
+        self.rule_set = set(self.rules)
         self.start_symbol = start_symbol
 
     @staticmethod
@@ -155,54 +252,340 @@ class Grammar:
         return Grammar(
                 set([x for x in vocab if isinstance(x, NonTerminal)]), 
                 set([x for x in vocab if isinstance(x, Terminal)]),
-                set(rules)
+                list(dict.fromkeys(rules))
             )
 
 
+    def nullable(self) -> FrozenSet[int]:
+        """
+        ids of nonterminals that derive the empty string.
+        Worklist over rules: every rule counts its symbols that are not known to be nullable,
+        a nonterminal that becomes nullable decrements the rules it occurs in
+        """
+        def compute():
+            terminal = SymbolTable.terminal
+            pending = []
+            occurrences = {}
+            ans = set()
+            worklist = []
+            for i, rule in enumerate(self.rules):
+                symbols = [x for x in rule.rhs if x != SymbolTable.EPS]
+                if any(terminal[x] for x in symbols):
+                    pending.append(-1)
+                    continue
+                pending.append(len(symbols))
+                for x in symbols:
+                    occurrences.setdefault(x, []).append(i)
+                if not symbols and rule.lhs not in ans:
+                    ans.add(rule.lhs)
+                    worklist.append(rule.lhs)
+            while worklist:
+                nterm = worklist.pop()
+                for i in occurrences.get(nterm, ()):
+                    if pending[i] > 0:
+                        pending[i] -= 1
+                        lhs = self.rules[i].lhs
+                        if pending[i] == 0 and lhs not in ans:
+                            ans.add(lhs)
+                            worklist.append(lhs)
+            return frozenset(ans)
+        return self.memoized('nullable', compute)
+
     def find_creatures(self):
-        bad_set = set()
+        return [SymbolTable.symbols[x] for x in self.nullable()]
 
-        while True:
-            start_size = len(bad_set)
-            for rule in self.rules:
-                if rule.isEpsilon(bad_set):
-                    bad_set.add(rule.st)
+    def binarize(self, min_nullable : int = 0) -> 'Grammar':
+        """
+        Returns the grammar where right parts longer than two symbols that have more than min_nullable
+        nullable symbols are split into chains of rules of two symbols: rule number r A -> XYZ becomes
+        A -> X A[r.1], A[r.1] -> YZ
+        """
+        nullable = self.nullable()
+        terminal = SymbolTable.terminal
+        rules = []
+        for num, rule in enumerate(self.rules):
+            rhs = rule.rhs
+            if len(rhs) <= 2 or sum(1 for x in rhs if not terminal[x] and x in nullable) <= min_nullable:
+                rules.append(rule)
+                continue
+            lhs = rule.lhs
+            name = rule.st.name()
+            for i in range(len(rhs) - 2):
+                tail = NonTerminal(f'{name}[{num}.{i + 1}]').id
+                rules.append(Rule.fromIds(lhs, (rhs[i], tail)))
+                lhs = tail
+            rules.append(Rule.fromIds(lhs, rhs[-2:]))
+        return Grammar.fromRules(rules, self.start_symbol)
 
-            if start_size == len(bad_set):
-                break
-    
+    @staticmethod
+    def fromRules(rules : List[Rule], start_symbol : 'NonTerminal' = None) -> 'Grammar':
+        """
+        grammar of the rules without duplicates, in order of their first occurrence,
+        its vocabulary is made of symbols of the rules
+        """
+        rules = list(dict.fromkeys(rules))
+        ids = {x for rule in rules for x in (rule.lhs,) + rule.rhs}
+        symbols = [SymbolTable.symbols[x] for x in ids]
+        return Grammar(
+            {x for x in symbols if isinstance(x, NonTerminal)},
+            {x for x in symbols if isinstance(x, Terminal)},
+            rules, NonTerminal('S') if start_symbol is None else start_symbol
+        )
 
-        return list(bad_set)
+    def remove_eps_rules(self, binarize : bool = False) -> 'Grammar':
+        """
+        Returns the grammar without epsilon rules: every rule is replaced with its variants 
+        where any subset of nullable symbols is dropped (the empty string itself is not derived).
+        A rule with n distinct nullable symbols can have 2^n variants, with binarize rules with more than 
+        two nullable symbols are split by binarize first, so the result is linear in the size of the grammar.
+        Variants A -> A are dropped, they do not change the language
+        """
+        source = self.binarize(2) if binarize else self
+        nullable = source.nullable()
+        rules = []
+        for rule in source.rules:
+            variants = [()]
+            for x in rule.rhs:
+                if x == SymbolTable.EPS:
+                    continue
+                if x in nullable:
+                    # equal variants are merged at once, so runs of one symbol stay polynomial
+                    variants = list(dict.fromkeys(variants + [v + (x,) for v in variants]))
+                else:
+                    variants = [v + (x,) for v in variants]
+            for rhs in variants:
+                if rhs and rhs != (rule.lhs,):
+                    rules.append(Rule.fromIds(rule.lhs, rhs))
+        return Grammar.fromRules(rules, self.start_symbol)
 
-    def remove_eps_rules(self):
-        creatures = self.find_creatures()
-        ret = Grammar(set(), set(), [])
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the grammar: start symbol and rules in their order,
+        it does not depend on symbol ids, so it is the same in every process.
+        Rule numbers of compiled tables are positions in rules, so order matters.
+        """
+        digest = hashlib.sha256()
+        digest.update(self.start_symbol.name().encode())
         for rule in self.rules:
-            creatures_in_rule = [x for x in range(len(rule.en)) if rule.en[x] in creatures]
-            ln = len(creatures_in_rule)
-            for mask in range(1 << ln):
-                nf = []
-                for i in range(len(rule.en)):
-                    if i in creatures_in_rule:
-                        pos = creatures_in_rule.index(i)
-                        if mask & 1 << pos:
-                            nf.append(copy(rule.en[i]))
-                    else:
-                        nf.append(copy(rule.en[i]))
-                rule_to_add = Rule(copy(rule.st), nf)
-                if not rule_to_add.isEpsilon(set()):
-                    ret.add_rule(rule_to_add)
-        return ret
+            digest.update(b'\x01')
+            for sid in (rule.lhs,) + rule.rhs:
+                digest.update(b'\x00t' if SymbolTable.terminal[sid] else b'\x00n')
+                digest.update(SymbolTable.symbols[sid].name().encode())
+        return digest.hexdigest()
+
+    def memoized(self, key, compute : Callable):
+        """
+        Returns compute(), grammar may change, so nothing is memoized, see FrozenGrammar
+        """
+        return compute()
+
+    def freeze(self) -> 'FrozenGrammar':
+        return FrozenGrammar(self)
 
     def add_rule(self, rule:Rule):
-        for other in self.rules:
-            if other == rule:
-                return
-        for x in [rule.st] + rule.en:
+        if rule in self.rule_set:
+            return
+        self.rule_set.add(rule)
+        for x in (rule.st,) + rule.en:
             if not x in self.vocab:
-                self.vocab.add(copy(x))
+                self.vocab.add(x)
                 if isinstance(x, Terminal):
-                    self.terms.add(copy(x))
+                    self.terms.add(x)
                 else:
-                    self.non_terms.add(copy(x))
-        self.rules.append(rule)
\ No newline at end of file
+                    self.non_terms.add(x)
+        self.rules.append(rule)
+
+
+class FrozenGrammar(Grammar):
+    """
+    Immutable form of a grammar, made by Grammar.freeze().
+    Fingerprint is computed once and derived analyses are computed on first use 
+    and memoized: nullable set, rules by left part, epsilon-free form here and 
+    FIRST_k/FOLLOW_k for every k in lookaheadUtils. Every parser built from the same
+    frozen grammar shares them, so build every engine from one FrozenGrammar.
+    """
+
+    def __init__(self, grammar : Grammar) -> None:
+        self.terms = frozenset(grammar.terms)
+        self.non_terms = frozenset(grammar.non_terms)
+        self.vocab = self.terms | self.non_terms
+        self.rules = tuple(grammar.rules)
+        self.rule_set = frozenset(self.rules)
+        self.start_symbol = grammar.start_symbol
+        self.memo = {}
+        self.digest = Grammar.fingerprint(self)
+
+    def fingerprint(self) -> str:
+        return self.digest
+
+    def memoized(self, key, compute : Callable):
+        """
+        Returns compute() computed once per key, the result is shared and should not be modified
+        """
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    def freeze(self) -> 'FrozenGrammar':
+        return self
+
+    def add_rule(self, rule : Rule):
+        raise TypeError('FrozenGrammar is immutable')
+
+    def rules_by_lhs(self) -> Dict[int, Tuple[int, ...]]:
+        """
+        maps id of every nonterminal to the numbers of its rules
+        """
+        def compute():
+            ans = {x.id: [] for x in self.non_terms}
+            for i, rule in enumerate(self.rules):
+                ans[rule.lhs].append(i)
+            return {x: tuple(y) for x, y in ans.items()}
+        return self.memoized('rules_by_lhs', compute)
+
+    def remove_eps_rules(self, binarize : bool = False) -> 'FrozenGrammar':
+        return self.memoized(('eps_free', binarize), lambda: Grammar.remove_eps_rules(self, binarize).freeze())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FrozenGrammar) and self.digest == other.digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __getstate__(self):
+        # analyses are cheap to recompute compared to sending them to other processes
+        state = dict(self.__dict__)
+        state['memo'] = {}
+        return state
+
+
+# bytes-like inputs, their bytes are ASCII characters
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def byteView(buffer) -> memoryview:
+    """
+    memoryview of the unsigned bytes of a bytes-like input, the buffer is not copied
+    """
+    view = memoryview(buffer)
+    return view if view.format == 'B' and view.ndim == 1 else view.cast('B')
+
+
+def byteIds() -> List[int]:
+    """
+    returns ids of single character ASCII terminals by their byte values, -1 for the other bytes
+    """
+    return [SymbolTable.lookup(Terminal, chr(b)) if b < 128 else -1 for b in range(256)]
+
+
+def inputIds(string) -> List[int]:
+    """
+    returns ids of terminals of a string, a bytes-like input or a sequence of terminal ids,
+    -1 for characters that are not terminals
+    """
+    if isinstance(string, str):
+        return [SymbolTable.lookup(Terminal, ch) for ch in string]
+    if isinstance(string, BUFFER_TYPES):
+        ids = byteIds()
+        return [ids[b] for b in byteView(string)]
+    return list(string)
+
+
+class TerminalCodes:
+    """
+    Dense int codes of terminals of a grammar, used by compiled parse tables.
+    Terminals get codes 0..T-1 in order of their symbols, code T is the end of the input 
+    and code T + 1 is any symbol that is not a terminal of the grammar, 
+    rows of compiled tables are `width` = T + 2 cells.
+    Input is a string of single character terminals, a sequence of terminal ids,
+    as produced by Lexer.tokenize for multi-character terminals, or a bytes-like object
+    (bytes, bytearray, memoryview, mmap) of ASCII characters.
+    byte_codes maps byte values to codes, byte_table is the same map for bytes.translate
+    when all codes fit in a byte, otherwise None.
+    """
+
+    __slots__ = ['terminals', 'codes', 'ids', 'end', 'unknown', 'width', 'byte_codes', 'byte_table']
+
+    def __init__(self, grammar : Grammar) -> None:
+        self.terminals = sorted((x for x in grammar.terms if not x.isEpsilon()), key=lambda x: x.symbol)
+        self.end = len(self.terminals)
+        self.unknown = self.end + 1
+        self.width = self.end + 2
+        self.codes = {x.name(): i for i, x in enumerate(self.terminals)}
+        self.ids = self.code()
+        self.byte_codes = [self.codes.get(chr(b), self.unknown) if b < 128 else self.unknown for b in range(256)]
+        self.byte_table = bytes(self.byte_codes) if self.width <= 256 else None
+
+    def __getstate__(self):
+        # tables loaded by TableCache keep memoryviews over the mapped file
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                value = getattr(self, name)
+                state[name] = value.tolist() if isinstance(value, memoryview) else value
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def code(self) -> Dict[int, int]:
+        """
+        returns map from terminal symbol id to its code
+        """
+        return {x.id: i for i, x in enumerate(self.terminals)}
+
+    def encode(self, string : str, pad : int = 1) -> List[int]:
+        """
+        returns codes of the string followed by pad end of input codes
+        """
+        if isinstance(string, BUFFER_TYPES):
+            return self.encodeBytes(string, pad)
+        codes, unknown = self.codes if isinstance(string, str) else self.ids, self.unknown
+        ret = [codes.get(ch, unknown) for ch in string]
+        ret.extend([self.end] * pad)
+        return ret
+
+    def encodeBytes(self, buffer, pad : int = 1, chunk_size : int = 1 << 16):
+        """
+        returns codes of a bytes-like input followed by pad end of input codes, as a bytearray
+        of one byte per code made by bytes.translate, so the input is neither decoded nor 
+        turned into objects. Large buffers are translated by chunks
+        """
+        view = byteView(buffer)
+        n = len(view)
+        if self.byte_table is None:
+            byte_codes = self.byte_codes
+            ret = [byte_codes[b] for b in view]
+            ret.extend([self.end] * pad)
+            return ret
+        ret = bytearray(n + pad)
+        for i in range(0, n, chunk_size):
+            ret[i: i + chunk_size] = view[i: i + chunk_size].tobytes().translate(self.byte_table)
+        ret[n:] = bytes([self.end]) * pad
+        return ret
+
+    def stream(self, source, chunk_size : int = 1 << 16) -> Iterator[int]:
+        """
+        yields codes of the source one by one, source is a file-like object
+        (read is called with chunk_size) or any iterable of characters, 
+        strings, bytes-like chunks, Terminal tokens or terminal ids. The end of the input code is not yielded
+        """
+        get, get_id, unknown = self.codes.get, self.ids.get, self.unknown
+        byte_codes = self.byte_codes
+        pieces = source
+        if hasattr(source, 'read'):
+            pieces = iter(lambda: source.read(chunk_size), source.read(0))
+        for piece in pieces:
+            if isinstance(piece, int):
+                yield get_id(piece, unknown)
+            elif isinstance(piece, Terminal):
+                yield get(piece.name(), unknown)
+            elif isinstance(piece, BUFFER_TYPES):
+                for b in byteView(piece):
+                    yield byte_codes[b]
+            elif len(piece) == 1:
+                yield get(piece, unknown)
+            else:
+                for ch in piece:
+                    yield get(ch, unknown)
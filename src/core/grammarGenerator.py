@@ -1,28 +1,224 @@
-from core.grammar import Grammar, Rule, Terminal, NonTerminal
-from typing import Dict, List
+from core.grammar import Grammar, Rule, Terminal, NonTerminal, SymbolTable
+from core.tree import ParseTree
+from core.bnf import loadGrammar
+from typing import Dict, List, Tuple, Iterator, Union, Callable, Sequence, TextIO
+import argparse
+import random
+import sys
+
+INFINITY = float('inf')
 
 
 def generateString(grammar: Grammar, ordering: Dict[int, Rule], sequence: List[int]) -> List[Terminal]:
     """
     The function that generates a tuple of terminal strings
     given the sequence of rules in the grammar
+    The sequence is replayed as the leftmost derivation with a stack of symbols
+    in time linear in the length of the result, nonterminals that are left unexpanded
+    are kept in the result.
     It returnes None if there is a problem during string generation
     """
-    mas = [grammar.start_symbol]
-    for pos, rule_num in enumerate(sequence):
-        pos = -1
-        for i, sym in enumerate(mas):
-            if isinstance(sym, NonTerminal):
-                pos = i
-                break
-        if pos == -1:
-            print(f"Error near {pos}, there has no nonterminals")
+    terminal = SymbolTable.terminal
+    stack = [grammar.start_symbol.id]
+    ans = []
+    for rule_num in sequence:
+        while stack and terminal[stack[-1]]:
+            ans.append(stack.pop())
+        if not stack or rule_num not in ordering:
+            return None
         rule = ordering[rule_num]
-        nterm = mas[pos]
-        if rule.st != nterm:
-            print(f"Error near {pos}, not correct nonterminal, {nterm} != {rule.st}")
-        if rule.en[0] == Terminal("eps"):
-            mas = mas[:pos] + mas[pos+1:]
+        if rule.lhs != stack.pop():
+            return None
+        stack.extend(x for x in reversed(rule.rhs) if x != SymbolTable.EPS)
+    ans.extend(reversed(stack))
+    return list(SymbolTable.resolve(ans))
+
+
+class SentenceGenerator:
+    """
+    Seeded random generator of sentences of the grammar.
+    Length of every sentence is drawn from `lengths`: an int, a sequence
+    of ints to choose from, or a function of random.Random that returns an int.
+    While the shortest yield of the tree is shorter than the target the generator picks 
+    random rules that are not eps rules and fit into the target, then the rules with 
+    the shortest yield. Beyond max_depth it picks the rules with the smallest derivation 
+    depth (precomputed with the shortest yields), so every derivation terminates.
+    near_valid is the probability of one random edit (insertion, deletion or
+    replacement of a terminal) of the sentence, such sentences are usually invalid.
+    """
+
+    __slots__ = ['grammar', 'rules', 'by_lhs', 'min_length', 'min_depth', 'rule_length', 'rule_depth',
+                 'rule_open', 'terminals', 'separator', 'lengths', 'max_depth', 'random']
+
+    def __init__(self, grammar : Grammar, lengths : Union[int, Sequence[int], Callable] = 10,
+                 seed = None, max_depth : int = 100) -> None:
+        grammar = grammar.freeze()
+        self.grammar = grammar
+        self.rules = grammar.rules
+        self.by_lhs = grammar.rules_by_lhs()
+        self.lengths = lengths
+        self.max_depth = max_depth
+        self.random = random.Random(seed)
+        self.terminals = sorted(x.id for x in grammar.terms if not x.isEpsilon())
+        self.separator = '' if all(len(x.name()) == 1 for x in grammar.terms if not x.isEpsilon()) else ' '
+        self.minimize()
+        if self.min_length.get(grammar.start_symbol.id, INFINITY) == INFINITY:
+            raise ValueError(f'{grammar.start_symbol} does not derive any string')
+
+    def minimize(self) -> None:
+        """
+        computes the shortest yield and the smallest derivation depth of every nonterminal and rule
+        """
+        terminal = SymbolTable.terminal
+        self.min_length = {x: INFINITY for x in self.by_lhs}
+        self.min_depth = {x: INFINITY for x in self.by_lhs}
+        self.rule_length = [INFINITY] * len(self.rules)
+        self.rule_depth = [INFINITY] * len(self.rules)
+        self.rule_open = [not all(terminal[x] for x in rule.rhs) for rule in self.rules]
+        changed = True
+        while changed:
+            changed = False
+            for i, rule in enumerate(self.rules):
+                length, depth = 0, 1
+                for x in rule.rhs:
+                    if x == SymbolTable.EPS:
+                        continue
+                    if terminal[x]:
+                        length += 1
+                    else:
+                        length += self.min_length[x]
+                        depth = max(depth, self.min_depth[x] + 1)
+                if (length, depth) < (self.rule_length[i], self.rule_depth[i]):
+                    self.rule_length[i], self.rule_depth[i] = length, depth
+                if length < self.min_length[rule.lhs]:
+                    self.min_length[rule.lhs] = length
+                    changed = True
+                if depth < self.min_depth[rule.lhs]:
+                    self.min_depth[rule.lhs] = depth
+                    changed = True
+
+    def target(self) -> int:
+        if isinstance(self.lengths, int):
+            return self.lengths
+        if callable(self.lengths):
+            return self.lengths(self.random)
+        return self.random.choice(self.lengths)
+
+    def choose(self, nterm : int, depth : int, budget : int, last : bool) -> int:
+        rules = [x for x in self.by_lhs[nterm] if self.rule_length[x] != INFINITY]
+        if depth >= self.max_depth:
+            return min(rules, key=lambda x: (self.rule_depth[x], self.rule_length[x]))
+        if budget > 0:
+            fitting = [x for x in rules if self.rule_length[x] <= budget and self.rules[x].rhs[0] != SymbolTable.EPS]
+            if last:
+                # the last unexpanded nonterminal should not end the sentence before the target
+                fitting = [x for x in fitting if self.rule_open[x]] or fitting
+            if fitting:
+                return self.random.choice(fitting)
+        return min(rules, key=lambda x: (self.rule_length[x], self.rule_depth[x]))
+
+    def derive(self, length : int = None) -> Tuple[List[int], List[int]]:
+        """
+        returns numbers of rules of a random leftmost derivation and ids of terminals
+        of its sentence, its length is about length (drawn from lengths by default).
+        The tree is grown by expanding random unexpanded nonterminals, so the target 
+        length is spread over the whole sentence and not spent by the leftmost nonterminal
+        """
+        if length is None:
+            length = self.target()
+        terminal = SymbolTable.terminal
+        tree = ParseTree(self.rules)
+        depth = [0]
+        pending = [tree.add(self.grammar.start_symbol.id)]
+        # shortest yield of the tree
+        size = self.min_length[self.grammar.start_symbol.id]
+        while pending:
+            i = self.random.randrange(len(pending))
+            node = pending[i]
+            pending[i] = pending[-1]
+            pending.pop()
+            sid = tree.symbol[node]
+            size -= self.min_length[sid]
+            rule = self.choose(sid, depth[node], length - size, not pending)
+            size += self.rule_length[rule]
+            for child in tree.expand(node, rule):
+                depth.append(depth[node] + 1)
+                if not terminal[tree.symbol[child]]:
+                    pending.append(child)
+        rules = [tree.rule[x] for x in tree.preorder() if tree.rule[x] >= 0]
+        return rules, [tree.symbol[x] for x in tree.leaves()]
+
+    def mutate(self, ids : List[int]) -> List[int]:
+        """
+        returns ids with one random insertion, deletion or replacement of a terminal
+        """
+        ids = list(ids)
+        pos = self.random.randint(0, len(ids))
+        edit = self.random.randrange(3) if ids else 0
+        if edit == 0:
+            ids.insert(pos, self.random.choice(self.terminals))
+        elif edit == 1:
+            del ids[min(pos, len(ids) - 1)]
         else:
-            mas = mas[:pos] + list(rule.en) + mas[pos+1:]
-    return mas
\ No newline at end of file
+            ids[min(pos, len(ids) - 1)] = self.random.choice(self.terminals)
+        return ids
+
+    def text(self, ids : List[int]) -> str:
+        return self.separator.join(SymbolTable.symbols[x].name() for x in ids)
+
+    def sentence(self, length : int = None, near_valid : float = 0.0) -> str:
+        ids = self.derive(length)[1]
+        if near_valid and self.terminals and self.random.random() < near_valid:
+            ids = self.mutate(ids)
+        return self.text(ids)
+
+    def sentences(self, count : int = None, near_valid : float = 0.0) -> Iterator[str]:
+        """
+        yields count sentences, or sentences forever if count is None
+        """
+        i = 0
+        while count is None or i < count:
+            yield self.sentence(near_valid=near_valid)
+            i += 1
+
+    def write(self, f : TextIO, count : int, near_valid : float = 0.0, batch : int = 1024) -> None:
+        """
+        writes count newline delimited sentences to f in batches of lines
+        """
+        lines = []
+        for s in self.sentences(count, near_valid):
+            lines.append(s)
+            if len(lines) == batch:
+                f.write('\n'.join(lines) + '\n')
+                lines.clear()
+        if lines:
+            f.write('\n'.join(lines) + '\n')
+
+
+def main(argv = None) -> int:
+    """
+    Writes random sentences of the grammar, one per line, e.g. for batch parsing with core.main
+    """
+    args = argparse.ArgumentParser(description='Random sentences of a grammar')
+    args.add_argument('grammar', help='grammar file, .bnf files are read by readBNF, other ones by Grammar.read')
+    args.add_argument('count', type=int)
+    args.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    args.add_argument('--min-length', type=int, default=1)
+    args.add_argument('--max-length', type=int, default=100)
+    args.add_argument('--near-valid', type=float, default=0.0, help='probability of a random edit of a sentence')
+    args.add_argument('--seed', type=int, default=None)
+    args = args.parse_args(argv)
+
+    grammar = loadGrammar(args.grammar)
+    generator = SentenceGenerator(grammar, lambda rnd: rnd.randint(args.min_length, args.max_length), args.seed)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        generator.write(output, args.count, args.near_valid)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+from array import array
+from typing import List, Tuple, Union
+from core.grammar import SymbolTable, TerminalCodes
+from core.llk import LLKTable, LLKTreeParser
+from core.tree import ParseTree
+from core.diagnostics import ParseError, tableError
+
+
+class IncrementalTree(ParseTree):
+    """
+    ParseTree of IncrementalParser. Spans are relative: start[i] and end[i] are offsets
+    from the start of the parent of node i, so spans of the root are absolute and
+    an edit only changes spans of the nodes on its path and of their right siblings.
+        parent[i]           - parent of node i, -1 for the root and free nodes
+    Nodes that are dropped by an edit are kept in free and taken by add again.
+    span returns the absolute span of a node and absolute the tree with absolute spans.
+    """
+
+    __slots__ = ['parent', 'free']
+
+    def __init__(self, rules) -> None:
+        super().__init__(rules)
+        self.parent = array('i')
+        self.free = []
+
+    def add(self, sid : int, rule : int = -1, start : int = 0, end : int = 0) -> int:
+        if not self.free:
+            self.parent.append(-1)
+            return super().add(sid, rule, start, end)
+        node = self.free.pop()
+        self.symbol[node] = sid
+        self.rule[node] = rule
+        self.first_child[node] = self.next_sibling[node] = self.parent[node] = -1
+        self.start[node] = start
+        self.end[node] = end
+        return node
+
+    def expand(self, node : int, rule : int) -> List[int]:
+        children = super().expand(node, rule)
+        for child in children:
+            self.parent[child] = node
+        return children
+
+    def adopt(self, node : int, old : int) -> None:
+        """
+        moves the rule and the children of the node old to the node
+        """
+        self.rule[node] = self.rule[old]
+        self.first_child[node] = self.first_child[old]
+        for child in self.children(node):
+            self.parent[child] = node
+
+    def replace(self, old : int, node : int) -> None:
+        """
+        puts the node in place of the node old in the list of children of its parent
+        """
+        parent = self.parent[old]
+        self.parent[node] = parent
+        self.next_sibling[node] = self.next_sibling[old]
+        if self.first_child[parent] == old:
+            self.first_child[parent] = node
+            return
+        child = self.first_child[parent]
+        while self.next_sibling[child] != old:
+            child = self.next_sibling[child]
+        self.next_sibling[child] = node
+
+    def release(self, node : int) -> int:
+        """
+        frees the subtree of the node except for the children that were adopted by
+        other nodes, returns the number of freed nodes
+        """
+        stack = [node]
+        count = 0
+        while stack:
+            x = stack.pop()
+            stack.extend(child for child in self.children(x) if self.parent[child] == x)
+            self.parent[x] = -1
+            self.free.append(x)
+            count += 1
+        return count
+
+    def span(self, node : int) -> Tuple[int, int]:
+        """
+        returns the absolute span of the node
+        """
+        start, end = self.start[node], self.end[node]
+        node = self.parent[node]
+        while node >= 0:
+            start += self.start[node]
+            end += self.start[node]
+            node = self.parent[node]
+        return start, end
+
+    def absolute(self) -> ParseTree:
+        """
+        returns a copy of the tree with absolute spans
+        """
+        tree = self.subtree(0)
+        tree.computeSpans()
+        return tree
+
+    @staticmethod
+    def fromTree(tree : ParseTree) -> 'IncrementalTree':
+        """
+        returns the tree with relative spans of the tree with absolute spans
+        """
+        ans = IncrementalTree(tree.rules)
+        for name in ('symbol', 'rule', 'first_child', 'next_sibling', 'start', 'end'):
+            setattr(ans, name, array('i', getattr(tree, name)))
+        ans.parent = array('i', [-1]) * len(tree)
+        for node in range(len(tree)):
+            for child in tree.children(node):
+                ans.parent[child] = node
+                ans.start[child] -= tree.start[node]
+                ans.end[child] -= tree.start[node]
+        return ans
+
+
+class IncrementalParser:
+    """
+    LL(k) parser that keeps the parse tree of the text and reparses the text after edits.
+    A strong LL(k) parser expands a nonterminal at a position the same way whenever
+    the tokens it reads are the same. The parse is resumed from the first node of the
+    previous tree whose lookahead window reaches the edit, with the stack of the parser
+    at that node, which is made of the right siblings of the nodes on its path.
+    It stops as soon as the parser reaches a node of that stack at its (shifted) place
+    after the edit, the rest of the tree is kept as it is. Nodes inside the edited region
+    are predicted again and subtrees of the previous tree that start after the edit
+    at the place the parser reaches are adopted by new nodes.
+    Spans of the tree are relative to parents (see IncrementalTree), so an edit only
+    touches the nodes on its path, their right siblings and the nodes it predicts,
+    not the whole document. visited counts them for the last edit.
+    """
+
+    __slots__ = ['table', 'text', 'codes', 'tree', 'predicted', 'reused', 'visited']
+
+    def __init__(self, table : LLKTable, text : Union[str, List[int]] = '') -> None:
+        self.table = table
+        self.predicted = 0
+        self.reused = 0
+        self.visited = 0
+        self.reset(text)
+
+    def reset(self, text : Union[str, List[int]], errors : List[ParseError] = None) -> IncrementalTree:
+        """
+        parses the text from scratch, returns its tree or None if it is not accepted
+        """
+        self.text = text
+        self.codes = self.table.encode(text)
+        tree = LLKTreeParser(text, self.table, errors)
+        self.tree = None if tree is None else IncrementalTree.fromTree(tree)
+        return self.tree
+
+    def edit(self, offset : int, removed : int, inserted : Union[str, List[int]] = '',
+             errors : List[ParseError] = None) -> IncrementalTree:
+        """
+        replaces removed tokens of the text at offset with inserted ones and returns
+        the tree of the new text, or None if it is not accepted (the error is appended
+        to errors if it is given). The next edit after an error parses the text from scratch
+        """
+        assert 0 <= offset and offset + removed <= len(self.text)
+        text = self.text[:offset] + inserted + self.text[offset + removed:]
+        if self.tree is None:
+            return self.reset(text, errors)
+        self.text = text
+        self.codes[offset: offset + removed] = TerminalCodes.encode(self.table, inserted, 0)
+        self.tree = self.reparse(offset, removed, len(inserted), errors)
+        return self.tree
+
+    def find(self, node : int, node_start : int, old : int, sid : int) -> Tuple[int, int]:
+        """
+        returns the node of the previous tree with symbol sid that starts at old and its start,
+        it is searched in the subtree of the node that starts at node_start and then from the root,
+        (-1, -1) if there is none
+        """
+        tree = self.tree
+        symbol, rule, start, end = tree.symbol, tree.rule, tree.start, tree.end
+        if not node_start <= old < node_start + end[node] - start[node]:
+            node, node_start = 0, 0
+        while True:
+            self.visited += 1
+            if symbol[node] == sid and node_start == old and rule[node] >= 0:
+                return node, node_start
+            inner = -1
+            for child in tree.children(node):
+                child_start = node_start + start[child]
+                if child_start == old and symbol[child] == sid and rule[child] >= 0:
+                    return child, child_start
+                if child_start <= old < node_start + end[child]:
+                    inner = child
+                    break
+            if inner < 0:
+                return -1, -1
+            node, node_start = inner, child_start
+
+    def reparse(self, offset : int, removed : int, inserted : int, errors : List[ParseError]) -> IncrementalTree:
+        table, tree, codes, k = self.table, self.tree, self.codes, self.table.k
+        cells, entry, rhs = table.cells, table.entry, table.rhs
+        symbol, rule, start, end = tree.symbol, tree.rule, tree.start, tree.end
+        n = len(self.text)
+        delta = inserted - removed
+        limit = offset + removed
+        inserted_end = offset + inserted
+        self.predicted = self.reused = self.visited = 0
+
+        # nodes that start before the first lookahead window that reaches the edit are not changed,
+        # the walk down to that window leaves the stack of the parser there:
+        # (item, node, start of the parent of the node), item None closes the node
+        first = max(0, offset - k + 1)
+        stack = [(table.start, 0, 0)]
+        pos = end[0]
+        while stack:
+            item, node, parent_start = stack.pop()
+            self.visited += 1
+            if item is None:
+                continue
+            node_start = parent_start + start[node]
+            if node_start >= first:
+                stack.append((item, node, parent_start))
+                pos = node_start
+                break
+            if item < 0:
+                continue
+            stack.append((None, node, parent_start))
+            children = [x for x in tree.children(node) if symbol[x] != SymbolTable.EPS]
+            for child, child_item in zip(reversed(children), rhs[rule[node]]):
+                if node_start + end[child] < first:
+                    break
+                stack.append((child_item, child, node_start))
+        # nodes of the previous tree on the stack, changes of them are made after the parse,
+        # so the previous tree can be searched until then
+        # (item, node, start of its parent, node of the previous tree and its start, the node
+        # of the previous tree to search from and its start), the node is new if it is not the previous one
+        stack = [(item, node, parent_start, node, parent_start + start[node], node, parent_start + start[node])
+                 for item, node, parent_start in stack]
+        spans = []
+        replaced = []
+
+        while stack:
+            item, node, parent_start, old_node, old_start, hint, hint_start = stack.pop()
+            self.visited += 1
+            previous = node == old_node
+            if item is None:
+                if previous:
+                    spans.append((node, start[node], pos - parent_start))
+                else:
+                    end[node] = pos - parent_start
+                continue
+            if previous and pos >= inserted_end and pos - delta == old_start:
+                # the parser is back on the previous tree, the rest of it is shifted
+                stack.append((item, node, parent_start, old_node, old_start, hint, hint_start))
+                for item, node, *_ in stack:
+                    self.visited += 1
+                    if item is None:
+                        spans.append((node, start[node], end[node] + delta))
+                    else:
+                        spans.append((node, start[node] + delta, end[node] + delta))
+                break
+            if item < 0:
+                if codes[pos] != ~item:
+                    if errors is not None:
+                        errors.append(tableError(table, self.text, pos, [~item]))
+                    return None
+                if previous:
+                    spans.append((node, pos - parent_start, pos + 1 - parent_start))
+                else:
+                    start[node], end[node] = pos - parent_start, pos + 1 - parent_start
+                pos += 1
+                continue
+            if previous:
+                node = tree.add(symbol[old_node])
+                replaced.append((old_node, node))
+            start[node] = pos - parent_start
+
+            old = pos if pos < offset else pos - delta if pos >= inserted_end else -1
+            if old < 0:
+                old_node = -1
+            else:
+                if old_node < 0 or old_start != old:
+                    old_node, old_start = self.find(hint, hint_start, old, symbol[node])
+                length = end[old_node] - start[old_node] if old_node >= 0 else 0
+                # empty subtrees are predicted again, so that no node is adopted twice
+                if length and (old_start + length + k <= offset or old_start >= limit):
+                    tree.adopt(node, old_node)
+                    pos += length
+                    end[node] = pos - parent_start
+                    self.reused += 1
+                    continue
+
+            cell = entry[item]
+            depth = pos
+            while cell > 0:
+                cell = cells[cell + codes[depth]]
+                depth += 1
+            if cell == 0:
+                if errors is not None:
+                    errors.append(table.error(self.text, codes, item, pos))
+                return None
+            self.predicted += 1
+            children = tree.expand(node, ~cell)
+            if old_node >= 0 and rule[old_node] == ~cell:
+                old_children = list(tree.children(old_node))
+            else:
+                old_children = [-1] * len(children)
+            if old_node >= 0:
+                hint, hint_start = old_node, old_start
+            stack.append((None, node, parent_start, -1, -1, hint, hint_start))
+            items = iter(rhs[~cell])
+            for child, old_child in zip(reversed(children), reversed(old_children)):
+                if symbol[child] == SymbolTable.EPS:
+                    start[child] = end[child] = 0
+                else:
+                    child_start = -1 if old_child < 0 else old_start + start[old_child]
+                    stack.append((next(items), child, pos, old_child, child_start, hint, hint_start))
+        else:
+            if pos < n:
+                if errors is not None:
+                    errors.append(tableError(table, self.text, pos, [table.end]))
+                return None
+
+        for node, node_start, node_end in spans:
+            start[node], end[node] = node_start, node_end
+        for old_node, node in replaced:
+            if old_node == 0:
+                # the new root takes the place of the previous one
+                for values in (symbol, rule, tree.first_child, start, end):
+                    values[0], values[node] = values[node], values[0]
+                for child in tree.children(node):
+                    if tree.parent[child] == 0:
+                        tree.parent[child] = node
+                for child in tree.children(0):
+                    tree.parent[child] = 0
+                old_node = node
+            else:
+                tree.replace(old_node, node)
+            self.visited += tree.release(old_node)
+        return tree
@@ -0,0 +1,135 @@
+import contextlib
+import time
+from typing import Callable, Dict
+
+# statistics that are high-water marks, the others are summed over calls
+MAXIMA = {'stack', 'depth'}
+
+
+class Instrumentation:
+    """
+    Counters and timings of parsers, see IParser.instrument.
+    Every measured call of verify, parse or tree adds to
+        counters[(engine, method, name)]    - calls, rejected, tokens and engine statistics
+                                              (predictions, actions, items, attempts, backtracks, copies)
+        maxima[(engine, method, name)]      - high-water marks: stack size and recursion depth
+        seconds[(engine, phase)]            - time of calls of the method or of a build phase
+                                              of init (first, follow, table, eps_free, prepare)
+    Sampling hooks receive one event dict per every-th call of the parser.
+    Parsers that are not instrumented never call it, so it costs nothing when disabled.
+    """
+
+    __slots__ = ['counters', 'maxima', 'seconds', 'hooks', 'calls']
+
+    def __init__(self) -> None:
+        self.counters = {}
+        self.maxima = {}
+        self.seconds = {}
+        self.hooks = []
+        self.calls = 0
+
+    def addHook(self, hook : Callable[[Dict], None], every : int = 1) -> None:
+        """
+        hook is called with the event of every `every`-th call: engine, method, length,
+        seconds, accepted and statistics of the engine
+        """
+        assert every >= 1
+        self.hooks.append((hook, every))
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.maxima.clear()
+        self.seconds.clear()
+        self.calls = 0
+
+    def add(self, engine : str, method : str, name : str, value : int = 1) -> None:
+        key = (engine, method, name)
+        if name in MAXIMA:
+            self.maxima[key] = max(self.maxima.get(key, 0), value)
+        else:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, engine : str, phase : str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = (engine, phase)
+            self.seconds[key] = self.seconds.get(key, 0.0) + time.perf_counter() - start
+
+    def measure(self, parser, method : str, s, run : Callable[[Dict], object]):
+        """
+        calls run(stats) and records its time and the statistics it put into stats,
+        returns the result of run. The call counts as rejected if the result is falsy
+        """
+        engine = type(parser).__name__
+        stats = {}
+        start = time.perf_counter()
+        ans = run(stats)
+        seconds = time.perf_counter() - start
+        key = (engine, method)
+        self.seconds[key] = self.seconds.get(key, 0.0) + seconds
+        self.add(engine, method, 'calls')
+        self.add(engine, method, 'tokens', len(s))
+        if not ans:
+            self.add(engine, method, 'rejected')
+        for name, value in stats.items():
+            self.add(engine, method, name, value)
+
+        self.calls += 1
+        if self.hooks:
+            event = None
+            for hook, every in self.hooks:
+                if self.calls % every == 0:
+                    if event is None:
+                        event = dict(stats, engine=engine, method=method, length=len(s),
+                                     seconds=seconds, accepted=bool(ans))
+                    hook(event)
+        return ans
+
+    def asDict(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        returns {engine: {method or phase: {name: value}}}, times are under the name 'seconds'
+        """
+        ans = {}
+        for source in (self.counters, self.maxima):
+            for (engine, method, name), value in source.items():
+                ans.setdefault(engine, {}).setdefault(method, {})[name] = value
+        for (engine, phase), value in self.seconds.items():
+            ans.setdefault(engine, {}).setdefault(phase, {})['seconds'] = value
+        return ans
+
+    def toPrometheus(self, prefix : str = 'mangoparsers') -> str:
+        """
+        returns the counters in Prometheus text exposition format
+        """
+        metrics = {}
+        for (engine, method, name), value in self.counters.items():
+            metrics.setdefault((f'{prefix}_{name}_total', 'counter'), []).append((engine, 'method', method, value))
+        for (engine, method, name), value in self.maxima.items():
+            metrics.setdefault((f'{prefix}_{name}_max', 'gauge'), []).append((engine, 'method', method, value))
+        for (engine, phase), value in self.seconds.items():
+            metrics.setdefault((f'{prefix}_seconds_total', 'counter'), []).append((engine, 'phase', phase, value))
+        lines = []
+        for (metric, kind), samples in sorted(metrics.items()):
+            lines.append(f'# TYPE {metric} {kind}')
+            for engine, label, value, number in sorted(samples):
+                lines.append(f'{metric}{{engine="{engine}",{label}="{value}"}} {number}')
+        return '\n'.join(lines) + '\n'
+
+    def __getstate__(self):
+        # hooks are usually lambdas, copies in worker processes do not call them
+        return self.counters, self.maxima, self.seconds, [], self.calls
+
+    def __setstate__(self, state):
+        self.counters, self.maxima, self.seconds, self.hooks, self.calls = state
+
+
+def timer(instrumentation : Instrumentation, engine, phase : str):
+    """
+    times the phase of the engine if instrumentation is not None
+    """
+    if instrumentation is None:
+        return contextlib.nullcontext()
+    return instrumentation.timer(type(engine).__name__, phase)
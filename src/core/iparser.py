@@ -1,10 +1,15 @@
-from typing import Union, TextIO, List
+from typing import Union, TextIO, List, Iterable
 from core.grammar import Grammar, Rule
+from core.batch import imapParser
+from core.tree import ParseTree
+from core.instrumentation import Instrumentation
+from core.diagnostics import ParseError
 
 class IParser:
     """
     Returns bool, indicating that current parser accepts the 
-    given string
+    given string, the string is a str of single character terminals 
+    or a list of terminal ids, see Lexer.tokenize
     """
     def verify(self, s : str) -> bool:
         pass 
@@ -15,12 +20,82 @@ class IParser:
     def parse(self, s : str) -> List[Rule]:
         pass
 
+    # parse returns the rightmost derivation instead of the leftmost one
+    rightmost = False
+
+    # collects counters and timings of the parser when set, see instrument
+    instrumentation = None
+
+    """
+    Starts collecting counters and timings of the parser into instrumentation 
+    (a new one by default) and returns it, instrument(None) stops it. 
+    Instrument before init to time the build of tables. 
+    Counters of worker processes of verify_many and parse_many are not collected
+    """
+    def instrument(self, instrumentation : Instrumentation = ...) -> Instrumentation:
+        if instrumentation is ...:
+            instrumentation = Instrumentation()
+        self.instrumentation = instrumentation
+        return instrumentation
+
+    """
+    Returns run(stats), engines put their statistics into stats,
+    stats is None and nothing is measured if the parser is not instrumented
+    """
+    def measured(self, method : str, s, run):
+        if self.instrumentation is None:
+            return run(None)
+        return self.instrumentation.measure(self, method, s, run)
+
+    """
+    Returns the parse tree of the string or None if the string is not accepted,
+    numbers of rules of the tree are positions in self.grammar.rules
+    """
+    def tree(self, s : str) -> ParseTree:
+        rules = self.parse(s)
+        if not rules:
+            return None
+        return ParseTree.fromRules(rules, self.grammar.rules, self.rightmost)
+
+    """
+    Returns syntax errors of the string, the list is empty if the string is accepted.
+    With recover, engines that support error recovery report all errors in one pass,
+    the others report the first error
+    """
+    def diagnose(self, s : str, recover : bool = False) -> List[ParseError]:
+        return [] if self.verify(s) else [ParseError(None)]
+
     """
     Initialises parser from the given file,
     or grammar as list of strings
     """
     def init(self, f : Grammar) -> None:
-        pass 
+        pass
 
+    """
+    Rebuilds the tables of the initialised parser from self.grammar, it is called
+    in worker processes whose symbol ids differ from the process that made the parser
+    """
+    def reinit(self) -> None:
+        self.init(self.grammar)
+
+    """
+    Verifies every string, strings are sharded across a pool of processes.
+    The parser should be initialised, every worker receives it once.
+    """
+    def verify_many(self, strings : Iterable[str], processes : int = None, chunk_size : int = 1024) -> List[bool]:
+        return list(imapParser(self, 'verify', strings, processes, chunk_size))
+
+    """
+    Diagnoses every string, strings are sharded across a pool of processes.
+    """
+    def diagnose_many(self, strings : Iterable[str], recover : bool = False, processes : int = None,
+                      chunk_size : int = 1024) -> List[List[ParseError]]:
+        return list(imapParser(self, 'diagnose', strings, processes, chunk_size, (recover,)))
+
+    """
+    Parses every string, strings are sharded across a pool of processes.
+    """
+    def parse_many(self, strings : Iterable[str], processes : int = None, chunk_size : int = 1024) -> List[List[Rule]]:
+        return list(imapParser(self, 'parse', strings, processes, chunk_size))
 
-    
\ No newline at end of file
@@ -0,0 +1,371 @@
+from bisect import bisect_right
+from typing import Dict, List, Tuple, Iterator, Iterable
+from core.grammar import Terminal
+
+MAX_CHAR = 0x10FFFF
+
+ESCAPES = {
+    'd': [(ord('0'), ord('9'))],
+    'w': [(ord('0'), ord('9')), (ord('A'), ord('Z')), (ord('_'), ord('_')), (ord('a'), ord('z'))],
+    's': [(ord('\t'), ord('\r')), (ord(' '), ord(' '))],
+}
+CONTROLS = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v'}
+
+
+def complement(intervals : List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    ans = []
+    low = 0
+    for lo, hi in sorted(intervals):
+        if lo > low:
+            ans.append((low, lo - 1))
+        low = max(low, hi + 1)
+    if low <= MAX_CHAR:
+        ans.append((low, MAX_CHAR))
+    return ans
+
+
+class RegexParser:
+    """
+    Parser of the regular expressions of Lexer:
+    alternatives |, groups (), repetitions * + ?, character classes [a-z] [^...],
+    any character except the new line . and escapes \\d \\w \\s \\D \\W \\S \\n \\t.
+    Returns the syntax tree of tuples:
+        ('set', intervals)  - one character of the sorted list of (lo, hi) code intervals
+        ('cat', a, b)       - a followed by b
+        ('alt', a, b)       - a or b
+        ('star', a)         - any number of a
+        ('eps',)            - the empty string
+    """
+
+    __slots__ = ['pattern', 'pos']
+
+    def __init__(self, pattern : str) -> None:
+        self.pattern = pattern
+        self.pos = 0
+
+    @staticmethod
+    def literal(text : str):
+        ans = ('eps',)
+        for ch in text:
+            node = ('set', [(ord(ch), ord(ch))])
+            ans = node if ans == ('eps',) else ('cat', ans, node)
+        return ans
+
+    def error(self, message : str):
+        return ValueError(f'bad pattern {self.pattern!r} near {self.pos} symbol: {message}')
+
+    def peek(self) -> str:
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else ''
+
+    def parse(self):
+        ans = self.alternative()
+        if self.pos < len(self.pattern):
+            raise self.error(f'unexpected {self.peek()}')
+        return ans
+
+    def alternative(self):
+        ans = self.concatenation()
+        while self.peek() == '|':
+            self.pos += 1
+            ans = ('alt', ans, self.concatenation())
+        return ans
+
+    def concatenation(self):
+        ans = ('eps',)
+        while self.peek() not in ('', '|', ')'):
+            node = self.repetition()
+            ans = node if ans == ('eps',) else ('cat', ans, node)
+        return ans
+
+    def repetition(self):
+        ans = self.atom()
+        while self.peek() in ('*', '+', '?'):
+            op = self.peek()
+            self.pos += 1
+            if op == '*':
+                ans = ('star', ans)
+            elif op == '+':
+                ans = ('cat', ans, ('star', ans))
+            else:
+                ans = ('alt', ans, ('eps',))
+        return ans
+
+    def atom(self):
+        ch = self.peek()
+        self.pos += 1
+        if ch == '(':
+            ans = self.alternative()
+            if self.peek() != ')':
+                raise self.error('expected )')
+            self.pos += 1
+            return ans
+        if ch == '[':
+            return ('set', self.characterClass())
+        if ch == '.':
+            return ('set', complement([(ord('\n'), ord('\n'))]))
+        if ch == '\\':
+            return ('set', self.escape())
+        if ch in ('*', '+', '?', ')', ']'):
+            self.pos -= 1
+            raise self.error(f'unexpected {ch}')
+        return ('set', [(ord(ch), ord(ch))])
+
+    def escape(self) -> List[Tuple[int, int]]:
+        ch = self.peek()
+        if not ch:
+            raise self.error('pattern ends with \\')
+        self.pos += 1
+        if ch in ESCAPES:
+            return ESCAPES[ch]
+        if ch.lower() in ESCAPES:
+            return complement(ESCAPES[ch.lower()])
+        ch = CONTROLS.get(ch, ch)
+        return [(ord(ch), ord(ch))]
+
+    def characterClass(self) -> List[Tuple[int, int]]:
+        negate = self.peek() == '^'
+        if negate:
+            self.pos += 1
+        ans = []
+        first = True
+        while first or self.peek() != ']':
+            first = False
+            ch = self.peek()
+            if not ch:
+                raise self.error('expected ]')
+            self.pos += 1
+            if ch == '\\':
+                items = self.escape()
+                if len(items) > 1 or items[0][0] != items[0][1]:
+                    ans.extend(items)
+                    continue
+                lo = items[0][0]
+            else:
+                lo = ord(ch)
+            hi = lo
+            if self.peek() == '-' and self.pattern[self.pos + 1:self.pos + 2] not in ('', ']'):
+                self.pos += 1
+                ch = self.peek()
+                self.pos += 1
+                hi = self.escape()[0][0] if ch == '\\' else ord(ch)
+                if hi < lo:
+                    raise self.error('bad range')
+            ans.append((lo, hi))
+        self.pos += 1
+        return complement(ans) if negate else complement(complement(ans))
+
+
+class Lexer:
+    """
+    Tokenizer of multi-character terminals compiled into one minimized DFA.
+    literals are terminal names matched literally, patterns map terminal names
+    to regular expressions (see RegexParser), skip is a pattern of text between tokens.
+    Tokens are matched by the longest match, on equal length literals win over patterns
+    and earlier definitions win over later ones.
+
+    Definitions are compiled into Thompson NFA, then into DFA by subset construction
+    over classes of characters that every pattern treats the same and the DFA is minimized.
+    `transitions` is a flat list of rows of `classes` cells, state 0 is the dead state
+    and state 1 is the start state, `accept` is the token of the state or -1.
+    Token number i is the terminal `terminals[i]`, token len(terminals) is skip.
+    """
+
+    __slots__ = ['terminals', 'ids', 'skip', 'bounds', 'low', 'classes', 'transitions', 'accept']
+
+    def __init__(self, literals : Iterable[str] = (), patterns : Dict[str, str] = None, skip : str = None) -> None:
+        trees = []
+        self.terminals = []
+        for text in literals:
+            self.terminals.append(Terminal(text, False))
+            trees.append(RegexParser.literal(text))
+        for name, pattern in (patterns or {}).items():
+            self.terminals.append(Terminal(name))
+            trees.append(RegexParser(pattern).parse())
+        self.ids = [x.id for x in self.terminals]
+        self.skip = -1
+        if skip is not None:
+            self.skip = len(trees)
+            trees.append(RegexParser(skip).parse())
+
+        self.bounds = Lexer.boundaries(trees)
+        self.classes = len(self.bounds) + 1
+        self.low = [bisect_right(self.bounds, c) for c in range(256)]
+        eps, edges, accept = Lexer.thompson(trees, self.bounds)
+        self.transitions, self.accept = Lexer.minimize(*Lexer.determinize(eps, edges, accept, self.classes), self.classes)
+
+    @staticmethod
+    def boundaries(trees) -> List[int]:
+        """
+        returns sorted starts of character classes,
+        characters between two boundaries are not distinguished by any pattern
+        """
+        ans = set()
+        stack = list(trees)
+        while stack:
+            node = stack.pop()
+            if node[0] == 'set':
+                for lo, hi in node[1]:
+                    ans.add(lo)
+                    ans.add(hi + 1)
+            else:
+                stack.extend(node[1:])
+        ans.discard(0)
+        ans.discard(MAX_CHAR + 1)
+        return sorted(ans)
+
+    @staticmethod
+    def thompson(trees, bounds : List[int]):
+        """
+        builds NFA of all trees: state 0 is the start, eps[s] are epsilon moves,
+        edges[s] are (classes, target) moves and accept[s] is the token of the state or -1
+        """
+        eps, edges, accept = [[]], [[]], [-1]
+
+        def state():
+            eps.append([])
+            edges.append([])
+            accept.append(-1)
+            return len(eps) - 1
+
+        for token, tree in enumerate(trees):
+            # fragments are built with an explicit stack: (node, start, end)
+            start, end = state(), state()
+            eps[0].append(start)
+            accept[end] = token
+            stack = [(tree, start, end)]
+            while stack:
+                node, st, en = stack.pop()
+                kind = node[0]
+                if kind == 'eps':
+                    eps[st].append(en)
+                elif kind == 'set':
+                    classes = set()
+                    for lo, hi in node[1]:
+                        classes.update(range(bisect_right(bounds, lo), bisect_right(bounds, hi) + 1))
+                    edges[st].append((classes, en))
+                elif kind == 'cat':
+                    middle = state()
+                    stack.append((node[1], st, middle))
+                    stack.append((node[2], middle, en))
+                elif kind == 'alt':
+                    stack.append((node[1], st, en))
+                    stack.append((node[2], st, en))
+                else:
+                    inner_st, inner_en = state(), state()
+                    eps[st].extend([inner_st, en])
+                    eps[inner_en].extend([inner_st, en])
+                    stack.append((node[1], inner_st, inner_en))
+        return eps, edges, accept
+
+    @staticmethod
+    def determinize(eps, edges, accept, classes : int):
+        """
+        subset construction, returns transitions with dead state 0 and start state 1
+        and the accepted token of every state (the smallest one of its NFA states)
+        """
+        def closure(states):
+            ans = set(states)
+            stack = list(states)
+            while stack:
+                for other in eps[stack.pop()]:
+                    if other not in ans:
+                        ans.add(other)
+                        stack.append(other)
+            return frozenset(ans)
+
+        start = closure([0])
+        index = {frozenset(): 0, start: 1}
+        sets = [frozenset(), start]
+        transitions = [0] * (2 * classes)
+        tokens = [-1]
+        i = 1
+        while i < len(sets):
+            moves = {}
+            for nfa_state in sets[i]:
+                for covered, target in edges[nfa_state]:
+                    for c in covered:
+                        moves.setdefault(c, set()).add(target)
+            for c, targets in moves.items():
+                target = closure(targets)
+                if target not in index:
+                    index[target] = len(sets)
+                    sets.append(target)
+                    transitions.extend([0] * classes)
+                transitions[i * classes + c] = index[target]
+            tokens.append(min((accept[x] for x in sets[i] if accept[x] >= 0), default=-1))
+            i += 1
+        return transitions, tokens
+
+    @staticmethod
+    def minimize(transitions, tokens, classes : int):
+        """
+        Moore partition refinement: states are split by the accepted token
+        and then by blocks of their targets until nothing changes,
+        states that can not reach acceptance are merged into the dead state
+        """
+        n = len(tokens)
+        block = [tokens[s] + 1 if s else 0 for s in range(n)]
+        count = -1
+        while True:
+            signatures = {}
+            new_block = []
+            for s in range(n):
+                key = (block[s],) + tuple(block[t] for t in transitions[s * classes:(s + 1) * classes])
+                new_block.append(signatures.setdefault(key, len(signatures)))
+            block = new_block
+            if len(signatures) == count:
+                break
+            count = len(signatures)
+
+        # renumber blocks: block of the dead state is 0, block of the start state is 1
+        order = {block[0]: 0}
+        order.setdefault(block[1], 1)
+        for s in range(n):
+            order.setdefault(block[s], len(order))
+        ans = [0] * (len(order) * classes)
+        accept = [-1] * len(order)
+        for s in range(n):
+            row = order[block[s]]
+            accept[row] = tokens[s]
+            for c in range(classes):
+                ans[row * classes + c] = order[block[transitions[s * classes + c]]]
+        accept[0] = -1
+        return ans, accept
+
+    def states(self) -> int:
+        return len(self.accept)
+
+    def scan(self, text : str) -> Iterator[Tuple[int, int, int]]:
+        """
+        yields (token, start, end) of the longest matches, skipped text is not yielded,
+        raises ValueError if no token matches
+        """
+        transitions, accept, classes = self.transitions, self.accept, self.classes
+        low, bounds, skip = self.low, self.bounds, self.skip
+        n = len(text)
+        pos = 0
+        while pos < n:
+            state = 1
+            token, end = -1, pos
+            i = pos
+            while i < n:
+                c = ord(text[i])
+                state = transitions[state * classes + (low[c] if c < 256 else bisect_right(bounds, c))]
+                if state == 0:
+                    break
+                i += 1
+                if accept[state] >= 0:
+                    token, end = accept[state], i
+            if token < 0:
+                raise ValueError(f"Lexical error near {pos} symbol, unexpected {text[pos]}")
+            if token != skip:
+                yield token, pos, end
+            pos = end
+
+    def tokenize(self, text : str) -> List[int]:
+        """
+        returns ids of terminals of the text, the list could be given
+        instead of a string to verify and parse of every parser
+        """
+        ids = self.ids
+        return [ids[token] for token, _, _ in self.scan(text)]
@@ -1,98 +1,815 @@
 from core.lookaheadUtils import lookaheadUtils
-from core.grammar import Grammar, Terminal, NonTerminal, Rule
-from typing import Tuple, List, Dict
+from core.grammar import Grammar, Terminal, NonTerminal, Rule, SymbolTable, TerminalCodes, inputIds, BUFFER_TYPES, byteView
+from typing import Tuple, List, Dict, Iterator, Optional
+from itertools import repeat
 from core.iparser import IParser
+from core.tree import ParseTree
+from core.instrumentation import timer
+from core.diagnostics import ParseError, tokenName, tableError, codeName
+from core.lexer import Lexer
 
-def buildLLKTable(grammar: Grammar, k: int):
+class LLKTable(TerminalCodes):
+    """
+    Compiled form of the LL(k) table.
+    Terminals are mapped to int codes by TerminalCodes.
+    Lookahead is a trie stored in one flat list `cells` of rows of `width` cells,
+    row is indexed by the code of the next input symbol, the cell value is 
+    0 for an error, positive offset of the row for the next lookahead symbol,
+    or ~r (negative) when rule r is predicted.
+    For k = 1 every nonterminal has one dense row. Subtries that predict a single rule 
+    are collapsed, so the parser stops reading input as soon as the prediction is decided.
+    Stack items are nonterminal indexes (>= 0) or ~code for terminals.
+    depths maps nonterminal ids to their lookahead length if it is smaller than k 
+    (see buildAdaptiveLLKTable), depths[i] of the table is the length for nonterminal index i.
+    """
+
+    __slots__ = ['k', 'nonterminals', 'cells', 'entry', 'rhs', 'start', 'ordering', 'depths']
+
+    def __init__(self, grammar: Grammar, table: Dict[int, Dict[Tuple[int], int]], ordering: Dict[int, Rule], k: int,
+                 depths: Dict[int, int] = None) -> None:
+        self.k = k
+        self.ordering = ordering
+        super().__init__(grammar)
+        self.nonterminals = sorted(grammar.non_terms, key=lambda x: x.symbol)
+        code = self.code()
+        index = {x.id: i for i, x in enumerate(self.nonterminals)}
+        self.start = index[grammar.start_symbol.id]
+        depths = depths or {}
+        self.depths = [depths.get(x.id, k) for x in self.nonterminals]
+
+        self.rhs = [None] * len(ordering)
+        for num, rule in ordering.items():
+            self.rhs[num] = tuple(
+                ~code[x] if SymbolTable.terminal[x] else index[x]
+                for x in reversed(rule.rhs) if x != SymbolTable.EPS
+            )
+
+        self.cells = [0] * self.width
+        self.entry = [0] * len(self.nonterminals)
+        for nterm, lookaheads in table.items():
+            depth = self.depths[index[nterm]]
+            trie = dict()
+            for tup, rule_num in lookaheads.items():
+                path = [code[x] for x in tup]
+                if len(path) < depth:
+                    path.append(self.end)
+                node = trie
+                for c in path[:-1]:
+                    node = node.setdefault(c, dict())
+                node[path[-1]] = ~rule_num
+            self.entry[index[nterm]] = self.emit(LLKTable.collapse(trie))
+
+    @staticmethod
+    def collapse(node):
+        """
+        replaces every subtrie that predicts only one rule with this rule,
+        the empty trie of a nonterminal that is never predicted with an error
+        """
+        if not isinstance(node, dict):
+            return node
+        if not node:
+            return 0
+        for c in node:
+            node[c] = LLKTable.collapse(node[c])
+        values = list(node.values())
+        if all(not isinstance(x, dict) and x == values[0] for x in values):
+            return values[0]
+        return node
+
+    def emit(self, node) -> int:
+        """
+        writes the trie node into cells, returns its cell value
+        """
+        if not isinstance(node, dict):
+            return node
+        offset = len(self.cells)
+        self.cells.extend([0] * self.width)
+        for c, child in node.items():
+            self.cells[offset + c] = self.emit(child)
+        return offset
+
+    def toArrays(self):
+        """
+        returns metadata and int arrays for TableCache
+        """
+        return {'k': self.k}, {'cells': self.cells, 'entry': self.entry, 'depths': self.depths}
+
+    @staticmethod
+    def fromArrays(grammar: Grammar, meta, arrays) -> 'LLKTable':
+        """
+        restores the table stored by TableCache, rule numbers are positions in grammar.rules
+        """
+        ans = LLKTable(grammar, {}, dict(enumerate(grammar.rules)), meta['k'])
+        ans.cells = arrays['cells']
+        ans.entry = arrays['entry']
+        if 'depths' in arrays:
+            ans.depths = arrays['depths']
+        return ans
+
+    def encode(self, string: str) -> List[int]:
+        """
+        returns codes of the string followed by k end of input codes
+        """
+        return super().encode(string, self.k)
+
+    def predict(self, item: int, codes: List[int], pos: int) -> int:
+        """
+        returns ~r if the nonterminal item is expanded by rule r at pos, 0 on an error
+        """
+        cell = self.entry[item]
+        while cell > 0:
+            cell = self.cells[cell + codes[pos]]
+            pos += 1
+        return cell
+
+    def error(self, string, codes: List[int], item: int, pos: int) -> ParseError:
+        """
+        returns the error of predicting the nonterminal item at pos, 
+        the position of the error is the lookahead symbol that leaves the trie
+        """
+        cell = self.entry[item]
+        if cell == 0:
+            return tableError(self, string, pos, (), self.nonterminals[item])
+        while True:
+            nxt = self.cells[cell + codes[pos]]
+            if nxt == 0:
+                valid = [c for c in range(self.width) if self.cells[cell + c] != 0]
+                return tableError(self, string, pos, valid, self.nonterminals[item])
+            cell = nxt
+            pos += 1
+
+
+class LLKConflict:
+    """
+    Rules of a nonterminal that are predicted by the same lookaheads of length k:
+        nonterminal - the NonTerminal
+        rules       - the conflicting Rules
+        lookaheads  - sorted tuples of terminal names, a tuple shorter than k ends with the end of input
+    """
+
+    __slots__ = ['nonterminal', 'rules', 'lookaheads', 'k']
+
+    def __init__(self, nonterminal: NonTerminal, rules: List[Rule], lookaheads: List[Tuple[str, ...]], k: int) -> None:
+        self.nonterminal = nonterminal
+        self.rules = rules
+        self.lookaheads = lookaheads
+        self.k = k
+
+    def __str__(self) -> str:
+        shown = ', '.join(' '.join(x) if x else 'end of input' for x in self.lookaheads[:5])
+        if len(self.lookaheads) > 5:
+            shown += f', ... ({len(self.lookaheads)} in total)'
+        rules = '; '.join(str(x) for x in self.rules)
+        return f'{self.nonterminal} is not LL({self.k}): rules {rules} are predicted by {shown}'
+
+
+def predictionRows(grammar: Grammar, nums: List[int], k: int, first, follow, base: int):
+    """
+    returns lookaheads of rules of one nonterminal (numbers in grammar.rules) as {tuple: rule number}
+    and {tuple: set of rule numbers} of the lookaheads that predict several rules
+    """
+    rows = dict()
+    clashes = dict()
+    for num in nums:
+        rule = grammar.rules[num]
+        set1 = lookaheadUtils.sequenceFirstKIds(rule.rhs, first, k, base)
+        for tup in set1.concat(follow[rule.lhs]):
+            if tup in rows:
+                clashes.setdefault(tup, {rows[tup]}).add(num)
+            rows[tup] = num
+    return rows, clashes
+
+
+def rulesByLhs(grammar: Grammar) -> Dict[int, List[int]]:
+    ans = {nterm.id: [] for nterm in grammar.non_terms}
+    for i, rule in enumerate(grammar.rules):
+        ans[rule.lhs].append(i)
+    return ans
+
+
+def buildLLKTable(grammar: Grammar, k: int, compiled: bool = False, first = None, follow = None):
     """
     builds a table of rules for stack automata to parse strings
     this function returns table, reverse_ordering
-    table : dict[NonTerminal, dict[Tuple[Terminal], int]]
+    table : dict[int, dict[Tuple[int], int]]
     reverse_ordering : dict[int, Rule]
-    where table is the table for transitions and reverse_ordering is the 
-    labeling of rules for the table
+    where table is the table for transitions from nonterminal id and 
+    lookahead tuple of terminal ids (empty tuple is the end of the input) 
+    and reverse_ordering is the labeling of rules for the table
+    If compiled is set, table is returned as LLKTable
+    first and follow are FIRST_k and FOLLOW_k id sets from lookaheadUtils, 
+    they are computed when not provided
     
     The function returns None if the grammar is not strong LL(k)
     """
-    first = lookaheadUtils.firstK(grammar, k)
-    follow = lookaheadUtils.followK(grammar, k)
-    ordering = dict()
-    reverse_ordering = dict()
-    for i, rule in enumerate(grammar.rules):
-        ordering[rule] = i
-        reverse_ordering[i] = rule
-    sets = dict()
-    for rule in grammar.rules:
-        set1 = lookaheadUtils.sequenceFirstK(rule.en, first, k)
-        set2 = follow[rule.st]
-        sets[rule] = lookaheadUtils.KconcatenateTwoSets(set1, set2, k)
-    ans = {
-        nterm: dict()
-        for nterm in grammar.non_terms
-    }
-    for rule in grammar.rules:
-        for tup in sets[rule]:
-            if tup in ans[rule.st]:
-                return None
-            ans[rule.st][tup] = ordering[rule]
+    if first is None:
+        first = lookaheadUtils.firstKIds(grammar, k)
+    if follow is None:
+        follow = lookaheadUtils.followKIds(grammar, k, first)
+    reverse_ordering = dict(enumerate(grammar.rules))
+    base = lookaheadUtils.alphabetBase(grammar)
+    ans = dict()
+    for nterm, nums in rulesByLhs(grammar).items():
+        ans[nterm], clashes = predictionRows(grammar, nums, k, first, follow, base)
+        if clashes:
+            return None
+    if compiled:
+        return LLKTable(grammar, ans, reverse_ordering, k), reverse_ordering
     return ans, reverse_ordering
 
 
-def LLKParser(string: str, grammar: Grammar, table: Dict[NonTerminal, Dict[Tuple[Terminal], int]], ordering: Dict[int, Rule], k: int) -> List[int]:
+def buildAdaptiveLLKTable(grammar: Grammar, max_k: int, compiled: bool = False, conflicts: List[LLKConflict] = None):
+    """
+    builds the table like buildLLKTable with the smallest lookahead length of every nonterminal:
+    all nonterminals start with k = 1 and only those that have conflicts are built again
+    with a longer lookahead, up to max_k. Returns table, reverse_ordering, depths
+    where depths maps nonterminal ids to their lookahead lengths, the compiled table 
+    has k of the longest one. 
+    
+    The function returns None if some nonterminals are not strong LL(max_k),
+    their conflicts at max_k are appended to conflicts if it is given
+    """
+    assert max_k >= 1
+    reverse_ordering = dict(enumerate(grammar.rules))
+    base = lookaheadUtils.alphabetBase(grammar)
+    pending = rulesByLhs(grammar)
+    ans = dict()
+    depths = dict()
+    for k in range(1, max_k + 1):
+        first = lookaheadUtils.firstKIds(grammar, k)
+        follow = lookaheadUtils.followKIds(grammar, k, first)
+        failed = dict()
+        for nterm, nums in pending.items():
+            rows, clashes = predictionRows(grammar, nums, k, first, follow, base)
+            if clashes:
+                failed[nterm] = clashes
+            else:
+                ans[nterm] = rows
+                depths[nterm] = k
+        if not failed:
+            break
+        pending = {x: pending[x] for x in failed}
+    else:
+        if conflicts is not None:
+            names = lambda tup: tuple(SymbolTable.symbols[x].name() for x in tup)
+            for nterm, clashes in failed.items():
+                rules = sorted(set().union(*clashes.values()))
+                conflicts.append(LLKConflict(
+                    SymbolTable.symbols[nterm], [grammar.rules[x] for x in rules],
+                    sorted(names(x) for x in clashes), max_k
+                ))
+        return None
+    if compiled:
+        k = max(depths.values(), default=1)
+        return LLKTable(grammar, ans, reverse_ordering, k, depths), reverse_ordering, depths
+    return ans, reverse_ordering, depths
+
+
+def LLKParser(string: str, grammar: Grammar, table: Dict[int, Dict[Tuple[int], int]], ordering: Dict[int, Rule], k: int,
+              errors: List[ParseError] = None) -> List[int]:
     """
     Parse the given string using LL(k) parser
-    if the string can not be parsed prints the error and return None
+    if the string can not be parsed returns None and appends the error to errors if it is given
     otherwise returns the sequence of rules to produce the string
     """
-    stack = [grammar.start_symbol]
+    terminal = SymbolTable.terminal
+    codes = inputIds(string)
+    stack = [grammar.start_symbol.id]
     sequence = []
     pos = 0
     while stack:
-        nterm = stack.pop()
-        if isinstance(nterm, Terminal):
-            if pos >= len(string):
-                print(f"Synthax error near end, the string ends, but the stack doesn't")
-                return None
-            if nterm.symbol != string[pos]:
-                print(f"Synthax error near {pos} symbol, {string[pos]} != {nterm}")
+        sid = stack.pop()
+        if terminal[sid]:
+            if pos >= len(codes) or sid != codes[pos]:
+                if errors is not None:
+                    errors.append(ParseError(pos, [SymbolTable.symbols[sid].name()], tokenName(string, pos)))
                 return None
             pos += 1
             continue
-        tup = tuple(Terminal(term) for term in string[pos: min(pos + k, len(string))])
-        if not tup:
-            tup = tuple([Terminal("eps")])
-        if not (tup in table[nterm]):
-            print(f"Synthax error near {pos} symbol, can not parse {nterm} -> {tup}")
+        tup = tuple(codes[pos: pos + k])
+        if not (tup in table[sid]):
+            if errors is not None:
+                errors.append(lookaheadError(string, pos, tup, table[sid], sid))
             return None
-        rule_num = table[nterm][tup]
+        rule_num = table[sid][tup]
         sequence.append(rule_num)
         rule = ordering[rule_num]
-        if rule.en[0] == Terminal("eps"):
+        if rule.rhs[0] == SymbolTable.EPS:
+            continue
+        stack.extend(reversed(rule.rhs))
+    if pos < len(codes):
+        if errors is not None:
+            errors.append(ParseError(pos, [None], tokenName(string, pos)))
+        return None
+    return sequence
+
+def lookaheadError(string, pos: int, lookahead: Tuple[int], lookaheads, sid: int) -> ParseError:
+    """
+    error of the lookahead that is not in lookaheads of the nonterminal sid, it is 
+    at the first symbol of the lookahead that no tuple of lookaheads continues with
+    """
+    def common(x):
+        i = 0
+        while i < len(x) and i < len(lookahead) and x[i] == lookahead[i]:
+            i += 1
+        return i
+
+    depth = max((common(x) for x in lookaheads), default=0)
+    expected = {x[depth] if depth < len(x) else None for x in lookaheads if common(x) == depth}
+    names = [None if x is None else SymbolTable.symbols[x].name() for x in expected]
+    return ParseError(pos + depth, names, tokenName(string, pos + depth), SymbolTable.symbols[sid].name())
+
+
+def LLKCompiledParser(string: str, table: LLKTable, errors: List[ParseError] = None, stats: dict = None) -> List[int]:
+    """
+    Parse the given string using compiled LL(k) table
+    if the string can not be parsed returns None and appends the error to errors if it is given
+    otherwise returns the sequence of rules to produce the string.
+    If stats is given, the high-water mark of the stack is kept in stats['stack']
+    """
+    codes = table.encode(string)
+    cells, entry, rhs = table.cells, table.entry, table.rhs
+    n = len(codes) - table.k
+    stack = [table.start]
+    sequence = []
+    pos = 0
+    track = stats is not None
+    high = 1
+    if track:
+        stats['stack'] = high
+    while stack:
+        item = stack.pop()
+        if item < 0:
+            if codes[pos] != ~item:
+                if errors is not None:
+                    errors.append(tableError(table, string, pos, [~item]))
+                return None
+            pos += 1
             continue
-        for sym in reversed(rule.en):
-            stack.append(sym)
-    if pos < len(string):
-        print(f"Synthax error near {pos} symbol")
+        cell = entry[item]
+        depth = pos
+        while cell > 0:
+            cell = cells[cell + codes[depth]]
+            depth += 1
+        if cell == 0:
+            if errors is not None:
+                errors.append(table.error(string, codes, item, pos))
+            return None
+        sequence.append(~cell)
+        stack.extend(rhs[~cell])
+        if track and len(stack) > high:
+            high = stats['stack'] = len(stack)
+    if pos < n:
+        if errors is not None:
+            errors.append(tableError(table, string, pos, [table.end]))
         return None
     return sequence
 
+
+def LLKCompiledRecognizer(string: str, table: LLKTable, stack: List[int] = None, stats: dict = None) -> bool:
+    """
+    LLKCompiledParser that only tells whether the string is accepted, no derivation is recorded.
+    stack is an optional list that is reused between calls.
+    If stats is given, the high-water mark of the stack is kept in stats['stack'] 
+    and the number of predictions of an accepted string in stats['predictions']
+    """
+    codes = table.encode(string)
+    cells, entry, rhs = table.cells, table.entry, table.rhs
+    n = len(codes) - table.k
+    if stack is None:
+        stack = []
+    stack.clear()
+    stack.append(table.start)
+    pop, extend = stack.pop, stack.extend
+    pos = 0
+    track = stats is not None
+    high = 1
+    predictions = 0
+    if track:
+        stats['stack'] = high
+    while stack:
+        item = pop()
+        if item < 0:
+            if codes[pos] != ~item:
+                return False
+            pos += 1
+            continue
+        cell = entry[item]
+        depth = pos
+        while cell > 0:
+            cell = cells[cell + codes[depth]]
+            depth += 1
+        if cell == 0:
+            return False
+        extend(rhs[~cell])
+        if track:
+            predictions += 1
+            if len(stack) > high:
+                high = stats['stack'] = len(stack)
+    if track and pos == n:
+        stats['predictions'] = predictions
+    return pos == n
+
+
+def selfEmbedding(table: LLKTable) -> List[NonTerminal]:
+    """
+    returns nonterminals A of the table with A =>+ xAy where y is not empty, 
+    parsing them needs an unbounded stack. The language of a table without them is regular
+    """
+    index = {x.id: i for i, x in enumerate(table.nonterminals)}
+    edges = [[] for _ in table.nonterminals]
+    for num, rhs in enumerate(table.rhs):
+        lhs = index[table.ordering[num].lhs]
+        # rhs is reversed, only the last symbol of the rule does not leave symbols under it
+        edges[lhs].extend((x, i > 0) for i, x in enumerate(rhs) if x >= 0)
+    ans = []
+    for item in range(len(edges)):
+        # items reachable from item, and whether some path leaves symbols on the stack
+        seen = {}
+        stack = [(x, grows) for x, grows in edges[item]]
+        while stack:
+            x, grows = stack.pop()
+            if seen.get(x, False) or (x in seen and not grows):
+                continue
+            seen[x] = grows
+            stack.extend((y, grows or g) for y, g in edges[x])
+        if seen.get(item, False):
+            ans.append(table.nonterminals[item])
+    return ans
+
+
+class LLKDFA:
+    """
+    Recognizer of the language of a compiled LL(k) table without self-embedding nonterminals
+    as a minimized DFA over terminal codes, see buildLLKDFA. `transitions` is a flat list 
+    of rows of `table.width` cells, state 0 is the dead state, state 1 is the start state.
+    The input is followed by k end of input codes, it is accepted if the DFA ends in an `accept` state
+    """
+
+    __slots__ = ['table', 'transitions', 'accept']
+
+    def __init__(self, table: LLKTable, transitions: List[int], accept: List[bool]) -> None:
+        self.table = table
+        self.transitions = transitions
+        self.accept = accept
+
+    def states(self) -> int:
+        return len(self.accept)
+
+    def verify(self, string) -> bool:
+        """
+        whether the string is accepted, codes are looked up one by one without encoding the string
+        """
+        table = self.table
+        if isinstance(string, str):
+            codes = map(table.codes.get, string, repeat(table.unknown))
+        elif isinstance(string, BUFFER_TYPES):
+            codes = map(table.byte_codes.__getitem__, byteView(string))
+        else:
+            codes = map(table.ids.get, string, repeat(table.unknown))
+        transitions, width = self.transitions, table.width
+        state = 1
+        for code in codes:
+            state = transitions[state * width + code]
+            if not state:
+                return False
+        for _ in range(table.k):
+            state = transitions[state * width + table.end]
+        return self.accept[state]
+
+
+def buildLLKDFA(table: LLKTable, max_states: int = 4096) -> Optional[LLKDFA]:
+    """
+    Compiles the LL(k) table into LLKDFA, returns None if the table has self-embedding 
+    nonterminals (see selfEmbedding) or the DFA has more than max_states states before minimization.
+    States are stacks of the table parser with up to k - 1 codes that are read but not matched yet,
+    the next code completes the lookahead of the first of them: nonterminals on the top of the stack
+    are predicted and the code is matched. After the end of the input the stack has to be empty
+    """
+    if selfEmbedding(table):
+        return None
+    cells, entry, rhs, k, end, width = table.cells, table.entry, table.rhs, table.k, table.end, table.width
+
+    def step(state, code):
+        stack, buffer = state
+        buffer += (code,)
+        if len(buffer) < k:
+            return stack, buffer
+        stack = list(stack)
+        while stack and stack[-1] >= 0:
+            cell = entry[stack.pop()]
+            depth = 0
+            while cell > 0:
+                cell = cells[cell + buffer[depth]]
+                depth += 1
+            if cell == 0:
+                return None
+            stack.extend(rhs[~cell])
+        if buffer[0] == end:
+            return 'accept' if not stack else None
+        if not stack or stack[-1] != ~buffer[0]:
+            return None
+        stack.pop()
+        return tuple(stack), buffer[1:]
+
+    states = [None, ((table.start,), ())]
+    index = {None: 0, states[1]: 1}
+    transitions = [0] * width
+    i = 1
+    while i < len(states):
+        state = states[i]
+        for code in range(width):
+            if state == 'accept':
+                nxt = state if code == end else None
+            else:
+                nxt = step(state, code)
+            if nxt not in index:
+                if len(states) >= max_states:
+                    return None
+                index[nxt] = len(states)
+                states.append(nxt)
+            transitions.append(index[nxt])
+        i += 1
+    tokens = [0 if state == 'accept' else -1 for state in states]
+    if 0 not in tokens:
+        # the language is empty, minimization would merge the start state into the dead one
+        return LLKDFA(table, [0] * (2 * width), [False, False])
+    transitions, accept = Lexer.minimize(transitions, tokens, width)
+    return LLKDFA(table, transitions, [x >= 0 for x in accept])
+
+
+def LLKRecoveringParser(string: str, table: LLKTable, sync: List[Dict[int, set]]) -> List[ParseError]:
+    """
+    Parse the given string using compiled LL(k) table in panic mode and 
+    returns all syntax errors of the string in one pass, the list is empty if the string is accepted.
+    sync[A] maps lengths to sets of code tuples of FOLLOW_k of the nonterminal A, see LLKParserWrapped.sync.
+    When A can not be predicted input is skipped until A can be predicted or the lookahead is in FOLLOW_k(A),
+    then A is dropped. Expected terminals that are not found are treated as missing.
+    Input that is left after the start symbol is skipped until the start symbol can be parsed again.
+    An error is not reported at or before the position of the previous one, so errors do not cascade
+    """
+    codes = table.encode(string)
+    n = len(codes) - table.k
+    errors = []
+
+    def report(error):
+        if not errors or error.position > errors[-1].position:
+            errors.append(error)
+
+    def follows(item, pos):
+        return any(tuple(codes[pos: pos + length]) in tuples for length, tuples in sync[item].items())
+
+    stack = [table.start]
+    pos = 0
+    while True:
+        while stack:
+            item = stack.pop()
+            if item < 0:
+                if codes[pos] == ~item:
+                    pos += 1
+                else:
+                    report(tableError(table, string, pos, [~item]))
+                continue
+            cell = table.predict(item, codes, pos)
+            if cell != 0:
+                stack.extend(table.rhs[~cell])
+                continue
+            report(table.error(string, codes, item, pos))
+            while pos < n and not follows(item, pos):
+                pos += 1
+                if table.predict(item, codes, pos) != 0:
+                    stack.append(item)
+                    break
+        if pos >= n:
+            return errors
+        report(tableError(table, string, pos, [table.end]))
+        pos += 1
+        while pos < n and table.predict(table.start, codes, pos) == 0:
+            pos += 1
+        if pos >= n:
+            return errors
+        stack.append(table.start)
+
+
+def LLKTreeParser(string: str, table: LLKTable, errors: List[ParseError] = None) -> ParseTree:
+    """
+    Parse the given string using compiled LL(k) table, the parse tree is filled while parsing,
+    numbers of rules of the tree are keys of table.ordering
+    if the string can not be parsed returns None and appends the error to errors if it is given
+    """
+    codes = table.encode(string)
+    cells, entry, rhs = table.cells, table.entry, table.rhs
+    tree = ParseTree(table.ordering)
+    symbol, start, end = tree.symbol, tree.start, tree.end
+    n = len(codes) - table.k
+    stack = [table.start]
+    nodes = [tree.add(table.nonterminals[table.start].id)]
+    pos = 0
+    while stack:
+        item = stack.pop()
+        node = nodes.pop()
+        if node < 0:
+            end[~node] = pos
+            continue
+        start[node] = pos
+        if item < 0:
+            if codes[pos] != ~item:
+                if errors is not None:
+                    errors.append(tableError(table, string, pos, [~item]))
+                return None
+            pos += 1
+            end[node] = pos
+            continue
+        cell = entry[item]
+        depth = pos
+        while cell > 0:
+            cell = cells[cell + codes[depth]]
+            depth += 1
+        if cell == 0:
+            if errors is not None:
+                errors.append(table.error(string, codes, item, pos))
+            return None
+        children = tree.expand(node, ~cell)
+        stack.append(0)
+        nodes.append(~node)
+        stack.extend(rhs[~cell])
+        for child in reversed(children):
+            if symbol[child] == SymbolTable.EPS:
+                start[child] = end[child] = pos
+            else:
+                nodes.append(child)
+    if pos < n:
+        if errors is not None:
+            errors.append(tableError(table, string, pos, [table.end]))
+        return None
+    return tree
+
+
+def LLKStreamParser(source, table: LLKTable, chunk_size: int = 1 << 16) -> Iterator[int]:
+    """
+    Parse the source using compiled LL(k) table, source is anything TerminalCodes.stream 
+    accepts: file-like object, iterable of characters, string chunks or Terminal tokens.
+    Only k lookahead symbols are kept in a ring buffer, numbers of rules are 
+    yielded as soon as they are predicted.
+    If the source can not be parsed raises ParseError
+    """
+    codes = table.stream(source, chunk_size)
+    cells, entry, rhs, end, k = table.cells, table.entry, table.rhs, table.end, table.k
+    buffer = [end] * k
+    head = 0
+    filled = 0
+    stack = [table.start]
+    pos = 0
+    while stack:
+        item = stack.pop()
+        if item < 0:
+            if filled == 0:
+                buffer[head] = next(codes, end)
+                filled = 1
+            if buffer[head] != ~item:
+                error = tableError(table, None, pos, [~item])
+                raise ParseError(pos, error.expected, codeName(table, buffer[head]))
+            head = (head + 1) % k
+            filled -= 1
+            pos += 1
+            continue
+        cell = entry[item]
+        depth = 0
+        while cell > 0:
+            if depth == filled:
+                buffer[(head + filled) % k] = next(codes, end)
+                filled += 1
+            cell = cells[cell + buffer[(head + depth) % k]]
+            depth += 1
+        if cell == 0:
+            lookahead = [buffer[(head + i) % k] for i in range(depth)] + [end] * k
+            error = table.error(None, lookahead, item, 0)
+            raise ParseError(pos + error.position, error.expected, codeName(table, lookahead[error.position]), error.nonterminal)
+        yield ~cell
+        stack.extend(rhs[~cell])
+    if filled == 0:
+        buffer[head] = next(codes, end)
+    if buffer[head] != end:
+        raise ParseError(pos, [None], codeName(table, buffer[head]))
+
+
 class LLKParserWrapped(IParser):
 
-    def __init__(self, k = 5):
+    def __init__(self, k = 5, cache = None, adaptive = False, dfa = False):
+        """
+        cache is an optional TableCache for built tables.
+        If adaptive is set, k is the longest lookahead and every nonterminal 
+        gets the shortest one that has no conflicts, see buildAdaptiveLLKTable.
+        If dfa is set, verify uses LLKDFA when the table has no self-embedding nonterminals
+        """
         self.k = k 
+        self.cache = cache
+        self.adaptive = adaptive
+        self.dfa = dfa
+        self.automaton = None
+        self.conflicts = []
+        self.sync = None
+        self.stack = []
 
     def init(self, grammar:Grammar) -> None:
+        grammar = grammar.freeze()
         self.grammar = grammar 
-        self.table, self.order = buildLLKTable(grammar, self.k)
+        self.conflicts = []
+        if self.cache is None:
+            ret = self.build(grammar)
+        else:
+            kind = 'llk-adaptive' if self.adaptive else 'llk'
+            table = self.cache.get(kind, grammar, self.k, LLKTable, lambda: (self.build(grammar) or [None])[0])
+            ret = None if table is None else (table, table.ordering)
+        if ret is None:
+            report = ''.join('\n' + str(x) for x in self.conflicts)
+            raise ValueError(f'grammar is not strong LL({self.k})' + report)
+        self.table, self.order = ret
+        self.sync = None
+        self.automaton = None
+        if self.dfa:
+            with timer(self.instrumentation, self, 'dfa'):
+                self.automaton = buildLLKDFA(self.table)
+
+    def build(self, grammar:Grammar):
+        if self.adaptive:
+            with timer(self.instrumentation, self, 'table'):
+                ret = buildAdaptiveLLKTable(grammar, self.k, True, self.conflicts)
+            return None if ret is None else ret[:2]
+        with timer(self.instrumentation, self, 'first'):
+            first = lookaheadUtils.firstKIds(grammar, self.k)
+        with timer(self.instrumentation, self, 'follow'):
+            follow = lookaheadUtils.followKIds(grammar, self.k, first)
+        with timer(self.instrumentation, self, 'table'):
+            return buildLLKTable(grammar, self.k, True, first, follow)
+
+    def run(self, s: str, stats) -> List[int]:
+        ret = LLKCompiledParser(s, self.table, None, stats)
+        if stats is not None and ret is not None:
+            stats['predictions'] = len(ret)
+        return ret
+
+    def check(self, s: str, stats = None) -> bool:
+        """
+        recognizes the string without recording the derivation,
+        the automaton has no stack so it puts nothing into stats
+        """
+        if self.automaton is not None:
+            return self.automaton.verify(s)
+        return LLKCompiledRecognizer(s, self.table, self.stack, stats)
 
     def verify(self, s: str) -> bool:
-        ret = LLKParser(s, self.grammar, self.table, self.order, self.k)
-        if ret is None:
-            return False
-        return True
+        return self.measured('verify', s, lambda stats: self.check(s, stats))
         
     def parse(self, s : str) -> List[Rule]:
-        ret = LLKParser(s, self.grammar, self.table, self.order, self.k)
+        ret = self.measured('parse', s, lambda stats: self.run(s, stats))
         if ret is None:
             return []
         return [self.order[x] for x in ret]
+
+    def tree(self, s : str) -> ParseTree:
+        def run(stats):
+            tree = LLKTreeParser(s, self.table)
+            if stats is not None and tree is not None:
+                stats['predictions'] = sum(1 for x in tree.rule if x >= 0)
+                stats['stack'] = tree.maxStack()
+            return tree
+        return self.measured('tree', s, run)
+
+    def syncSets(self) -> List[Dict[int, set]]:
+        """
+        returns FOLLOW_k of every nonterminal of the table as sets of code tuples by their lengths,
+        k is the lookahead length of the nonterminal, tuples shorter than k end with the end of input code
+        """
+        if self.sync is None:
+            code = self.table.code()
+            self.sync = []
+            for nterm, k in zip(self.table.nonterminals, self.table.depths):
+                follow = lookaheadUtils.followKIds(self.grammar, k)
+                sets = {}
+                for tup in follow[nterm.id]:
+                    path = tuple(code[x] for x in tup) + ((self.table.end,) if len(tup) < k else ())
+                    sets.setdefault(len(path), set()).add(path)
+                self.sync.append(sets)
+        return self.sync
+
+    def diagnose(self, s: str, recover: bool = False) -> List[ParseError]:
+        if recover:
+            return LLKRecoveringParser(s, self.table, self.syncSets())
+        errors = []
+        LLKCompiledParser(s, self.table, errors)
+        return errors
+
+    def incremental(self, text = ''):
+        """
+        returns IncrementalParser of the text that reparses it after edits
+        """
+        from core.incremental import IncrementalParser
+        return IncrementalParser(self.table, text)
+
+    def stream(self, source) -> Iterator[int]:
+        """
+        Yields numbers of rules (keys of self.order) while reading the source,
+        see LLKStreamParser
+        """
+        return LLKStreamParser(source, self.table)
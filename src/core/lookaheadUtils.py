@@ -1,6 +1,137 @@
-from core.grammar import Grammar, NonTerminal, Terminal, Rule, SymbolUtils, BaseSymbol
-from typing import List, Set, Tuple
+from core.grammar import Grammar, NonTerminal, Terminal, Rule, SymbolUtils, BaseSymbol, SymbolTable
+from typing import List, Set, Tuple, Dict
 from copy import deepcopy
+from collections import deque
+
+class KStringSet:
+    """
+    Set of terminal strings of length at most k.
+    Every string is encoded as one int: ids of its terminals plus one are 
+    the digits in base `base`, the first terminal is the lowest digit, 
+    so the empty string (epsilon) is 0. Strings are kept in buckets by length,
+    members are decoded to tuples of terminal ids only when iterating.
+    Ids must be below base - 1, larger ones raise ValueError instead of 
+    colliding with other strings.
+    """
+
+    __slots__ = ['k', 'base', 'buckets']
+
+    def __init__(self, k: int, base: int, strings = ()) -> None:
+        self.k = k
+        self.base = base
+        self.buckets = [set() for _ in range(k + 1)]
+        for tup in strings:
+            self.add(tup)
+
+    @staticmethod
+    def epsilon(k: int, base: int) -> 'KStringSet':
+        ans = KStringSet(k, base)
+        ans.buckets[0].add(0)
+        return ans
+
+    def encode(self, tup: Tuple[int, ...]) -> int:
+        value = 0
+        for sid in reversed(tup):
+            if not 0 <= sid < self.base - 1:
+                raise ValueError(f'symbol id {sid} does not fit base {self.base}')
+            value = value * self.base + sid + 1
+        return value
+
+    def decode(self, value: int) -> Tuple[int, ...]:
+        ans = []
+        while value:
+            value, digit = divmod(value, self.base)
+            ans.append(digit - 1)
+        return tuple(ans)
+
+    def add(self, tup: Tuple[int, ...]) -> None:
+        tup = tup[:self.k]
+        self.buckets[len(tup)].add(self.encode(tup))
+
+    def __contains__(self, tup: Tuple[int, ...]) -> bool:
+        return len(tup) <= self.k and self.encode(tup) in self.buckets[len(tup)]
+
+    def __iter__(self):
+        for bucket in self.buckets:
+            for value in bucket:
+                yield self.decode(value)
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.buckets)
+
+    def __bool__(self) -> bool:
+        return any(self.buckets)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, KStringSet):
+            return False
+        return self.k == other.k and self.base == other.base and self.buckets == other.buckets
+
+    def __repr__(self) -> str:
+        return f'KStringSet({set(self)})'
+
+    def copy(self) -> 'KStringSet':
+        ans = KStringSet(self.k, self.base)
+        ans.buckets = [set(x) for x in self.buckets]
+        return ans
+
+    def issubset(self, other: 'KStringSet') -> bool:
+        return all(x <= y for x, y in zip(self.buckets, other.buckets))
+
+    def update(self, other: 'KStringSet') -> 'KStringSet':
+        """
+        adds strings of other to this set, returns set of strings that were new
+        """
+        if other.base != self.base:
+            raise ValueError(f'base {other.base} of strings differs from base {self.base}')
+        ans = KStringSet(self.k, self.base)
+        for mine, new, theirs in zip(self.buckets, ans.buckets, other.buckets):
+            new.update(theirs)
+            new.difference_update(mine)
+            mine.update(new)
+        return ans
+
+    def prefixes(self, length: int) -> List[Tuple[int, Set[int]]]:
+        """
+        returns (length, strings) buckets of all prefixes of at most given length
+        """
+        ans = [(i, self.buckets[i]) for i in range(min(length, self.k + 1)) if self.buckets[i]]
+        modulo = self.base ** length
+        truncated = set()
+        for bucket in self.buckets[length:]:
+            truncated.update(x % modulo for x in bucket)
+        if truncated:
+            ans.append((length, truncated))
+        return ans
+
+    def concat(self, other: 'KStringSet') -> 'KStringSet':
+        """
+        k-concatenation: every string of this set followed by every string 
+        of other, truncated to k symbols. Strings of length k are not extended 
+        and strings of other are truncated before the product is built
+        """
+        k, base = self.k, self.base
+        ans = KStringSet(k, base)
+        if not other:
+            return ans
+        ans.buckets[k].update(self.buckets[k])
+        prefixes = dict()
+        for length, bucket in enumerate(self.buckets[:k]):
+            if not bucket:
+                continue
+            need = k - length
+            if need not in prefixes:
+                prefixes[need] = other.prefixes(need)
+            shift = base ** length
+            for other_length, other_bucket in prefixes[need]:
+                if length == 0:
+                    ans.buckets[other_length].update(other_bucket)
+                else:
+                    ans.buckets[length + other_length].update(
+                        x + y * shift for y in other_bucket for x in bucket
+                    )
+        return ans
+
 
 class lookaheadUtils:
 
@@ -55,45 +186,95 @@ class lookaheadUtils:
         return ans
 
 
-    def firstK(grammar: Grammar, k: int) -> dict[NonTerminal, Set[Tuple[Terminal]]]:
+    def alphabetBase(grammar: Grammar) -> int:
         """
-        for every terminal in grammmar returns the set of all 
-        possible firstk tuples that the NonTerminal can produce
+        base of KStringSet encoding that fits every terminal of the grammar
+        """
+        return max((x.id for x in grammar.terms), default=0) + 2
+
+
+    def sequenceFirstKIds(seq: Tuple[int, ...], dct: Dict[int, KStringSet], k: int, base: int) -> KStringSet:
+        """
+        return every possible firstK tuples of terminal ids for sequence of symbol ids
+        """
+        terminal = SymbolTable.terminal
+        ans = KStringSet.epsilon(k, base)
+        for i, sid in enumerate(seq):
+            if sid == SymbolTable.EPS:
+                continue
+            if terminal[sid]:
+                ans = ans.concat(KStringSet(k, base, [(sid,)]))
+            else:
+                ans = ans.concat(dct[sid])
+            if not any(ans.buckets[:k]):
+                # every string is complete, the rest matters only if it derives nothing
+                if any(not terminal[x] and not dct[x] for x in seq[i+1:]):
+                    return KStringSet(k, base)
+                break
+        return ans
+
+
+    def toSymbols(dct: Dict[int, KStringSet]) -> Dict[NonTerminal, Set[Tuple[Terminal]]]:
+        """
+        converts sets of id k-strings into sets of Terminal tuples,
+        the empty string is represented by (eps,)
+        """
+        eps = tuple([Terminal("eps")])
+        return {
+            SymbolTable.symbols[nterm]: {SymbolTable.resolve(x) if x else eps for x in val}
+            for nterm, val in dct.items()
+        }
+
+
+    def firstKIds(grammar: Grammar, k: int) -> Dict[int, KStringSet]:
+        """
+        for every nonterminal id in grammar returns the set of all
+        possible firstk tuples of terminal ids that the NonTerminal can produce
+        The result is memoized by FrozenGrammar and should not be modified
+        """
+        return grammar.memoized(('first', k), lambda: lookaheadUtils.computeFirstKIds(grammar, k))
+
+
+    def computeFirstKIds(grammar: Grammar, k: int) -> Dict[int, KStringSet]:
+        """
+        Worklist fixpoint: a rule is evaluated again only when 
+        FIRST_k of some nonterminal of its right part has grown
         """
+        base = lookaheadUtils.alphabetBase(grammar)
         ans = {
-            nterm : "-" 
+            nterm.id : KStringSet(k, base)
             for nterm in grammar.non_terms
         }
+        users = {nterm: [] for nterm in ans}
         for rule in grammar.rules:
-            if lookaheadUtils.checkNonTerminalRule(rule):
-                if ans[rule.st] == "-":
-                    ans[rule.st] = set()
-                ans[rule.st].add(tuple(rule.en[:min(len(rule.en), k)]))
-        while True:
-            stop = True
-            for rule in grammar.rules:
-                lst = []
-                for sym in rule.en:
-                    if isinstance(sym, Terminal):
-                        lst.append({tuple([sym])})
-                    else:
-                        lst.append(ans[sym])
-                if "-" in lst:
-                    continue
-                new_set = lookaheadUtils.KconcatenateListOfSets(lst, k)
-                if ans[rule.st] == "-":
-                    ans[rule.st] = set()
-                if not new_set.issubset(ans[rule.st]):
-                    stop = False
-                    ans[rule.st].update(new_set)
-            if stop:
-                break
+            for sid in set(rule.rhs):
+                if sid in users:
+                    users[sid].append(rule)
+        worklist = deque(grammar.rules)
+        queued = set(worklist)
+        while worklist:
+            rule = worklist.popleft()
+            queued.discard(rule)
+            new_set = lookaheadUtils.sequenceFirstKIds(rule.rhs, ans, k, base)
+            if ans[rule.lhs].update(new_set):
+                for user in users[rule.lhs]:
+                    if user not in queued:
+                        queued.add(user)
+                        worklist.append(user)
         return ans
 
 
+    def firstK(grammar: Grammar, k: int) -> dict[NonTerminal, Set[Tuple[Terminal]]]:
+        """
+        for every terminal in grammmar returns the set of all
+        possible firstk tuples that the NonTerminal can produce
+        """
+        return lookaheadUtils.toSymbols(lookaheadUtils.firstKIds(grammar, k))
+
+
     def sequenceFirstK(seq: Tuple[BaseSymbol], dct: dict[NonTerminal, Set[Tuple[Terminal]]], k: int) -> Set[Tuple[Terminal]]:
         """
-        return every possible firstK tuples for sequence of termainl and 
+        return every possible firstK tuples for sequence of termainl and
         non-terminal symbols
         """
         sets = []
@@ -105,31 +286,65 @@ class lookaheadUtils:
         return lookaheadUtils.KconcatenateListOfSets(sets, k)
 
 
-    def followK(grammar: Grammar, k: int):
+    def followKIds(grammar: Grammar, k: int, first: Dict[int, KStringSet] = None) -> Dict[int, KStringSet]:
         """
-        for every terminal in grammmar returns the set of all 
-        possible firstk tuples that the NonTerminal can produce
+        for every nonterminal id in grammar returns the set of all
+        possible firstk tuples of terminal ids that could follow the NonTerminal
+        first is FIRST_k computed by firstKIds, it is computed when not provided.
+        The result is memoized by FrozenGrammar and should not be modified
         """
-        ans = {
-            nterm: "-"
+        if first is None:
+            first = lookaheadUtils.firstKIds(grammar, k)
+        return grammar.memoized(('follow', k), lambda: lookaheadUtils.computeFollowKIds(grammar, k, first))
+
+
+    def computeFollowKIds(grammar: Grammar, k: int, first: Dict[int, KStringSet]) -> Dict[int, KStringSet]:
+        """
+        Every occurrence A -> xBy gives FOLLOW(B) >= FIRST(y) . FOLLOW(A),
+        only strings that were newly added to FOLLOW(A) are propagated
+        """
+        base = lookaheadUtils.alphabetBase(grammar)
+        terminal = SymbolTable.terminal
+        occurrences = {
+            nterm.id: []
             for nterm in grammar.non_terms
         }
-        ans[grammar.start_symbol] = {tuple([Terminal("eps")])}
-        while True:
-            stop = True
-            for rule in grammar.rules:
-                for i, sym in enumerate(rule.en):
-                    if isinstance(sym, NonTerminal):
-                        if ans[rule.st] == "-":
-                            continue
-                        set1 = lookaheadUtils.sequenceFirstK(tuple(rule.en[i+1:]), lookaheadUtils.firstK(grammar, k), k)
-                        set2 = ans[rule.st]
-                        new_set = lookaheadUtils.KconcatenateTwoSets(set1, set2, k)
-                        if ans[sym] == "-":
-                            ans[sym] = set()
-                        if not new_set.issubset(ans[sym]):
-                            stop = False
-                            ans[sym].update(new_set)
-            if stop:
-                break
-        return ans
\ No newline at end of file
+        for rule in grammar.rules:
+            for i, sid in enumerate(rule.rhs):
+                if not terminal[sid]:
+                    occurrences[rule.lhs].append((sid, lookaheadUtils.sequenceFirstKIds(rule.rhs[i+1:], first, k, base)))
+        ans = {
+            nterm: KStringSet(k, base)
+            for nterm in occurrences
+        }
+        ans[grammar.start_symbol.id] = KStringSet.epsilon(k, base)
+        delta = {grammar.start_symbol.id: KStringSet.epsilon(k, base)}
+        worklist = deque([grammar.start_symbol.id])
+        while worklist:
+            nterm = worklist.popleft()
+            new_strings = delta.pop(nterm)
+            for sid, set1 in occurrences[nterm]:
+                new_set = ans[sid].update(set1.concat(new_strings))
+                if new_set:
+                    if sid in delta:
+                        delta[sid].update(new_set)
+                    else:
+                        delta[sid] = new_set
+                        worklist.append(sid)
+        return ans
+
+
+    def firstFollowKIds(grammar: Grammar, k: int) -> Tuple[Dict[int, KStringSet], Dict[int, KStringSet]]:
+        """
+        returns FIRST_k and FOLLOW_k of grammar, FIRST_k is computed only once
+        """
+        first = lookaheadUtils.firstKIds(grammar, k)
+        return first, lookaheadUtils.followKIds(grammar, k, first)
+
+
+    def followK(grammar: Grammar, k: int):
+        """
+        for every terminal in grammmar returns the set of all
+        possible firstk tuples that the NonTerminal can produce
+        """
+        return lookaheadUtils.toSymbols(lookaheadUtils.followKIds(grammar, k))
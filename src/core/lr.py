@@ -0,0 +1,332 @@
+from core.lookaheadUtils import lookaheadUtils
+from core.grammar import Grammar, Rule, SymbolTable, TerminalCodes
+from typing import Tuple, List, Dict, FrozenSet
+from core.iparser import IParser
+from core.instrumentation import timer
+from core.diagnostics import ParseError, tableError
+
+
+class LRTable(TerminalCodes):
+    """
+    Compiled LR(1) or LALR(1) table.
+    Terminals are mapped to int codes by TerminalCodes.
+    `action` is a flat list of rows of `width` cells, one row per state, indexed by
+    the code of the next input symbol: 0 is an error, positive s + 1 shifts
+    to the state s, ~r (negative) reduces by the rule r. Reduction by `accept` rule
+    (augmented [start] -> S) accepts the input.
+    `goto` is a flat list of rows of len(nonterminals) cells: state after reduction to
+    the nonterminal, `lhs` and `length` are the nonterminal index and right part length of rules.
+    """
+
+    __slots__ = ['nonterminals', 'action', 'goto', 'lhs', 'length', 'accept', 'states', 'ordering']
+
+    def __init__(self, grammar: Grammar, ordering: Dict[int, Rule]) -> None:
+        super().__init__(grammar)
+        self.ordering = ordering
+        self.nonterminals = sorted(grammar.non_terms, key=lambda x: x.symbol)
+        index = {x.id: i for i, x in enumerate(self.nonterminals)}
+        self.accept = len(ordering)
+        self.lhs = [index[ordering[i].lhs] for i in range(len(ordering))] + [-1]
+        self.length = [len([x for x in ordering[i].rhs if x != SymbolTable.EPS]) for i in range(len(ordering))] + [1]
+        self.states = 0
+        self.action = []
+        self.goto = []
+
+    def toArrays(self):
+        """
+        returns metadata and int arrays for TableCache
+        """
+        return {'states': self.states}, {'action': self.action, 'goto': self.goto}
+
+    @staticmethod
+    def fromArrays(grammar: Grammar, meta, arrays) -> 'LRTable':
+        """
+        restores the table stored by TableCache, rule numbers are positions in grammar.rules
+        """
+        ans = LRTable(grammar, dict(enumerate(grammar.rules)))
+        ans.states = meta['states']
+        ans.action = arrays['action']
+        ans.goto = arrays['goto']
+        return ans
+
+    def addState(self) -> int:
+        self.action.extend([0] * self.width)
+        self.goto.extend([0] * len(self.nonterminals))
+        self.states += 1
+        return self.states - 1
+
+
+class LRAutomaton:
+    """
+    Canonical LR(1) automaton of the grammar.
+    Item is a tuple (rule, dot, lookahead) where lookahead is a terminal id
+    or -1 for the end of the input. Rule len(grammar.rules) is the augmented
+    rule [start] -> S. States are identified by their kernels.
+    """
+
+    __slots__ = ['grammar', 'rules', 'rhs', 'lhs', 'by_lhs', 'first', 'nullable', 'suffix',
+                 'states', 'transitions']
+
+    def __init__(self, grammar: Grammar) -> None:
+        grammar = grammar.freeze()
+        self.grammar = grammar
+        self.rules = grammar.rules
+        self.lhs = [rule.lhs for rule in self.rules] + [-1]
+        self.rhs = [tuple(x for x in rule.rhs if x != SymbolTable.EPS) for rule in self.rules]
+        self.rhs.append((grammar.start_symbol.id,))
+        self.by_lhs = grammar.rules_by_lhs()
+
+        self.first = {}
+        self.nullable = set()
+        for nterm, strings in lookaheadUtils.firstKIds(grammar, 1).items():
+            self.first[nterm] = {x[0] for x in strings if x}
+            if () in strings:
+                self.nullable.add(nterm)
+        self.suffix = {}
+
+        self.states = []
+        self.transitions = []
+        self.build()
+
+    def firstOfSuffix(self, rule: int, pos: int) -> Tuple[FrozenSet[int], bool]:
+        """
+        returns FIRST_1 of the right part of the rule after pos and whether it is nullable
+        """
+        key = (rule, pos)
+        if key not in self.suffix:
+            ans = set()
+            nullable = True
+            for sid in self.rhs[rule][pos:]:
+                if SymbolTable.terminal[sid]:
+                    ans.add(sid)
+                    nullable = False
+                    break
+                ans.update(self.first[sid])
+                if sid not in self.nullable:
+                    nullable = False
+                    break
+            self.suffix[key] = (frozenset(ans), nullable)
+        return self.suffix[key]
+
+    def closure(self, kernel: FrozenSet[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+        items = list(kernel)
+        seen = set(kernel)
+        i = 0
+        while i < len(items):
+            rule, dot, lookahead = items[i]
+            i += 1
+            rhs = self.rhs[rule]
+            if dot == len(rhs) or SymbolTable.terminal[rhs[dot]]:
+                continue
+            first, nullable = self.firstOfSuffix(rule, dot + 1)
+            lookaheads = first | {lookahead} if nullable else first
+            for other in self.by_lhs.get(rhs[dot], ()):
+                for x in lookaheads:
+                    item = (other, 0, x)
+                    if item not in seen:
+                        seen.add(item)
+                        items.append(item)
+        return items
+
+    def build(self) -> None:
+        start = frozenset([(len(self.rules), 0, -1)])
+        index = {start: 0}
+        self.states.append(start)
+        self.transitions.append({})
+        i = 0
+        while i < len(self.states):
+            kernels = {}
+            for rule, dot, lookahead in self.closure(self.states[i]):
+                rhs = self.rhs[rule]
+                if dot < len(rhs):
+                    kernels.setdefault(rhs[dot], set()).add((rule, dot + 1, lookahead))
+            for symbol, kernel in kernels.items():
+                kernel = frozenset(kernel)
+                if kernel not in index:
+                    index[kernel] = len(self.states)
+                    self.states.append(kernel)
+                    self.transitions.append({})
+                self.transitions[i][symbol] = index[kernel]
+            i += 1
+
+    def core(self, state: int) -> FrozenSet[Tuple[int, int]]:
+        return frozenset((rule, dot) for rule, dot, _ in self.states[state])
+
+
+def buildLRTable(grammar: Grammar, lalr: bool = True):
+    """
+    builds LR(1) table of the grammar, with lalr set states with the same
+    core are merged into LALR(1) table
+    this function returns table, reverse_ordering
+    table : LRTable
+    reverse_ordering : dict[int, Rule]
+
+    The function returns None if the grammar has shift/reduce or reduce/reduce conflicts
+    """
+    automaton = LRAutomaton(grammar)
+    reverse_ordering = dict(enumerate(automaton.rules))
+    table = LRTable(grammar, reverse_ordering)
+    code = table.code()
+    code[-1] = table.end
+    index = {x.id: i for i, x in enumerate(table.nonterminals)}
+
+    merged = []
+    cores = {}
+    for state in range(len(automaton.states)):
+        key = automaton.core(state) if lalr else state
+        if key not in cores:
+            cores[key] = table.addState()
+        merged.append(cores[key])
+
+    for state, kernel in enumerate(automaton.states):
+        row = merged[state]
+        for symbol, target in automaton.transitions[state].items():
+            if SymbolTable.terminal[symbol]:
+                table.action[row * table.width + code[symbol]] = merged[target] + 1
+            else:
+                table.goto[row * len(table.nonterminals) + index[symbol]] = merged[target]
+
+    for state, kernel in enumerate(automaton.states):
+        row = merged[state]
+        for rule, dot, lookahead in automaton.closure(kernel):
+            if dot < len(automaton.rhs[rule]):
+                continue
+            cell = row * table.width + code[lookahead]
+            if table.action[cell] != 0 and table.action[cell] != ~rule:
+                return None
+            table.action[cell] = ~rule
+    return table, reverse_ordering
+
+
+def LRParser(string: str, table: LRTable, errors: List[ParseError] = None, stats: dict = None) -> List[int]:
+    """
+    Parse the given string using LR table
+    if the string can not be parsed returns None and appends the error to errors if it is given
+    otherwise returns the sequence of rules of the rightmost derivation of the string.
+    If stats is given, the high-water mark of the stack is kept in stats['stack']
+    """
+    codes = table.encode(string)
+    action, goto, lhs, length = table.action, table.goto, table.lhs, table.length
+    width, gotos = table.width, len(table.nonterminals)
+    stack = [0]
+    reductions = []
+    pos = 0
+    track = stats is not None
+    high = 0
+    while True:
+        if track and len(stack) > high:
+            high = stats['stack'] = len(stack)
+        act = action[stack[-1] * width + codes[pos]]
+        if act > 0:
+            stack.append(act - 1)
+            pos += 1
+        elif act < 0:
+            rule = ~act
+            if rule == table.accept:
+                break
+            if length[rule]:
+                del stack[-length[rule]:]
+            reductions.append(rule)
+            stack.append(goto[stack[-1] * gotos + lhs[rule]])
+        else:
+            if errors is not None:
+                row = stack[-1] * width
+                errors.append(tableError(table, string, pos, [c for c in range(width) if action[row + c] != 0]))
+            return None
+    reductions.reverse()
+    return reductions
+
+
+def LRRecognizer(string: str, table: LRTable, stack: List[int] = None, stats: dict = None) -> bool:
+    """
+    LRParser that only tells whether the string is accepted, reductions are not recorded.
+    stack is an optional list that is reused between calls.
+    If stats is given, the high-water mark of the stack is kept in stats['stack']
+    and the number of actions of an accepted string in stats['actions']
+    """
+    codes = table.encode(string)
+    action, goto, lhs, length = table.action, table.goto, table.lhs, table.length
+    width, gotos, accept = table.width, len(table.nonterminals), table.accept
+    if stack is None:
+        stack = []
+    stack.clear()
+    stack.append(0)
+    pos = 0
+    track = stats is not None
+    high = 0
+    actions = 0
+    while True:
+        if track:
+            actions += 1
+            if len(stack) > high:
+                high = stats['stack'] = len(stack)
+        act = action[stack[-1] * width + codes[pos]]
+        if act > 0:
+            stack.append(act - 1)
+            pos += 1
+        elif act < 0:
+            rule = ~act
+            if rule == accept:
+                if track:
+                    stats['actions'] = actions
+                return True
+            if length[rule]:
+                del stack[-length[rule]:]
+            stack.append(goto[stack[-1] * gotos + lhs[rule]])
+        else:
+            return False
+
+
+class LRParserWrapped(IParser):
+    """
+    Table driven LALR(1) parser, or canonical LR(1) if lalr is not set.
+    parse returns rules of the rightmost derivation of the string
+    """
+
+    rightmost = True
+
+    def __init__(self, lalr = True, cache = None):
+        """
+        cache is an optional TableCache for built tables
+        """
+        self.lalr = lalr
+        self.cache = cache
+        self.stack = []
+
+    def init(self, grammar:Grammar) -> None:
+        grammar = grammar.freeze()
+        self.grammar = grammar
+        if self.cache is None:
+            ret = self.build(grammar)
+        else:
+            kind = 'lalr' if self.lalr else 'lr'
+            table = self.cache.get(kind, grammar, 1, LRTable, lambda: (self.build(grammar) or [None])[0])
+            ret = None if table is None else (table, table.ordering)
+        if ret is None:
+            raise ValueError('grammar is not ' + ('LALR(1)' if self.lalr else 'LR(1)'))
+        self.table, self.order = ret
+
+    def build(self, grammar:Grammar):
+        with timer(self.instrumentation, self, 'table'):
+            return buildLRTable(grammar, self.lalr)
+
+    def run(self, s: str, stats) -> List[int]:
+        ret = LRParser(s, self.table, None, stats)
+        if stats is not None and ret is not None:
+            # shifts, reductions and the accept action
+            stats['actions'] = len(s) + len(ret) + 1
+        return ret
+
+    def diagnose(self, s: str, recover: bool = False) -> List[ParseError]:
+        errors = []
+        LRParser(s, self.table, errors)
+        return errors
+
+    def verify(self, s: str) -> bool:
+        return self.measured('verify', s, lambda stats: LRRecognizer(s, self.table, self.stack, stats))
+
+    def parse(self, s : str) -> List[Rule]:
+        ret = self.measured('parse', s, lambda stats: self.run(s, stats))
+        if ret is None:
+            return []
+        return [self.order[x] for x in ret]
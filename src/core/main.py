@@ -1,45 +1,88 @@
-from grammar import Terminal, NonTerminal, Rule, BaseSymbol, Grammar
-from lookaheadUtils import firstK, followK
-from src.core.llk import buildLLKTable, LLKParser
-from src.core.grammarGenerator import generateString
+import argparse
+import json
+import sys
+from collections import deque
+from core.bnf import loadGrammar
+from core.llk import LLKParserWrapped
+from core.codegen import LLKGeneratedParser
+from core.lr import LRParserWrapped
+from core.earley import EarleyParser
+from core.RecursiveParser import RecursiveParser
+from core.batch import imapParser
+from core.tablecache import TableCache
 
+ENGINES = {
+    'llk': lambda k, cache: LLKParserWrapped(k, cache),
+    'llk-adaptive': lambda k, cache: LLKParserWrapped(k, cache, adaptive=True),
+    'llk-dfa': lambda k, cache: LLKParserWrapped(k, cache, dfa=True),
+    'llk-generated': lambda k, cache: LLKGeneratedParser(k, cache),
+    'lalr': lambda k, cache: LRParserWrapped(True, cache),
+    'lr': lambda k, cache: LRParserWrapped(False, cache),
+    'earley': lambda k, cache: EarleyParser(),
+    'recursive': lambda k, cache: RecursiveParser(cache=cache),
+}
 
-grammar = Grammar.read(open("./gram.txt", "r"))
-k = 2
 
-first = firstK(grammar, k)
-for key, val in first.items():
-    print(key, val)
+def readLines(f):
+    for line in f:
+        yield line.rstrip('\r\n')
 
-print("-----------------------")
 
-follow = followK(grammar, k)
-for key, val in follow.items():
-    print(key, val)
+def main(argv = None) -> int:
+    """
+    Parses every line of the input file with the given grammar
+    and writes one JSON object per line to the output:
+    {"input": ..., "accepted": ...} for verify mode,
+    {"input": ..., "accepted": ..., "rules": [...]} for parse mode,
+    {"input": ..., "accepted": ..., "errors": [...]} for diagnose mode, 
+    errors are ParseError.asDict, with --recover all errors of the line are reported
+    """
+    args = argparse.ArgumentParser(description='Batch parsing of newline delimited strings')
+    args.add_argument('grammar', help='grammar file, .bnf files are read by readBNF, other ones by Grammar.read')
+    args.add_argument('input', help="newline delimited strings, '-' for stdin")
+    args.add_argument('-o', '--output', default='-', help="JSONL output, '-' for stdout")
+    args.add_argument('-e', '--engine', default='llk', choices=sorted(ENGINES))
+    args.add_argument('-k', type=int, default=1, help='lookahead of the llk engine, the longest one of llk-adaptive')
+    args.add_argument('-m', '--mode', default='verify', choices=['verify', 'parse', 'diagnose'])
+    args.add_argument('-p', '--processes', type=int, default=None, help='worker processes, all cores by default')
+    args.add_argument('--chunk-size', type=int, default=1024)
+    args.add_argument('--recover', action='store_true', help='report all errors of a line in diagnose mode')
+    args.add_argument('--cache', default=None, help='directory of cached parse tables')
+    args = args.parse_args(argv)
 
-print("--------------------")
+    grammar = loadGrammar(args.grammar).freeze()
+    cache = None if args.cache is None else TableCache(args.cache)
+    parser = ENGINES[args.engine](args.k, cache)
+    parser.init(grammar)
 
-out = buildLLKTable(grammar, k)
-if out:
-    table, ordering = out
-    for key, val in table.items():
-        print(key, val)
-    for key, val in ordering.items():
-        print(key, val)
-    
-    print("-----------------------")
-
-    string = "(a+a)*a"
-    sequence = LLKParser(string, grammar, table, ordering, k)
-    print(sequence)
-
-    print("-------------------------")
-
-    string = generateString(grammar, ordering, sequence)
-    print(string)
-else:
-    print(out)
+    source = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    strings = deque()
 
+    def remember(lines):
+        for line in lines:
+            strings.append(line)
+            yield line
 
+    try:
+        extra = (args.recover,) if args.mode == 'diagnose' else ()
+        results = imapParser(parser, args.mode, remember(readLines(source)), args.processes, args.chunk_size, extra)
+        for ret in results:
+            s = strings.popleft()
+            if args.mode == 'verify':
+                record = {'input': s, 'accepted': ret}
+            elif args.mode == 'diagnose':
+                record = {'input': s, 'accepted': not ret, 'errors': [x.asDict() for x in ret]}
+            else:
+                record = {'input': s, 'accepted': bool(ret), 'rules': [str(x) for x in ret]}
+            output.write(json.dumps(record) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 0
 
 
+if __name__ == '__main__':
+    sys.exit(main())
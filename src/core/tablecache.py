@@ -0,0 +1,151 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, Tuple, Optional
+from core.grammar import Grammar, Rule, Terminal, NonTerminal, SymbolTable
+
+MAGIC = b'MANGOTBL'
+FORMAT_VERSION = 1
+
+
+def grammarFingerprint(grammar : Grammar) -> str:
+    """
+    Cache key of the grammar, see Grammar.fingerprint
+    """
+    return grammar.fingerprint()
+
+
+def grammarToArrays(grammar : Grammar):
+    """
+    returns metadata and int arrays of the grammar for TableCache
+    """
+    symbols = {}
+    lhs, offsets, data = [], [0], []
+    for rule in grammar.rules:
+        for sid in (rule.lhs,) + rule.rhs:
+            symbols.setdefault(sid, len(symbols))
+        lhs.append(symbols[rule.lhs])
+        data.extend(symbols[x] for x in rule.rhs)
+        offsets.append(len(data))
+    meta = {
+        'start': grammar.start_symbol.name(),
+        'symbols': [[SymbolTable.terminal[x], SymbolTable.symbols[x].name()] for x in symbols],
+    }
+    return meta, {'lhs': lhs, 'offsets': offsets, 'data': data}
+
+
+def grammarFromArrays(meta, arrays) -> Grammar:
+    symbols = [Terminal(name, False) if terminal else NonTerminal(name) for terminal, name in meta['symbols']]
+    ids = [x.id for x in symbols]
+    offsets, data = arrays['offsets'], arrays['data']
+    rules = [
+        Rule.fromIds(ids[lhs], tuple(ids[x] for x in data[offsets[i]:offsets[i + 1]]))
+        for i, lhs in enumerate(arrays['lhs'])
+    ]
+    return Grammar(
+        set(x for x in symbols if isinstance(x, NonTerminal)),
+        set(x for x in symbols if isinstance(x, Terminal)),
+        rules,
+        NonTerminal(meta['start'])
+    )
+
+
+class TableCache:
+    """
+    Persistent cache of built parse tables in the given directory.
+    File name is made of the table kind, k and the grammar fingerprint,
+    so a changed grammar never hits a stale table.
+
+    File format (version 1):
+        magic 'MANGOTBL', u32 version, u32 header length, JSON header, padding to 4 bytes,
+        native int32 arrays listed in the header as [name, offset after the padding, length].
+    Files are loaded with mmap, arrays are memoryviews over the mapping,
+    so a warm start does not parse or copy the tables.
+    """
+
+    __slots__ = ['directory']
+
+    def __init__(self, directory : str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, kind : str, grammar : Grammar, k : int) -> str:
+        return os.path.join(self.directory, f'{kind}-{k}-{grammarFingerprint(grammar)}.tbl')
+
+    def load(self, kind : str, grammar : Grammar, k : int) -> Optional[Tuple[Dict, Dict[str, memoryview]]]:
+        """
+        returns (metadata, arrays) of the stored table or None,
+        a missing, truncated or corrupted file is a miss
+        """
+        path = self.path(kind, grammar, k)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return self.parse(mapped, kind, k)
+        except (struct.error, ValueError, KeyError, TypeError):
+            # json.JSONDecodeError and UnicodeDecodeError are ValueErrors
+            return None
+
+    @staticmethod
+    def parse(mapped : mmap.mmap, kind : str, k : int) -> Optional[Tuple[Dict, Dict[str, memoryview]]]:
+        if mapped[:len(MAGIC)] != MAGIC:
+            return None
+        version, length = struct.unpack_from('<II', mapped, len(MAGIC))
+        if version != FORMAT_VERSION:
+            return None
+        start = len(MAGIC) + 8
+        if start + length > len(mapped):
+            return None
+        header = json.loads(bytes(mapped[start:start + length]))
+        if header['byteorder'] != sys.byteorder or header['kind'] != kind or header['k'] != k:
+            return None
+        start += length
+        start += -start % 4
+        view = memoryview(mapped)
+        arrays = {}
+        for name, offset, size in header['arrays']:
+            if offset < 0 or size < 0 or start + offset + 4 * size > len(mapped):
+                return None
+            arrays[name] = view[start + offset:start + offset + 4 * size].cast('i')
+        return header['meta'], arrays
+
+    def store(self, kind : str, grammar : Grammar, k : int, meta : Dict, arrays : Dict) -> None:
+        blobs = []
+        entries = []
+        offset = 0
+        for name in sorted(arrays):
+            blobs.append(array('i', arrays[name]).tobytes())
+            entries.append([name, offset, len(blobs[-1]) // 4])
+            offset += len(blobs[-1])
+        header = {'kind': kind, 'k': k, 'byteorder': sys.byteorder, 'meta': meta, 'arrays': entries}
+        encoded = json.dumps(header).encode()
+        data = MAGIC + struct.pack('<II', FORMAT_VERSION, len(encoded)) + encoded
+        data += b'\0' * (-len(data) % 4) + b''.join(blobs)
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self.path(kind, grammar, k))
+
+    def get(self, kind : str, grammar : Grammar, k : int, cls, build):
+        """
+        returns the table of the grammar from the cache, or builds it with build()
+        and stores it, cls should provide toArrays and static fromArrays
+        """
+        loaded = self.load(kind, grammar, k)
+        if loaded is not None:
+            try:
+                return cls.fromArrays(grammar, *loaded)
+            except (KeyError, TypeError, ValueError, IndexError):
+                # the arrays do not make a table, it is rebuilt and overwritten
+                pass
+        table = build()
+        if table is not None:
+            self.store(kind, grammar, k, *table.toArrays())
+        return table
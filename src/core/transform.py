@@ -0,0 +1,318 @@
+from typing import List, Tuple, Optional, Sequence, Union
+from core.grammar import Grammar, Rule, NonTerminal, SymbolTable
+
+
+def sequence(*parts : Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+    concatenation of right parts without eps, (EPS,) if it is empty
+    """
+    ans = tuple(x for part in parts for x in part if x != SymbolTable.EPS)
+    return ans or (SymbolTable.EPS,)
+
+
+class Partial:
+    """
+    children of a factored suffix, they are spliced into the parent node
+    """
+
+    __slots__ = ['children']
+
+    def __init__(self, children : List) -> None:
+        self.children = children
+
+
+class Tail:
+    """
+    one tail A' -> alpha A' of removed left recursion: the rule A -> A alpha and the children of alpha,
+    next is the tail of the nested A' or None
+    """
+
+    __slots__ = ['rule', 'children', 'next']
+
+    def __init__(self, rule : int, children : List, next : Optional['Tail']) -> None:
+        self.rule = rule
+        self.children = children
+        self.next = next
+
+
+class TransformStep:
+    """
+    One transformation of grammar `before` into grammar `after`.
+    actions[r] tells how a node of rule r of `after` is rebuilt from its rebuilt children
+    into nodes of `before` (nodes are [symbol, rule, children], leaves have rule -1):
+        ('same', b)             - node of rule b with the same children
+        ('lookup',)             - Partial children are spliced, the rule of `before` is found by its right part
+        ('partial',)            - rule of a factored suffix, Partial of the spliced children
+        ('expand', a, b, n)     - rule A -> Bx made by substitution of B -> y: node A of rule a whose first child
+                                  is node B of rule b with the first n children
+        ('base', b)             - A -> y A': node of rule b with children of y, then wrapped by the tails of A'
+        ('tail', b)             - A' -> x A': Tail of rule A -> Ax
+        ('end',)                - A' -> eps
+    """
+
+    __slots__ = ['before', 'after', 'actions', 'index']
+
+    def __init__(self, before : Grammar, after : Grammar, actions : List[Tuple]) -> None:
+        self.before = before
+        self.after = after
+        self.actions = actions
+        self.index = {(rule.lhs, rule.rhs): i for i, rule in enumerate(before.rules)}
+
+    def rebuild(self, node, children : List):
+        action = self.actions[node[1]]
+        kind = action[0]
+        if kind == 'same':
+            return (node[0], action[1], children)
+        if kind == 'lookup' or kind == 'partial':
+            spliced = []
+            for child in children:
+                if isinstance(child, Partial):
+                    spliced.extend(child.children)
+                else:
+                    spliced.append(child)
+            if kind == 'partial':
+                return Partial(spliced)
+            rhs = sequence(tuple(x[0] for x in spliced))
+            return (node[0], self.index[(node[0], rhs)], spliced)
+        if kind == 'expand':
+            _, outer, inner, n = action
+            inner_node = (self.before.rules[outer].rhs[0], inner, children[:n])
+            return (node[0], outer, [inner_node] + children[n:])
+        if kind == 'base':
+            ans = (node[0], action[1], children[:-1])
+            tail = children[-1]
+            while tail is not None:
+                ans = (node[0], tail.rule, [ans] + tail.children)
+                tail = tail.next
+            return ans
+        if kind == 'tail':
+            return Tail(action[1], children[:-1], children[-1])
+        return None
+
+    def apply(self, root):
+        """
+        rebuilds the tree of `after` into the tree of `before` bottom up without recursion
+        """
+        stack = [(root, False)]
+        values = []
+        while stack:
+            node, done = stack.pop()
+            if done:
+                count = len(node[2])
+                children = values[len(values) - count:]
+                del values[len(values) - count:]
+                values.append(self.rebuild(node, children))
+            elif node[1] < 0:
+                values.append(node)
+            else:
+                stack.append((node, True))
+                stack.extend((x, False) for x in reversed(node[2]))
+        return values[0]
+
+
+class GrammarTransform:
+    """
+    Left-factoring and removal of left recursion, made by transformGrammar.
+        original    - the grammar that was transformed
+        grammar     - the transformed grammar, it derives the same strings
+        steps       - TransformSteps from the original grammar to the transformed one
+    translate maps derivations of the transformed grammar back to derivations of the original one.
+    """
+
+    __slots__ = ['original', 'grammar', 'steps']
+
+    def __init__(self, original : Grammar) -> None:
+        self.original = original
+        self.grammar = original
+        self.steps = []
+
+    def fresh(self, nterm : int, taken = ()) -> int:
+        """
+        returns a new nonterminal named after nterm with primes, 
+        it is not in the grammar and not one of the taken ids
+        """
+        names = {x.name() for x in self.grammar.non_terms} | {SymbolTable.symbols[x].name() for x in taken}
+        name = SymbolTable.symbols[nterm].name() + "'"
+        while name in names:
+            name += "'"
+        return NonTerminal(name).id
+
+    def push(self, rules : List[Rule], actions : List[Tuple]) -> None:
+        """
+        makes the grammar of rules the current one
+        """
+        before = self.grammar
+        ids = {x for rule in rules for x in (rule.lhs,) + rule.rhs}
+        non_terms = set(before.non_terms) | {SymbolTable.symbols[x] for x in ids if not SymbolTable.terminal[x]}
+        after = Grammar(non_terms, before.terms, rules, before.start_symbol)
+        self.steps.append(TransformStep(before, after, actions))
+        self.grammar = after
+
+    def substitute(self, nterm : int, inner : int) -> bool:
+        """
+        replaces rules nterm -> inner x with nterm -> y x for every rule inner -> y
+        """
+        rules = self.grammar.rules
+        if not any(rule.lhs == nterm and rule.rhs[0] == inner for rule in rules):
+            return False
+        inner_rules = [(i, rule) for i, rule in enumerate(rules) if rule.lhs == inner]
+        ans = {}
+        for i, rule in enumerate(rules):
+            if rule.lhs == nterm and rule.rhs[0] == inner:
+                for j, other in inner_rules:
+                    new = Rule.fromIds(nterm, sequence(other.rhs, rule.rhs[1:]))
+                    count = sum(1 for x in other.rhs if x != SymbolTable.EPS)
+                    ans.setdefault(new, ('expand', i, j, count))
+            else:
+                ans.setdefault(rule, ('same', i))
+        self.push(list(ans), list(ans.values()))
+        return True
+
+    def removeDirect(self, nterm : int) -> bool:
+        """
+        replaces A -> A x | y with A -> y A', A' -> x A' | eps, rules A -> A are dropped,
+        they derive no new strings and no derivation of the new grammar uses them
+        """
+        rules = self.grammar.rules
+        units = [i for i, rule in enumerate(rules) if rule.lhs == nterm and rule.rhs == (nterm,)]
+        recursive = [i for i, rule in enumerate(rules) if rule.lhs == nterm and rule.rhs[0] == nterm and len(rule.rhs) > 1]
+        if not recursive:
+            if not units:
+                return False
+            kept = [(rule, ('same', i)) for i, rule in enumerate(rules) if i not in units]
+            self.push([x for x, _ in kept], [x for _, x in kept])
+            return True
+        helper = self.fresh(nterm)
+        ans = {}
+        for i, rule in enumerate(rules):
+            if rule.lhs != nterm:
+                ans.setdefault(rule, ('same', i))
+            elif rule.rhs[0] != nterm:
+                ans.setdefault(Rule.fromIds(nterm, sequence(rule.rhs, (helper,))), ('base', i))
+        for i in recursive:
+            ans.setdefault(Rule.fromIds(helper, rules[i].rhs[1:] + (helper,)), ('tail', i))
+        ans.setdefault(Rule.fromIds(helper, (SymbolTable.EPS,)), ('end',))
+        self.push(list(ans), list(ans.values()))
+        return True
+
+    def removeLeftRecursion(self) -> None:
+        """
+        Paull's algorithm on the nonterminals that are left recursive: they are ordered
+        by first occurrence, rules A_i -> A_j x with j < i of the same cycle are substituted,
+        then direct left recursion of A_i is removed. Left recursion that is hidden behind nullable
+        symbols is not removed
+        """
+        order = list(dict.fromkeys(rule.lhs for rule in self.grammar.rules))
+        corners = {x: set() for x in order}
+        for rule in self.grammar.rules:
+            if not SymbolTable.terminal[rule.rhs[0]]:
+                corners[rule.lhs].add(rule.rhs[0])
+        reach = {}
+        for nterm in order:
+            seen = set()
+            stack = list(corners[nterm])
+            while stack:
+                x = stack.pop()
+                if x not in seen:
+                    seen.add(x)
+                    stack.extend(corners.get(x, ()))
+            reach[nterm] = seen
+        cyclic = [x for x in order if x in reach[x]]
+        for i, nterm in enumerate(cyclic):
+            for inner in cyclic[:i]:
+                if nterm in reach[inner] and inner in reach[nterm]:
+                    self.substitute(nterm, inner)
+            self.removeDirect(nterm)
+
+    def factor(self) -> None:
+        """
+        replaces rules A -> x y_1 | ... | x y_n with the longest common prefix x with A -> x A',
+        A' -> y_1 | ... | y_n until no two rules of a nonterminal start with the same symbol
+        """
+        rules = list(self.grammar.rules)
+        helpers = set()
+        pending = list(dict.fromkeys(rule.lhs for rule in rules))
+        changed = False
+        while pending:
+            nterm = pending.pop()
+            groups = {}
+            for rule in rules:
+                if rule.lhs == nterm and rule.rhs[0] != SymbolTable.EPS:
+                    groups.setdefault(rule.rhs[0], []).append(rule)
+            for group in groups.values():
+                if len(group) < 2:
+                    continue
+                prefix = group[0].rhs
+                for rule in group[1:]:
+                    length = 0
+                    while length < min(len(prefix), len(rule.rhs)) and prefix[length] == rule.rhs[length]:
+                        length += 1
+                    prefix = prefix[:length]
+                helper = self.fresh(nterm, helpers)
+                helpers.add(helper)
+                position = rules.index(group[0])
+                group = set(group)
+                suffixes = [Rule.fromIds(helper, sequence(x.rhs[len(prefix):])) for x in rules if x in group]
+                rules = [x for x in rules if x not in group]
+                rules[position:position] = [Rule.fromIds(nterm, prefix + (helper,))] + suffixes
+                pending.append(helper)
+                changed = True
+        if changed:
+            actions = [('partial',) if rule.lhs in helpers else ('lookup',) for rule in rules]
+            self.push(rules, actions)
+
+    def translate(self, derivation : Sequence[Union[Rule, int]]) -> List[int]:
+        """
+        returns numbers of rules of the original grammar of the leftmost derivation of the same tree,
+        derivation is a leftmost derivation of the transformed grammar as rules or their numbers
+        """
+        rules = self.grammar.rules
+        if derivation and isinstance(derivation[0], Rule):
+            index = {rule: i for i, rule in enumerate(rules)}
+            derivation = [index[rule] for rule in derivation]
+        if not self.steps:
+            return list(derivation)
+        if not derivation:
+            raise ValueError('empty derivation')
+        terminal = SymbolTable.terminal
+        root = [rules[derivation[0]].lhs, -1, ()]
+        stack = [root]
+        for num in derivation:
+            if not stack or stack[-1][0] != rules[num].lhs:
+                raise ValueError(f'rule {rules[num]} does not continue the leftmost derivation')
+            node = stack.pop()
+            node[1] = num
+            node[2] = [[x, -1, ()] for x in rules[num].rhs if x != SymbolTable.EPS]
+            stack.extend(x for x in reversed(node[2]) if not terminal[x[0]])
+        if stack:
+            raise ValueError('derivation is incomplete')
+        for step in reversed(self.steps):
+            root = step.apply(root)
+        ans = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node[1] >= 0:
+                ans.append(node[1])
+                stack.extend(reversed(node[2]))
+        return ans
+
+    def translateRules(self, derivation : Sequence[Rule]) -> List[Rule]:
+        """
+        translate for the result of IParser.parse
+        """
+        if not derivation:
+            return []
+        return [self.original.rules[x] for x in self.translate(derivation)]
+
+
+def transformGrammar(grammar : Grammar, left_recursion : bool = True, factor : bool = True) -> GrammarTransform:
+    """
+    removes direct and indirect left recursion and then left-factors the grammar, see GrammarTransform
+    """
+    ans = GrammarTransform(grammar)
+    if left_recursion:
+        ans.removeLeftRecursion()
+    if factor:
+        ans.factor()
+    return ans
@@ -0,0 +1,175 @@
+from array import array
+from typing import List, Sequence, Iterator, Union
+from core.grammar import Rule, SymbolTable
+
+
+class ParseTree:
+    """
+    Parse tree stored in parallel int arrays, node i is described by
+        symbol[i]           - id of its symbol
+        rule[i]             - number of the rule in `rules` that expands it, -1 for leaves
+        first_child[i]      - its first child or -1
+        next_sibling[i]     - its next sibling or -1
+        start[i], end[i]    - span of input tokens it derives
+    Node 0 is the root. Epsilon rules have one eps leaf with the empty span.
+    Every traversal is iterative, so trees of any depth are fine.
+    """
+
+    __slots__ = ['rules', 'symbol', 'rule', 'first_child', 'next_sibling', 'start', 'end']
+
+    def __init__(self, rules : Sequence[Rule]) -> None:
+        self.rules = rules
+        self.symbol = array('i')
+        self.rule = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.start = array('i')
+        self.end = array('i')
+
+    def __len__(self) -> int:
+        return len(self.symbol)
+
+    def add(self, sid : int, rule : int = -1, start : int = 0, end : int = 0) -> int:
+        self.symbol.append(sid)
+        self.rule.append(rule)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.start.append(start)
+        self.end.append(end)
+        return len(self.symbol) - 1
+
+    def expand(self, node : int, rule : int) -> List[int]:
+        """
+        sets the rule of the node and creates its children, returns them in order
+        """
+        self.rule[node] = rule
+        children = [self.add(sid) for sid in self.rules[rule].rhs]
+        self.first_child[node] = children[0]
+        for x, y in zip(children, children[1:]):
+            self.next_sibling[x] = y
+        return children
+
+    def children(self, node : int) -> Iterator[int]:
+        child = self.first_child[node]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def preorder(self, node : int = 0) -> Iterator[int]:
+        """
+        yields nodes of the subtree, parents before children and children from left to right
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(list(self.children(node))))
+
+    def leaves(self, node : int = 0) -> Iterator[int]:
+        """
+        yields terminal leaves of the subtree from left to right, eps leaves are skipped
+        """
+        terminal = SymbolTable.terminal
+        for x in self.preorder(node):
+            if terminal[self.symbol[x]] and self.symbol[x] != SymbolTable.EPS:
+                yield x
+
+    def derivation(self, node : int = 0) -> List[Rule]:
+        """
+        returns rules of the leftmost derivation of the subtree
+        """
+        return [self.rules[self.rule[x]] for x in self.preorder(node) if self.rule[x] >= 0]
+
+    def maxStack(self, rightmost : bool = False) -> int:
+        """
+        returns the largest stack of the top-down (LL) parser that predicts the tree,
+        or of the bottom-up (LR) parser with its initial state if rightmost is set
+        """
+        ans = 1
+        # node and the number of symbols on the stack outside of its subtree
+        stack = [(0, 0)]
+        while stack:
+            node, outside = stack.pop()
+            if self.rule[node] < 0:
+                continue
+            children = [x for x in self.children(node) if self.symbol[x] != SymbolTable.EPS]
+            n = len(children)
+            ans = max(ans, outside + n + rightmost)
+            for i, x in enumerate(children):
+                stack.append((x, outside + (i if rightmost else n - 1 - i)))
+        return ans
+
+    def subtree(self, node : int) -> 'ParseTree':
+        """
+        returns a copy of the subtree of the node, its spans are not changed
+        """
+        ans = ParseTree(self.rules)
+
+        def copy(x):
+            return ans.add(self.symbol[x], self.rule[x], self.start[x], self.end[x])
+
+        stack = [(node, copy(node))]
+        while stack:
+            old, new = stack.pop()
+            prev = -1
+            for child in self.children(old):
+                created = copy(child)
+                if prev < 0:
+                    ans.first_child[new] = created
+                else:
+                    ans.next_sibling[prev] = created
+                prev = created
+                stack.append((child, created))
+        return ans
+
+    def computeSpans(self, node : int = 0, pos : int = 0) -> int:
+        """
+        sets spans of the subtree that starts from token pos, returns the end of the subtree
+        """
+        terminal = SymbolTable.terminal
+        stack = [node]
+        while stack:
+            x = stack.pop()
+            if x < 0:
+                self.end[~x] = pos
+                continue
+            self.start[x] = pos
+            if self.rule[x] < 0:
+                if terminal[self.symbol[x]] and self.symbol[x] != SymbolTable.EPS:
+                    pos += 1
+                self.end[x] = pos
+                continue
+            stack.append(~x)
+            stack.extend(reversed(list(self.children(x))))
+        return pos
+
+    @staticmethod
+    def fromRules(derivation : Sequence[Union[Rule, int]], rules : Sequence[Rule] = None, rightmost : bool = False) -> 'ParseTree':
+        """
+        builds the tree of the leftmost (or rightmost) derivation, derivation is a list of rules
+        or of their numbers in rules. Without rules, rules are numbered in order of first use.
+        Raises ValueError if the derivation is not a derivation of a single tree
+        """
+        if not derivation:
+            raise ValueError('empty derivation')
+        if rules is None:
+            rules = list(dict.fromkeys(derivation))
+        if isinstance(derivation[0], Rule):
+            index = {rule: i for i, rule in enumerate(rules)}
+            derivation = [index[rule] for rule in derivation]
+
+        terminal = SymbolTable.terminal
+        tree = ParseTree(rules)
+        stack = [tree.add(rules[derivation[0]].lhs)]
+        for num in derivation:
+            if not stack:
+                raise ValueError('derivation is longer than the tree')
+            node = stack.pop()
+            if rules[num].lhs != tree.symbol[node]:
+                raise ValueError(f'rule {rules[num]} can not expand {SymbolTable.symbols[tree.symbol[node]]}')
+            pending = [x for x in tree.expand(node, num) if not terminal[tree.symbol[x]]]
+            stack.extend(pending if rightmost else reversed(pending))
+        if stack:
+            raise ValueError('derivation is incomplete')
+        tree.computeSpans()
+        return tree
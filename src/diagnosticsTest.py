@@ -0,0 +1,113 @@
+import unittest
+import io
+import json
+import os
+import pickle
+import tempfile
+import contextlib
+
+from core.grammar import Grammar
+from core.llk import LLKParserWrapped, LLKParser, LLKStreamParser, buildLLKTable
+from core.lr import LRParserWrapped
+from core.earley import EarleyParser
+from core.RecursiveParser import RecursiveParser
+from core.diagnostics import ParseError
+from core.lexer import Lexer
+from core import main
+from lexerTest import readRules
+
+
+class DiagnosticsTest(unittest.TestCase):
+    rules = ['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a']
+    grammar = Grammar.read(rules)
+
+    def testFirstError(self):
+        for parser in [LLKParserWrapped(1), LLKParserWrapped(2), LRParserWrapped(), EarleyParser()]:
+            parser.init(self.grammar)
+            self.assertEqual(parser.diagnose('a+a*(a)'), [])
+            error, = parser.diagnose('a+')
+            self.assertEqual((error.position, error.expected, error.found), (2, {'(', 'a'}, None))
+            error, = parser.diagnose('(a')
+            self.assertEqual((error.position, error.found), (2, None))
+            self.assertIn(')', error.expected)
+            error, = parser.diagnose('a+)')
+            self.assertEqual((error.position, error.found), (2, ')'))
+
+        parser = RecursiveParser(self.grammar)
+        self.assertEqual(parser.diagnose('a'), [])
+        self.assertIsNone(parser.diagnose('a+')[0].position)
+
+    def testSilent(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        lr = LRParserWrapped()
+        lr.init(self.grammar)
+        table, ordering = buildLLKTable(self.grammar, 2)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertFalse(parser.verify('a+'))
+            self.assertFalse(lr.verify('a)'))
+            self.assertIsNone(LLKParser('(a', self.grammar, table, ordering, 2))
+        self.assertEqual(output.getvalue(), '')
+
+        errors = []
+        self.assertIsNone(LLKParser('a+)', self.grammar, table, ordering, 2, errors))
+        self.assertEqual((errors[0].position, errors[0].expected, errors[0].nonterminal), (2, {'(', 'a'}, 'C'))
+
+    def testRecovery(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        errors = parser.diagnose('a++a*)a+(a', recover=True)
+        self.assertEqual([x.position for x in errors], [2, 5, 10])
+        self.assertEqual(errors[0], parser.diagnose('a++a*)a+(a')[0])
+        self.assertEqual(parser.diagnose('a+a', recover=True), [])
+        self.assertEqual([x.position for x in parser.diagnose('a)a)a', recover=True)], [1, 3])
+
+        lexer = Lexer(['if', 'then', '+'], {'id': '[a-z]+'}, skip=r'\s+')
+        parser.init(readRules([('S', ['if', 'E', 'then', 'S']), ('S', ['id']), ('E', ['id', 'R']),
+                               ('R', ['+', 'id', 'R']), ('R', [])]))
+        errors = parser.diagnose(lexer.tokenize('if x + then if y then z'), recover=True)
+        self.assertEqual([(x.position, x.found) for x in errors], [(3, 'then')])
+        errors = parser.diagnose(lexer.tokenize('if x + + y then if then z'), recover=True)
+        self.assertEqual([(x.position, x.found) for x in errors], [(3, '+'), (7, 'then')])
+
+    def testStream(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        with self.assertRaises(ParseError) as e:
+            list(LLKStreamParser('a+)', parser.table))
+        self.assertEqual((e.exception.position, e.exception.found), (2, ')'))
+        with self.assertRaises(ValueError):
+            list(LLKStreamParser(io.StringIO('(a'), parser.table))
+
+    def testSerialization(self):
+        error = ParseError(3, ['a', None], 'b', 'S')
+        self.assertEqual(pickle.loads(pickle.dumps(error)), error)
+        self.assertEqual(error.asDict(), {'position': 3, 'expected': [None, 'a'], 'found': 'b', 'nonterminal': 'S'})
+        self.assertEqual(str(error), "syntax error at 3: unexpected 'b', expected 'a' or end of input while parsing S")
+
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        self.assertEqual(parser.diagnose_many(['a', 'a+', '(a'], recover=True, processes=2, chunk_size=1),
+                         [parser.diagnose(s, True) for s in ['a', 'a+', '(a']])
+
+    def testCommandLine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            grammar = os.path.join(directory, 'gram.txt')
+            strings = os.path.join(directory, 'input.txt')
+            output = os.path.join(directory, 'output.jsonl')
+            with open(grammar, 'w') as f:
+                f.write('\n'.join(self.rules))
+            with open(strings, 'w') as f:
+                f.write('a+a\na++a*)a+(a\n')
+
+            self.assertEqual(main.main([grammar, strings, '-o', output, '-m', 'diagnose', '--recover', '-p', '1']), 0)
+            with open(output) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(records[0], {'input': 'a+a', 'accepted': True, 'errors': []})
+        self.assertEqual([x['position'] for x in records[1]['errors']], [2, 5, 10])
+        self.assertEqual(records[1]['errors'][2], {'position': 10, 'expected': [')'], 'found': None, 'nonterminal': None})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,64 @@
+import unittest
+import io
+import json
+
 from core.grammar import Grammar
 from core.llk import LLKParserWrapped
 from core.RecursiveParser import RecursiveParser
 from core.drawer import Visualiser
 
-grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
-parser = LLKParserWrapped(1)
-parser.init(grammar)
+class DrawerTest(unittest.TestCase):
+    grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+
+    def tree(self, s):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        return parser.tree(s)
+
+    def testDot(self):
+        f = io.StringIO()
+        Visualiser().write_dot(self.tree('(a+a)*a'), f)
+        lines = f.getvalue().splitlines()
+
+        self.assertEqual(lines[0], 'digraph "parsing result" {')
+        self.assertEqual(lines[-1], '}')
+        self.assertEqual(sum('->' in x and 'label' not in x for x in lines), len(self.tree('(a+a)*a')) - 1)
+        self.assertIn('"\'a\' (4)" color=Red', f.getvalue())
+
+    def testCollapse(self):
+        tree = self.tree('a+a+a')
+        full, small = io.StringIO(), io.StringIO()
+        Visualiser().write_dot(tree, full)
+        Visualiser().write_dot(tree, small, collapse_eps=True, collapse_repeated=True)
+
+        self.assertNotIn('eps', full.getvalue().replace('[eps]', ''))
+        self.assertIn('-> eps', small.getvalue())
+        self.assertIn('(= ', small.getvalue())
+        self.assertLess(len(small.getvalue()), len(full.getvalue()))
+
+    def testJson(self):
+        tree = self.tree('(a+a)*a')
+        f = io.StringIO()
+        Visualiser().write_json(tree, f)
+        nodes = json.loads(f.getvalue())
+
+        self.assertEqual(len(nodes), len(tree))
+        self.assertEqual(nodes[0], [0, 'S', tree.rule[0], 0, 7, -1, None])
+        self.assertEqual([x[0] for x in nodes], list(tree.preorder()))
+
+        f = io.StringIO()
+        Visualiser().write_json(tree, f, max_depth=1)
+        nodes = json.loads(f.getvalue())
+        self.assertEqual([x[6] for x in nodes], [None, 'cut', 'cut'])
+
+    def testDeepTree(self):
+        parser = LLKParserWrapped(1)
+        parser.init(Grammar.read(['S -> aS | eps']))
+        f = io.StringIO()
+        Visualiser().write_json(parser.tree('a' * 20000), f, collapse_eps=True)
+        self.assertEqual(sum(x[1] == 'a' for x in json.loads(f.getvalue())), 20000)
 
-order = parser.parse('(a+a)*a')
 
-drawer = Visualiser()
-drawer.draw(order)
\ No newline at end of file
+if __name__ == '__main__':
+    parser = RecursiveParser(DrawerTest.grammar)
+    Visualiser().draw(parser.parse('(a+a)*a'), rightmost=True)
@@ -0,0 +1,67 @@
+import unittest
+
+from core.grammar import Grammar, SymbolUtils
+from core.earley import EarleyParser
+from core.llk import LLKParserWrapped
+from core.grammarGenerator import generateString
+
+class ParserTest(unittest.TestCase):
+    def derive(self, grammar : Grammar, rules):
+        ordering = dict(enumerate(grammar.rules))
+        numbers = {rule: i for i, rule in ordering.items()}
+        return ''.join(str(x) for x in generateString(grammar, ordering, [numbers[x] for x in rules]) if not x.isEpsilon())
+
+    def testParserLL1(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+        parser = EarleyParser()
+        parser.init(grammar)
+
+        self.assertTrue(parser.verify('(a+a)*a'))
+        self.assertTrue(parser.verify('a+a'))
+        self.assertTrue(parser.verify('a'))
+        self.assertFalse(parser.verify('abc'))
+
+    def testParserLL2(self):
+        grammar = Grammar.read(['S -> aaA', 'A -> aAc | bBc', 'B -> bBc | bc'])
+        parser = EarleyParser(grammar)
+
+        # n = 2, m = 5
+        self.assertTrue(parser.verify('aaaabbbbbccccccc'))
+        self.assertFalse(parser.verify('aaaabbbbbcccccc'))
+
+    def testSameDerivationAsLL(self):
+        grammar = Grammar.read(['S -> aSA', 'S -> eps', 'A -> aabS | c'])
+        parser = EarleyParser(grammar)
+        llk = LLKParserWrapped(3)
+        llk.init(grammar)
+
+        for s in ['aaab', 'aaabaaab', 'aaabaaabac', '']:
+            self.assertEqual(parser.parse(s), llk.parse(s))
+
+    def testAmbiguousLeftRecursive(self):
+        grammar = Grammar.read(['S -> S+S | S*S | (S) | a'])
+        parser = EarleyParser(grammar)
+
+        for s in ['a', 'a+a*a', '(a+a)*a+a']:
+            self.assertEqual(self.derive(grammar, parser.parse(s)), s)
+        self.assertFalse(parser.verify('a+'))
+        self.assertEqual(parser.parse('a*'), [])
+
+    def testCyclicNullable(self):
+        grammar = Grammar.read(['S -> Sa | A', 'A -> B | eps', 'B -> A | b'])
+        parser = EarleyParser(grammar)
+
+        for s in ['', 'a', 'baa']:
+            self.assertEqual(self.derive(grammar, parser.parse(s)), s)
+        self.assertFalse(parser.verify('ab'))
+
+    def testLongInput(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+        parser = EarleyParser(grammar)
+
+        s = '+'.join(['a*(a+a)'] * 300)
+        self.assertEqual(self.derive(grammar, parser.parse(s)), s)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import io
+
+from core.grammar import Grammar
+from core.grammarGenerator import generateString, SentenceGenerator
+from core.earley import EarleyParser
+
+class GeneratorTest(unittest.TestCase):
+    grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+
+    def testReplay(self):
+        ordering = dict(enumerate(self.grammar.rules))
+        parser = EarleyParser(self.grammar)
+        numbers = {rule: i for i, rule in ordering.items()}
+        sequence = [numbers[x] for x in parser.parse('(a+a)*a')]
+
+        self.assertEqual(''.join(str(x) for x in generateString(self.grammar, ordering, sequence)), '(a+a)*a')
+        self.assertEqual([str(x) for x in generateString(self.grammar, ordering, sequence[:2])], ['D', 'C', 'A'])
+        self.assertIsNone(generateString(self.grammar, ordering, sequence[1:]))
+        self.assertIsNone(generateString(self.grammar, ordering, sequence + [0]))
+
+        long = SentenceGenerator(self.grammar, 100000, seed=1).derive()
+        self.assertEqual([x.id for x in generateString(self.grammar, ordering, long[0])], long[1])
+
+    def testSentences(self):
+        parser = EarleyParser(self.grammar)
+        sentences = list(SentenceGenerator(self.grammar, range(1, 30), seed=5).sentences(200))
+
+        self.assertTrue(all(parser.verify(s) for s in sentences))
+        self.assertEqual(sentences, list(SentenceGenerator(self.grammar, range(1, 30), seed=5).sentences(200)))
+        self.assertGreater(len(set(sentences)), 100)
+
+        near = list(SentenceGenerator(self.grammar, 10, seed=5).sentences(200, near_valid=1.0))
+        self.assertGreater(sum(not parser.verify(s) for s in near), 100)
+
+    def testLength(self):
+        grammar = Grammar.read(['S -> aS | eps'])
+        generator = SentenceGenerator(grammar, lambda rnd: rnd.randint(0, 50), seed=0)
+        for _ in range(20):
+            length = generator.target()
+            self.assertEqual(generator.sentence(length), 'a' * length)
+
+    def testTargetLength(self):
+        # the length is spread over the sentence, not spent by the leftmost nonterminal
+        for rules in [['S -> AB', 'A -> aA | a', 'B -> bB | b'], ['S -> Sa | b']]:
+            generator = SentenceGenerator(Grammar.read(rules), 30, seed=1)
+            self.assertTrue(all(len(s) == 30 for s in generator.sentences(50)))
+
+    def testTermination(self):
+        grammar = Grammar.read(['S -> aSb | A', 'A -> B | Ac', 'B -> A | d'])
+        parser = EarleyParser(grammar)
+        self.assertTrue(all(parser.verify(s) for s in SentenceGenerator(grammar, 50, seed=0, max_depth=10).sentences(50)))
+        self.assertRaises(ValueError, SentenceGenerator, Grammar.read(['S -> aS']))
+
+    def testWrite(self):
+        f = io.StringIO()
+        SentenceGenerator(self.grammar, 5, seed=0).write(f, 2500, batch=1000)
+        self.assertEqual(f.getvalue().splitlines(), list(SentenceGenerator(self.grammar, 5, seed=0).sentences(2500)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import pickle
+
+from copy import deepcopy
+from core.grammar import Grammar, FrozenGrammar, SymbolUtils, SymbolTable, Terminal, NonTerminal, Rule
+from core.lookaheadUtils import lookaheadUtils
+from core.llk import LLKParserWrapped
+from core.earley import EarleyParser
+from core.RecursiveParser import RecursiveParser
+from itertools import product
+
+class GrammarTest(unittest.TestCase):
+    def testSymbolsInterned(self):
+        self.assertIs(Terminal('a'), SymbolUtils.getSymbol('a'))
+        self.assertIs(NonTerminal('S'), deepcopy(NonTerminal('S')))
+        self.assertIs(Terminal('eps'), pickle.loads(pickle.dumps(Terminal('eps'))))
+        self.assertEqual(SymbolTable.lookup(Terminal, 'a'), Terminal('a').id)
+        self.assertEqual(SymbolTable.lookup(Terminal, 'no such terminal'), -1)
+
+    def testRemoveEpsRulesKeepsStart(self):
+        read = Grammar.read(['E -> aE | eps'])
+        grammar = Grammar(read.non_terms, read.terms, read.rules, NonTerminal('E'))
+        self.assertEqual(grammar.remove_eps_rules().start_symbol, NonTerminal('E'))
+        self.assertEqual(grammar.freeze().remove_eps_rules().start_symbol, NonTerminal('E'))
+
+    def testRulesPacked(self):
+        grammar = Grammar.read(['S -> aSb | eps'])
+        rule = grammar.rules[0]
+        self.assertEqual(rule.lhs, NonTerminal('S').id)
+        self.assertEqual(rule.rhs, tuple(x.id for x in SymbolUtils.getSymbols('aSb')))
+        self.assertEqual(rule.en, SymbolUtils.getSymbols('aSb'))
+        self.assertEqual(rule, Rule(NonTerminal('S'), SymbolUtils.getSymbols('aSb')))
+        self.assertEqual(len({rule, Rule.fromIds(rule.lhs, rule.rhs)}), 1)
+
+    def testRulesOrdered(self):
+        grammar = Grammar.read(['S -> aA | b', 'A -> a | b | a'])
+        self.assertEqual([str(x) for x in grammar.rules], ['S -> aA', 'S -> b', 'A -> a', 'A -> b'])
+
+    def testFrozenGrammar(self):
+        grammar = Grammar.read(['S -> aSA | eps', 'A -> aabS | c | B', 'B -> eps'])
+        frozen = grammar.freeze()
+
+        self.assertIs(frozen.freeze(), frozen)
+        self.assertEqual(frozen, Grammar.read(['S -> aSA | eps', 'A -> aabS | c | B', 'B -> eps']).freeze())
+        self.assertEqual(frozen.fingerprint(), grammar.fingerprint())
+        self.assertRaises(TypeError, frozen.add_rule, Rule(NonTerminal('S'), SymbolUtils.getSymbols('c')))
+        self.assertEqual(frozen.nullable(), {NonTerminal('S').id, NonTerminal('A').id, NonTerminal('B').id})
+        self.assertEqual(set(frozen.find_creatures()), set(grammar.find_creatures()))
+        self.assertEqual(frozen.rules_by_lhs()[NonTerminal('A').id], (2, 3, 4))
+        self.assertIs(frozen.remove_eps_rules(), frozen.remove_eps_rules())
+        self.assertEqual(set(frozen.remove_eps_rules().rules), set(grammar.remove_eps_rules().rules))
+
+    def testFrozenAnalysesShared(self):
+        frozen = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a']).freeze()
+        first = lookaheadUtils.firstKIds(frozen, 2)
+        self.assertIs(lookaheadUtils.firstKIds(frozen, 2), first)
+        self.assertIsNot(lookaheadUtils.firstKIds(frozen, 1), first)
+        self.assertIs(lookaheadUtils.followKIds(frozen, 2), lookaheadUtils.followKIds(frozen, 2, first))
+
+        parsers = [LLKParserWrapped(2), LLKParserWrapped(2)]
+        for parser in parsers:
+            parser.init(frozen)
+        self.assertIs(parsers[0].grammar, parsers[1].grammar)
+        self.assertEqual(pickle.loads(pickle.dumps(frozen)), frozen)
+
+    def testAddRule(self):
+        grammar = Grammar.read(['S -> aA', 'A -> b'])
+        grammar.add_rule(Rule(NonTerminal('A'), SymbolUtils.getSymbols('b')))
+        grammar.add_rule(Rule(NonTerminal('A'), SymbolUtils.getSymbols('Sc')))
+        grammar.add_rule(Rule(NonTerminal('A'), SymbolUtils.getSymbols('Sc')))
+        self.assertEqual([str(x) for x in grammar.rules], ['S -> aA', 'A -> b', 'A -> Sc'])
+        self.assertIn(Terminal('c'), grammar.terms)
+
+    def testRemoveEpsRules(self):
+        grammar = Grammar.read(['S -> ABaB | C', 'A -> BAb | eps', 'B -> SA | A', 'C -> CC | ABA | c'])
+        self.assertEqual(grammar.nullable(), {NonTerminal('A').id, NonTerminal('B').id, NonTerminal('C').id, NonTerminal('S').id})
+        self.assertEqual(grammar.nullable(), grammar.freeze().nullable())
+        plain = grammar.remove_eps_rules()
+        binary = grammar.remove_eps_rules(binarize=True)
+        self.assertFalse(any(rule.rhs == (rule.lhs,) or SymbolTable.EPS in rule.rhs for rule in plain.rules))
+        nullable = grammar.nullable()
+        self.assertTrue(all(sum(x in nullable for x in rule.rhs) <= 2 for rule in binary.rules))
+
+        parsers = [EarleyParser(grammar), EarleyParser(plain), EarleyParser(binary)]
+        for n in range(1, 6):
+            for s in map(''.join, product('abc', repeat=n)):
+                self.assertEqual(len({x.verify(s) for x in parsers}), 1, s)
+
+    def testLongNullableRuns(self):
+        names = 'ABCDEFGHIJKLMNOPQRTUVWXYZ'
+        grammar = Grammar.read(['S -> a' + names * 2 + 'b'] + [x + ' -> ' + x.lower() + ' | eps' for x in names])
+        binary = grammar.freeze().remove_eps_rules(True)
+        self.assertLess(len(binary.rules), 10 * len(names) * 2)
+        parser = RecursiveParser(grammar, binarize=True)
+        self.assertTrue(parser.verify('acdb'))
+        self.assertFalse(parser.verify('asb'))
+        # one symbol repeated is merged while variants are built
+        self.assertEqual(len(Grammar.read(['S -> a' + 'A' * 60 + 'b', 'A -> a | eps']).remove_eps_rules().rules), 62)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import random
+
+from core.grammar import Grammar
+from core.llk import LLKParserWrapped, LLKTreeParser
+from core.incremental import IncrementalParser
+from core.grammarGenerator import SentenceGenerator
+
+
+class IncrementalTest(unittest.TestCase):
+    grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+
+    def nodes(self, tree):
+        return [(tree.symbol[x], tree.rule[x], tree.start[x], tree.end[x]) for x in tree.preorder()]
+
+    def check(self, parser, table):
+        full = LLKTreeParser(parser.text, table)
+        self.assertEqual(parser.tree is None, full is None)
+        if full is not None:
+            self.assertEqual(self.nodes(parser.tree.absolute()), self.nodes(full))
+
+    def testEdit(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        incremental = parser.incremental('a+a*a+(a)')
+
+        tree = incremental.edit(2, 1, '(a+a)')
+        self.assertEqual(incremental.text, 'a+(a+a)*a+(a)')
+        self.assertEqual((tree.start[0], tree.end[0]), (0, 13))
+        self.check(incremental, parser.table)
+        self.assertGreater(incremental.reused, 0)
+
+        errors = []
+        self.assertIsNone(incremental.edit(0, 1, '+', errors))
+        self.assertEqual(errors[0].position, 0)
+        self.assertIsNotNone(incremental.edit(0, 1, 'a'))
+        self.check(incremental, parser.table)
+
+        self.assertIsNotNone(incremental.edit(len(incremental.text), 0, '+a'))
+        self.assertIsNotNone(incremental.edit(0, 2, ''))
+        self.check(incremental, parser.table)
+
+    def testRandomEdits(self):
+        for k in (1, 2):
+            parser = LLKParserWrapped(k)
+            parser.init(self.grammar)
+            rnd = random.Random(k)
+            incremental = IncrementalParser(parser.table, SentenceGenerator(self.grammar, seed=k).sentence(300))
+            for _ in range(150):
+                if rnd.random() < 0.6:
+                    i, removed = rnd.choice([j for j, c in enumerate(incremental.text) if c == 'a']), 1
+                    inserted = rnd.choice(['(a+a)', 'a*a', 'a', 'a+a'])
+                else:
+                    i = rnd.randrange(len(incremental.text) + 1)
+                    removed = min(rnd.randrange(3), len(incremental.text) - i)
+                    inserted = rnd.choice(['', '+', 'a', '+a', '('])
+                old = incremental.text[i: i + removed]
+                incremental.edit(i, removed, inserted)
+                self.check(incremental, parser.table)
+                if incremental.tree is None or rnd.random() < 0.3:
+                    self.assertIsNotNone(incremental.edit(i, len(inserted), old))
+                    self.check(incremental, parser.table)
+
+    def testLocality(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        text = '+'.join(['(a*a+a)'] * 2000)
+        incremental = parser.incremental(text)
+        self.assertIsNotNone(incremental.edit(8001, 1, 'a*(a)'))
+        self.check(incremental, parser.table)
+        # only the spine of the list above the edit and the edited term are predicted again
+        self.assertLess(incremental.predicted, 1000 + 20)
+        self.assertIsNotNone(incremental.edit(81, 1, 'a*(a)'))
+        self.assertLess(incremental.predicted, 10 + 20)
+        self.check(incremental, parser.table)
+
+    def testBoundedWork(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        visited = []
+        for terms in (500, 2000, 8000):
+            incremental = parser.incremental('+'.join(['(a*a+a)'] * terms))
+            self.assertIsNotNone(incremental.edit(81, 1, 'a*(a)'))
+            self.assertIsNotNone(incremental.edit(81, 5, 'a'))
+            visited.append(incremental.visited)
+            size = len(incremental.tree)
+            for _ in range(20):
+                incremental.edit(81, 1, 'a*(a)')
+                incremental.edit(81, 5, 'a')
+            # dropped nodes are taken again by the next edits
+            self.assertEqual(len(incremental.tree), size)
+            self.assertEqual(incremental.tree.span(incremental.tree.first_child[0]), (0, 7))
+        self.check(incremental, parser.table)
+        # spans after the edit are relative, so the work does not depend on the length of the document
+        self.assertEqual(len(set(visited)), 1)
+        self.assertLess(visited[0], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import pickle
+from unittest import mock
+
+from core.grammar import Grammar
+from core.llk import LLKParserWrapped
+from core.lr import LRParserWrapped, LRRecognizer
+from core.tree import ParseTree
+from core.earley import EarleyParser
+from core.RecursiveParser import RecursiveParser
+from core.instrumentation import Instrumentation
+from core.grammarGenerator import SentenceGenerator
+
+
+class InstrumentationTest(unittest.TestCase):
+    grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+
+    def testDisabled(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        self.assertIsNone(parser.instrumentation)
+        self.assertTrue(parser.verify('a+a'))
+
+        instrumentation = parser.instrument()
+        parser.verify('a')
+        parser.instrument(None)
+        parser.verify('a')
+        self.assertEqual(instrumentation.counters[('LLKParserWrapped', 'verify', 'calls')], 1)
+
+    def testCounters(self):
+        for parser, names in [
+            (LLKParserWrapped(1), ['first', 'follow', 'table']),
+            (LRParserWrapped(), ['table']),
+            (EarleyParser(), ['prepare']),
+            (RecursiveParser(), ['eps_free']),
+        ]:
+            instrumentation = parser.instrument()
+            parser.init(self.grammar)
+            self.assertTrue(parser.verify('a+a*(a)'))
+            self.assertFalse(parser.verify('a+'))
+            self.assertTrue(parser.parse('(a)'))
+            engine = type(parser).__name__
+            stats = instrumentation.asDict()[engine]
+
+            self.assertEqual(stats['verify']['calls'], 2)
+            self.assertEqual(stats['verify']['rejected'], 1)
+            self.assertEqual(stats['verify']['tokens'], 9)
+            self.assertEqual(stats['parse']['calls'], 1)
+            self.assertTrue(all(name in stats for name in names))
+            self.assertTrue(all(x['seconds'] >= 0 for x in stats.values()))
+
+        self.assertGreater(stats['verify']['backtracks'], 0)
+        self.assertGreater(stats['verify']['depth'], 0)
+
+    def testStack(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        lr = LRParserWrapped()
+        lr.init(self.grammar)
+        generator = SentenceGenerator(self.grammar, seed=3)
+        for _ in range(20):
+            s = generator.sentence(30)
+            stats = {}
+            sequence = parser.run(s, stats)
+            # replay of the LL stack
+            table, stack, high, rules = parser.table, [parser.table.start], 1, iter(sequence)
+            while stack:
+                item = stack.pop()
+                if item >= 0:
+                    stack.extend(table.rhs[next(rules)])
+                    high = max(high, len(stack))
+            self.assertEqual(stats['stack'], high)
+            self.assertEqual(stats['predictions'], len(sequence))
+            self.assertEqual(stats['stack'], ParseTree.fromRules(sequence, parser.order).maxStack())
+            # the recognizer of verify measures the same
+            recognized = {}
+            self.assertTrue(parser.check(s, recognized))
+            self.assertEqual(recognized, stats)
+
+            stats = {}
+            reductions = lr.run(s, stats)
+            self.assertEqual(stats['actions'], len(s) + len(reductions) + 1)
+            self.assertEqual(stats['stack'], ParseTree.fromRules(reductions, lr.order, rightmost=True).maxStack(rightmost=True))
+            recognized = {}
+            self.assertTrue(LRRecognizer(s, lr.table, None, recognized))
+            self.assertEqual(recognized, stats)
+
+    def testVerifyRecognizes(self):
+        # instrumented verify runs the recognizers, not the parsers
+        for parser in [LLKParserWrapped(1), LRParserWrapped()]:
+            instrumentation = parser.instrument()
+            parser.init(self.grammar)
+            with mock.patch.object(type(parser), 'run', side_effect=AssertionError):
+                self.assertTrue(parser.verify('(a+a)*a'))
+                self.assertFalse(parser.verify('(a+a'))
+            stats = instrumentation.asDict()[type(parser).__name__]['verify']
+            self.assertEqual(stats['calls'], 2)
+            self.assertGreater(stats['stack'], 2)
+
+    def testExport(self):
+        parser = LLKParserWrapped(1)
+        instrumentation = parser.instrument()
+        events = []
+        instrumentation.addHook(events.append, every=2)
+        parser.init(self.grammar)
+        for s in ['a', 'a+a', '(a)', '+']:
+            parser.verify(s)
+
+        self.assertEqual([x['length'] for x in events], [3, 1])
+        self.assertFalse(events[1]['accepted'])
+        text = instrumentation.toPrometheus('mp')
+        self.assertIn('# TYPE mp_calls_total counter', text)
+        self.assertIn('mp_calls_total{engine="LLKParserWrapped",method="verify"} 4', text)
+        self.assertIn('mp_stack_max{engine="LLKParserWrapped",method="verify"}', text)
+        self.assertIn('mp_seconds_total{engine="LLKParserWrapped",phase="first"}', text)
+
+        copy = pickle.loads(pickle.dumps(instrumentation))
+        self.assertEqual(copy.asDict(), instrumentation.asDict())
+        self.assertEqual(copy.hooks, [])
+        instrumentation.reset()
+        self.assertEqual(instrumentation.asDict(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from core.grammar import Grammar, Rule, Terminal, NonTerminal, SymbolUtils
+from core.lexer import Lexer
+from core.llk import LLKParserWrapped
+from core.lr import LRParserWrapped
+from core.earley import EarleyParser
+from core.RecursiveParser import RecursiveParser
+
+def readRules(rules):
+    """
+    rules are (lhs, [names of symbols of right part]), names of terminals are lowercase or signs
+    """
+    ans = [Rule(NonTerminal(lhs), [SymbolUtils.getSymbol(x) for x in rhs] or [Terminal('eps')]) for lhs, rhs in rules]
+    symbols = {x for rule in ans for x in (rule.st,) + rule.en}
+    return Grammar({x for x in symbols if isinstance(x, NonTerminal)}, {x for x in symbols if isinstance(x, Terminal)}, ans)
+
+class LexerTest(unittest.TestCase):
+    lexer = Lexer(['if', 'then', '=', '==', '+', '(', ')'], {'id': '[a-z_][a-z0-9_]*', 'num': r'\d+(\.\d+)?'}, skip=r'[ \t\n]+')
+
+    def names(self, text):
+        return [self.lexer.terminals[token].name() for token, _, _ in self.lexer.scan(text)]
+
+    def testLongestMatch(self):
+        self.assertEqual(self.names('if iff then x == 3.14'), ['if', 'id', 'then', 'id', '==', 'num'])
+        self.assertEqual(self.names('x=y+12.5'), ['id', '=', 'id', '+', 'num'])
+        self.assertEqual(list(self.lexer.scan('  if(')), [(0, 2, 4), (5, 4, 5)])
+        self.assertEqual(self.names(''), [])
+        self.assertRaises(ValueError, list, self.lexer.scan('x = 1 ; y'))
+
+    def testMinimized(self):
+        # minimal DFA of (a|b)*abb has 4 states and the dead state
+        lexer = Lexer(patterns={'word': '(a|b)*abb'})
+        self.assertEqual(lexer.states(), 5)
+        self.assertEqual(lexer.tokenize('babb'), [Terminal('word').id])
+        self.assertRaises(ValueError, lexer.tokenize, 'ab')
+        self.assertEqual(Lexer(patterns={'x': '[^a-c]+|\\W'}).tokenize('dzя'), [Terminal('x').id])
+        self.assertRaises(ValueError, Lexer, patterns={'x': '(ab'})
+
+    def testParseTokens(self):
+        grammar = readRules([
+            ('S', ['if', 'E', 'then', 'id', '=', 'E']),
+            ('E', ['T', 'A']), ('A', ['+', 'T', 'A']), ('A', []),
+            ('T', ['id']), ('T', ['num']), ('T', ['(', 'E', ')']),
+        ])
+        tokens = self.lexer.tokenize('if (x + 1) then y = y + 2.5')
+        wrong = self.lexer.tokenize('if x then 1 = y')
+        expected = LLKParserWrapped(1)
+        expected.init(grammar)
+        self.assertTrue(expected.verify(tokens))
+        self.assertFalse(expected.verify(wrong))
+
+        lalr = LRParserWrapped()
+        lalr.init(grammar)
+        for parser in [lalr, EarleyParser(grammar), RecursiveParser(grammar)]:
+            self.assertTrue(parser.verify(tokens))
+            self.assertFalse(parser.verify(wrong))
+        self.assertEqual(EarleyParser(grammar).parse(tokens), expected.parse(tokens))
+        self.assertEqual(list(expected.stream(iter(tokens))), [grammar.rules.index(x) for x in expected.parse(tokens)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
 import unittest
+import io
+import mmap
+import tempfile
 
-from core.grammar import Grammar, SymbolUtils
+from core.grammar import Grammar, SymbolUtils, TerminalCodes, Terminal
 from typing import Set
 from core import lookaheadUtils
-from core.llk import LLKParserWrapped
+from core.llk import LLKParserWrapped, buildLLKTable, buildAdaptiveLLKTable, LLKParser, LLKCompiledParser
+from core.llk import LLKCompiledRecognizer, buildLLKDFA, selfEmbedding
+from core.grammarGenerator import SentenceGenerator
+from core.tablecache import TableCache
 
 class ParserTest(unittest.TestCase):
     def testParserLL1(self):
@@ -16,6 +22,13 @@ class ParserTest(unittest.TestCase):
         self.assertTrue(parser.verify('a'))
         self.assertFalse(parser.verify('abc'))
 
+    def testNotLLK(self):
+        grammar = Grammar.read(['S -> aS | a'])
+        with tempfile.TemporaryDirectory() as directory:
+            for cache in [None, TableCache(directory)]:
+                with self.assertRaises(ValueError):
+                    LLKParserWrapped(1, cache).init(grammar)
+
     def testParserLL2(self):
         grammar = Grammar.read(['S -> aaA', 'A -> aAc | bBc', 'B -> bBc | bc'])
         parser = LLKParserWrapped(2)
@@ -42,6 +55,144 @@ class ParserTest(unittest.TestCase):
         self.assertTrue(parser.verify('aab'))
         self.assertTrue(parser.verify('aac'))
 
+    def testCompiledTable(self):
+        grammar = Grammar.read(['S -> aaB | aaC', 'B -> b', 'C -> c'])
+        table, order = buildLLKTable(grammar, 3)
+        compiled, _ = buildLLKTable(grammar, 3, compiled=True)
+
+        # B and C have one rule, they are predicted without reading input
+        self.assertTrue(compiled.entry[compiled.nonterminals.index(SymbolUtils.getSymbol('B'))] < 0)
+        self.assertEqual(len(compiled.cells) // compiled.width, 4)
+        for s in ['aab', 'aac', 'aa', 'aabb', 'abc', '']:
+            self.assertEqual(LLKCompiledParser(s, compiled), LLKParser(s, grammar, table, order, 3))
+
+    def testStream(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+        parser = LLKParserWrapped(1)
+        parser.init(grammar)
+        read = []
+
+        def source():
+            for ch in '(a+a)*a':
+                read.append(ch)
+                yield ch
+
+        stream = parser.stream(source())
+        # S and B have one rule, they are predicted before reading anything
+        self.assertEqual(parser.order[next(stream)], grammar.rules[0])
+        self.assertEqual(parser.order[next(stream)], grammar.rules[3])
+        self.assertEqual(len(read), 0)
+        self.assertEqual(parser.order[next(stream)], grammar.rules[6])
+        self.assertEqual(len(read), 1)
+        self.assertEqual([parser.order[x] for x in stream], parser.parse('(a+a)*a')[3:])
+        self.assertEqual(list(parser.stream(io.StringIO('a+a'))), list(parser.stream(['a+', 'a'])))
+        with self.assertRaises(ValueError):
+            list(parser.stream(io.StringIO('a+')))
+
+    def testBytesInput(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+        parser = LLKParserWrapped(1)
+        parser.init(grammar)
+        table, ordering = buildLLKTable(grammar, 1)
+        for s in ['(a+a)*a', 'a+', 'a+b', '']:
+            for buffer in [s.encode(), bytearray(s.encode()), memoryview(s.encode())]:
+                self.assertEqual(parser.parse(buffer), parser.parse(s))
+                self.assertEqual(parser.diagnose(buffer, recover=True), parser.diagnose(s, recover=True))
+                self.assertEqual(LLKParser(buffer, grammar, table, ordering, 1), LLKParser(s, grammar, table, ordering, 1))
+        self.assertEqual(list(parser.stream(io.BytesIO(b'a+a'))), list(parser.stream('a+a')))
+
+        # codes are one byte each, non-ASCII bytes are unknown symbols
+        codes = parser.table.encode('a+\u00e9'.encode())
+        self.assertIsInstance(codes, bytearray)
+        self.assertEqual(list(codes), parser.table.encode('a+??'))
+
+        with tempfile.TemporaryFile() as f:
+            f.write(b'+'.join([b'(a*a)'] * 1000))
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self.assertTrue(parser.verify(data))
+                self.assertEqual(len(parser.parse(data)), len(parser.parse(data[:])))
+
+        # without byte sized codes bytes are encoded into a list
+        many = Grammar.read(['S -> ' + ' | '.join(chr(c) for c in range(0x2200, 0x2300)) + ' | a'])
+        table = TerminalCodes(many)
+        self.assertIsNone(table.byte_table)
+        self.assertEqual(table.encode(b'ab'), table.encode('ab'))
+
+    def testRecognizer(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+        table, _ = buildLLKTable(grammar, 1, True)
+        stack = []
+        for s in ['(a+a)*a', 'a+', '((a)', 'a)', '']:
+            self.assertEqual(LLKCompiledRecognizer(s, table, stack), LLKCompiledParser(s, table) is not None)
+        # parentheses nest, so there is no DFA
+        self.assertEqual({x.name() for x in selfEmbedding(table)}, {'S', 'A', 'B', 'C', 'D'})
+        self.assertIsNone(buildLLKDFA(table))
+
+    def testDFA(self):
+        for rules, k in [
+            (['S -> AB', 'A -> aA | eps', 'B -> bcB | bd'], 2),
+            (['S -> aA | bB | eps', 'A -> aS | b', 'B -> cS | d'], 2),
+            (['S -> aaB | aaC | D', 'B -> bB | b', 'C -> c', 'D -> dD | e'], 3),
+        ]:
+            grammar = Grammar.read(rules)
+            parser = LLKParserWrapped(k, dfa=True)
+            parser.init(grammar)
+            self.assertIsNotNone(parser.automaton)
+            generator = SentenceGenerator(grammar, seed=1, max_depth=20)
+            for _ in range(300):
+                s = generator.sentence(generator.random.randint(0, 20), near_valid=0.5)
+                expected = LLKCompiledParser(s, parser.table) is not None
+                self.assertEqual(parser.verify(s), expected, s)
+                self.assertEqual(parser.verify(s.encode()), expected, s)
+        self.assertTrue(parser.verify([Terminal(x).id for x in 'aabb']))
+        self.assertEqual(parser.automaton.states(), 10)
+        self.assertIsNone(buildLLKDFA(parser.table, max_states=5))
+
+    def testEmptyLanguageDFA(self):
+        for rules in [['S -> S'], ['S -> baS'], ['S -> aAS', 'A -> bba']]:
+            parser = LLKParserWrapped(3, dfa=True)
+            parser.init(Grammar.read(rules))
+            self.assertEqual(parser.automaton.states(), 2)
+            for s in ['', 'a', 'ba', 'abba', 'x']:
+                self.assertFalse(parser.verify(s), s)
+                self.assertFalse(LLKCompiledRecognizer(s, parser.table))
+
+    def testAdaptiveTable(self):
+        grammar = Grammar.read(['S -> aaB | aaC | D', 'B -> b', 'C -> c', 'D -> dD | e'])
+        table, order, depths = buildAdaptiveLLKTable(grammar, 5)
+        depth = lambda name: depths[SymbolUtils.getSymbol(name).id]
+        # only S needs 3 symbols of lookahead
+        self.assertEqual((depth('S'), depth('B'), depth('D')), (3, 1, 1))
+        self.assertEqual(len(table[SymbolUtils.getSymbol('D').id]), 2)
+
+        compiled, _, _ = buildAdaptiveLLKTable(grammar, 5, compiled=True)
+        uniform, _ = buildLLKTable(grammar, 3, compiled=True)
+        self.assertEqual(compiled.k, 3)
+        self.assertLessEqual(len(compiled.cells), len(uniform.cells))
+        for s in ['aab', 'aac', 'ddde', 'e', 'aa', 'dd', 'aabb', '']:
+            self.assertEqual(LLKCompiledParser(s, compiled), LLKCompiledParser(s, uniform))
+
+    def testAdaptiveConflicts(self):
+        grammar = Grammar.read(['S -> A | B', 'A -> aaab', 'B -> aaac', 'C -> c'])
+        conflicts = []
+        self.assertIsNone(buildAdaptiveLLKTable(grammar, 3, conflicts=conflicts))
+        self.assertEqual(len(conflicts), 1)
+        conflict = conflicts[0]
+        self.assertEqual(conflict.nonterminal, SymbolUtils.getSymbol('S'))
+        self.assertEqual(conflict.rules, grammar.rules[:2])
+        self.assertEqual(conflict.lookaheads, [('a', 'a', 'a')])
+        self.assertIn('aaa', str(conflict).replace(' ', ''))
+
+        parser = LLKParserWrapped(3, adaptive=True)
+        with self.assertRaisesRegex(ValueError, 'S is not LL\\(3\\)'):
+            parser.init(grammar)
+        parser = LLKParserWrapped(4, adaptive=True)
+        parser.init(grammar)
+        self.assertEqual(parser.table.k, 4)
+        self.assertTrue(parser.verify('aaab'))
+        self.assertEqual(parser.diagnose('aaad', recover=True)[0].position, 3)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
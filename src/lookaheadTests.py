@@ -2,7 +2,7 @@ import unittest
 
 from core.grammar import Grammar, SymbolUtils
 from typing import Set
-from core.lookaheadUtils import lookaheadUtils
+from core.lookaheadUtils import lookaheadUtils, KStringSet
 
 class LookaheadUtilsTest(unittest.TestCase):
     def checkSets(self, a : Set, b : Set):
@@ -25,6 +25,58 @@ class LookaheadUtilsTest(unittest.TestCase):
         )
         self.assertTrue(True)
 
+    def testFollowKTable(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+
+        result = lookaheadUtils.followK(grammar, 1)
+        self.checkSets(
+            result[SymbolUtils.getSymbol('C')],
+            set([
+                SymbolUtils.getSymbols('eps'),
+                SymbolUtils.getSymbols('+'),
+                SymbolUtils.getSymbols(')')
+            ])
+        )
+
+    def testFirstComputedOnce(self):
+        grammar = Grammar.read(['S -> aSA', 'S -> eps', 'A -> aabS | c'])
+
+        first, follow = lookaheadUtils.firstFollowKIds(grammar, 3)
+        self.assertEqual(first, lookaheadUtils.firstKIds(grammar, 3))
+        self.assertEqual(follow, lookaheadUtils.followKIds(grammar, 3))
+
+    def testKStringSet(self):
+        # ids are digits plus one, so the largest id 9 needs a base of at least 11, see alphabetBase
+        base = 9 + 2
+        a = KStringSet(3, base, [(), (1,), (1, 2, 3)])
+        b = KStringSet(3, base, [(4, 5), (6, 7, 8, 9)])
+
+        self.assertIn((1, 2, 3), a)
+        self.assertNotIn((1, 2), a)
+        self.checkSets(set(a.concat(b)), {(4, 5), (6, 7, 8), (1, 4, 5), (1, 6, 7), (1, 2, 3)})
+        self.assertEqual(len(a.concat(KStringSet(3, base))), 0)
+        self.assertTrue(KStringSet(3, base, [(1,)]).issubset(a))
+
+        new = a.update(b)
+        self.assertEqual(len(new), 2)
+        self.assertEqual(len(a.update(b)), 0)
+        self.assertTrue(b.issubset(a))
+
+    def testKStringSetBase(self):
+        # with base 9, which is the largest id, (9, 0) would be 10 + 9 = 1 + 2 * 9, the code of (0, 1)
+        strings = [(9, 0), (0, 1)]
+        with self.assertRaises(ValueError):
+            KStringSet(2, 9, strings[:1])
+        with self.assertRaises(ValueError):
+            KStringSet(2, 10, strings[:1])
+        with self.assertRaises(ValueError):
+            KStringSet(2, 11, strings).update(KStringSet(2, 9, strings[1:]))
+
+        a = KStringSet(2, 9 + 2, strings)
+        self.assertEqual(len(a), 2)
+        self.checkSets(set(a), set(strings))
+        self.assertNotIn(strings[1], KStringSet(2, 9 + 2, strings[:1]))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import unittest
+
+from core.grammar import Grammar, NonTerminal
+from core.lr import LRParserWrapped, buildLRTable, LRParser, LRRecognizer
+
+class ParserTest(unittest.TestCase):
+    def rightmost(self, grammar : Grammar, rules) -> str:
+        form = [grammar.start_symbol]
+        for rule in rules:
+            pos = max(i for i, x in enumerate(form) if isinstance(x, NonTerminal))
+            self.assertEqual(form[pos], rule.st)
+            form[pos:pos + 1] = [x for x in rule.en if not x.isEpsilon()]
+        return ''.join(str(x) for x in form)
+
+    def testParserLL1(self):
+        grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a'])
+        parser = LRParserWrapped()
+        parser.init(grammar)
+
+        self.assertTrue(parser.verify('(a+a)*a'))
+        self.assertTrue(parser.verify('a+a'))
+        self.assertTrue(parser.verify('a'))
+        self.assertFalse(parser.verify('abc'))
+
+    def testLeftRecursive(self):
+        grammar = Grammar.read(['S -> S+T | T', 'T -> T*F | F', 'F -> (S) | a'])
+        for lalr in [True, False]:
+            parser = LRParserWrapped(lalr)
+            parser.init(grammar)
+
+            for s in ['a', 'a+a*a', '(a+a)*a+a']:
+                self.assertEqual(self.rightmost(grammar, parser.parse(s)), s)
+            self.assertFalse(parser.verify('a+'))
+            self.assertFalse(parser.verify('(a'))
+
+    def testRecognizer(self):
+        table, _ = buildLRTable(Grammar.read(['S -> S+T | T', 'T -> T*F | F', 'F -> (S) | a']))
+        stack = []
+        for s in ['(a+a)*a', 'a+', '((a)', 'a*a*a+a', '']:
+            self.assertEqual(LRRecognizer(s, table, stack), LRParser(s, table) is not None)
+
+    def testLALRMergesStates(self):
+        grammar = Grammar.read(['S -> S+T | T', 'T -> T*F | F', 'F -> (S) | a'])
+
+        self.assertLess(buildLRTable(grammar, True)[0].states, buildLRTable(grammar, False)[0].states)
+
+    def testConflicts(self):
+        self.assertIsNone(buildLRTable(Grammar.read(['S -> S+S | a'])))
+        with self.assertRaises(ValueError):
+            LRParserWrapped().init(Grammar.read(['S -> S+S | a']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+import pickle
+import tempfile
+
+from core.grammar import Grammar
+from core.llk import LLKParserWrapped
+from core.lr import LRParserWrapped
+from core.RecursiveParser import RecursiveParser
+from core.tablecache import TableCache, grammarFingerprint
+
+class TableCacheTest(unittest.TestCase):
+    grammar = ['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a']
+    strings = ['(a+a)*a', 'a+a', 'a', 'abc', 'a+', '']
+
+    def check(self, make):
+        with tempfile.TemporaryDirectory() as directory:
+            cold = make(TableCache(directory))
+            self.assertEqual(len(os.listdir(directory)), 1)
+            warm = make(TableCache(directory))
+            for s in self.strings:
+                self.assertEqual(warm.parse(s), cold.parse(s))
+            restored = pickle.loads(pickle.dumps(warm))
+            self.assertEqual([restored.verify(s) for s in self.strings], [cold.verify(s) for s in self.strings])
+
+    def testLLK(self):
+        def make(cache):
+            parser = LLKParserWrapped(2, cache)
+            parser.init(Grammar.read(self.grammar))
+            return parser
+        self.check(make)
+
+    def testLALR(self):
+        def make(cache):
+            parser = LRParserWrapped(True, cache)
+            parser.init(Grammar.read(self.grammar))
+            return parser
+        self.check(make)
+
+    def testEpsFree(self):
+        self.check(lambda cache: RecursiveParser(Grammar.read(self.grammar), cache))
+
+    def testFingerprint(self):
+        grammar = Grammar.read(self.grammar)
+        self.assertEqual(grammarFingerprint(grammar), grammarFingerprint(Grammar.read(self.grammar)))
+        self.assertNotEqual(grammarFingerprint(grammar), grammarFingerprint(Grammar.read(self.grammar[:-1] + ['D -> [S] | a'])))
+
+    def testCorruptedFile(self):
+        grammar = Grammar.read(self.grammar)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TableCache(directory)
+            parser = LLKParserWrapped(1, cache)
+            parser.init(grammar)
+            path = cache.path('llk', grammar, 1)
+            with open(path, 'r+b') as f:
+                f.write(b'garbage!')
+            self.assertIsNone(cache.load('llk', grammar, 1))
+            parser.init(grammar)
+            self.assertTrue(parser.verify('(a+a)*a'))
+            self.assertIsNotNone(cache.load('llk', grammar, 1))
+
+    def testTruncatedFile(self):
+        grammar = Grammar.read(self.grammar)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TableCache(directory)
+            parser = LLKParserWrapped(1, cache)
+            parser.init(grammar)
+            path = cache.path('llk', grammar, 1)
+            with open(path, 'rb') as f:
+                data = f.read()
+            # inside the version, inside the header, at the end of the arrays, empty file
+            for size in [10, 20, 60, len(data) - 4, len(data) - 8, 0]:
+                with open(path, 'wb') as f:
+                    f.write(data[:size])
+                self.assertIsNone(cache.load('llk', grammar, 1), size)
+                parser.init(grammar)
+                self.assertEqual([parser.verify(s) for s in self.strings], [True, True, True, False, False, False])
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), data)
@@ -0,0 +1,67 @@
+import unittest
+from itertools import product
+
+from core.grammar import Grammar
+from core.earley import EarleyParser
+from core.llk import LLKParserWrapped, buildLLKTable
+from core.grammarGenerator import generateString
+from core.transform import transformGrammar
+
+class TransformTest(unittest.TestCase):
+    def derive(self, grammar : Grammar, numbers):
+        return ''.join(str(x) for x in generateString(grammar, dict(enumerate(grammar.rules)), numbers) if not x.isEpsilon())
+
+    def testLeftFactoring(self):
+        grammar = Grammar.read(['S -> aaB | aaC | a', 'B -> b', 'C -> c'])
+        transform = transformGrammar(grammar)
+        self.assertIsNone(buildLLKTable(grammar, 2))
+        self.assertIsNotNone(buildLLKTable(transform.grammar, 1))
+        self.assertEqual(len(grammar.rules), 5)
+
+        parser = LLKParserWrapped(1)
+        parser.init(transform.grammar)
+        for s, rules in [('aab', [0, 3]), ('aac', [1, 4]), ('a', [2])]:
+            self.assertEqual(transform.translate([transform.grammar.rules.index(x) for x in parser.parse(s)]), rules)
+            self.assertEqual(transform.translateRules(parser.parse(s)), [grammar.rules[x] for x in rules])
+
+    def testLeftRecursion(self):
+        grammar = Grammar.read(['S -> S+T | T', 'T -> T*F | F', 'F -> (S) | a'])
+        transform = transformGrammar(grammar)
+        parser = LLKParserWrapped(1)
+        parser.init(transform.grammar)
+        earley = EarleyParser(grammar)
+        for s in ['a', 'a+a*a', '(a+a)*a+a', 'a*a*a+a+a']:
+            self.assertEqual(transform.translateRules(parser.parse(s)), earley.parse(s))
+        self.assertEqual(transform.translateRules(parser.parse('a+')), [])
+
+        # long lists are translated without recursion
+        s = '+'.join(['a*a'] * 5000)
+        self.assertEqual(self.derive(grammar, transform.translate(parser.parse(s))), s)
+
+    def testUnitCycle(self):
+        for rules in [['S -> S | a'], ['S -> S | Sb | a'], ['S -> A | a', 'A -> S | b']]:
+            grammar = Grammar.read(rules)
+            transform = transformGrammar(grammar)
+            self.assertTrue(all(rule.rhs[0] != rule.lhs for rule in transform.grammar.rules), rules)
+            # the unit cycle of the last grammar is ambiguous, so it is checked with Earley
+            original, transformed = EarleyParser(grammar), EarleyParser(transform.grammar)
+            for s in ['a', 'b', 'abb', 'c']:
+                self.assertEqual(transformed.verify(s), original.verify(s))
+                if transformed.verify(s):
+                    self.assertEqual(self.derive(grammar, transform.translate(transformed.parse(s))), s)
+        self.assertEqual([str(x) for x in transformGrammar(Grammar.read(['S -> S | a'])).grammar.rules], ['S -> a'])
+
+    def testIndirectLeftRecursion(self):
+        grammar = Grammar.read(['S -> Aa | b', 'A -> Ac | Sd | eps'])
+        transform = transformGrammar(grammar)
+        self.assertIsNotNone(buildLLKTable(transform.grammar, 2))
+        original, transformed = EarleyParser(grammar), EarleyParser(transform.grammar)
+        for n in range(6):
+            for s in map(''.join, product('abcd', repeat=n)):
+                self.assertEqual(transformed.verify(s), original.verify(s), s)
+                if original.verify(s):
+                    self.assertEqual(self.derive(grammar, transform.translate(transformed.parse(s))), s)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from core.grammar import Grammar, SymbolTable
+from core.tree import ParseTree
+from core.llk import LLKParserWrapped
+from core.lr import LRParserWrapped
+from core.earley import EarleyParser
+from core.RecursiveParser import RecursiveParser
+
+class ParseTreeTest(unittest.TestCase):
+    grammar = Grammar.read(['S -> BA', 'A -> +BA | eps', 'B -> DC', 'C -> *DC | eps', 'D -> (S) | a']).freeze()
+
+    def arrays(self, tree):
+        return [list(x) for x in (tree.symbol, tree.rule, tree.first_child, tree.next_sibling, tree.start, tree.end)]
+
+    def testBuiltWhileParsing(self):
+        parser = LLKParserWrapped(1)
+        parser.init(self.grammar)
+        tree = parser.tree('(a+a)*a')
+
+        self.assertEqual(self.arrays(tree), self.arrays(ParseTree.fromRules(parser.parse('(a+a)*a'), self.grammar.rules)))
+        self.assertEqual(tree.derivation(), parser.parse('(a+a)*a'))
+        self.assertEqual(''.join(SymbolTable.symbols[tree.symbol[x]].name() for x in tree.leaves()), '(a+a)*a')
+        self.assertEqual((tree.start[0], tree.end[0]), (0, 7))
+        self.assertIsNone(parser.tree('(a+a'))
+
+    def testEngines(self):
+        lalr = LRParserWrapped()
+        lalr.init(self.grammar)
+        leftmost = EarleyParser(self.grammar).tree('a*(a+a)')
+        rightmost = lalr.tree('a*(a+a)')
+
+        self.assertEqual(rightmost.derivation(), leftmost.derivation())
+        spans = lambda tree: [(tree.start[x], tree.end[x]) for x in tree.preorder()]
+        self.assertEqual(spans(rightmost), spans(leftmost))
+
+        parser = RecursiveParser(Grammar.read(['S -> aSb | ab']))
+        rules = [str(x) for x in parser.grammar.rules]
+        tree = parser.tree('aaabbb')
+        self.assertEqual(len(list(tree.leaves())), 6)
+        self.assertEqual([str(x) for x in tree.derivation()], ['S -> aSb', 'S -> aSb', 'S -> ab'])
+        self.assertEqual([str(x) for x in parser.grammar.rules], rules)
+
+    def testSubtree(self):
+        parser = EarleyParser(self.grammar)
+        tree = parser.tree('a*(a+a)')
+        node = next(x for x in tree.preorder() if str(tree.rules[tree.rule[x]]) == 'D -> (S)')
+        subtree = tree.subtree(node)
+
+        self.assertEqual(subtree.derivation(), tree.derivation(node))
+        self.assertEqual((subtree.start[0], subtree.end[0]), (2, 7))
+        self.assertEqual(len(subtree), len(list(tree.preorder(node))))
+
+    def testDeepTree(self):
+        parser = LLKParserWrapped(1)
+        parser.init(Grammar.read(['S -> aS | eps']))
+        tree = parser.tree('a' * 100000)
+
+        self.assertEqual(len(tree), 200002)
+        self.assertEqual(len(ParseTree.fromRules(parser.parse('a' * 100000))), 200002)
+        self.assertEqual(len(tree.subtree(2).derivation()), 100000)
+
+    def testBadDerivation(self):
+        rules = list(self.grammar.rules)
+        self.assertRaises(ValueError, ParseTree.fromRules, rules[:2], rules)
+        self.assertRaises(ValueError, ParseTree.fromRules, [], rules)
+        self.assertRaises(ValueError, ParseTree.fromRules, [rules[3]], rules)
+
+
+if __name__ == '__main__':
+    unittest.main()